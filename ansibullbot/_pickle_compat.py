@@ -1,16 +1,67 @@
-import functools
+'''
+The codec of the bot's caches.
+
+Caches are written as a header followed by a pickle at the highest
+protocol of the interpreter. The header carries a format version, so
+the format can change without misreading older caches. Data without
+the header is a legacy protocol 0 or 2 pickle and is still read.
+'''
+
 import pickle
+import struct
 
 import six
 
 
 __all__ = (
+    'CACHE_VERSION',
     'pickle_dump',
+    'pickle_dumps',
     'pickle_load',
+    'pickle_loads',
 )
 
 
+# a pickle never starts with a nul byte
+CACHE_MAGIC = b'\x00ABC'
+CACHE_VERSION = 1
+CACHE_HEADER = CACHE_MAGIC + struct.pack('B', CACHE_VERSION)
+
+PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+# legacy pickles were written by python2, their str values are bytes
 pickle_load_kwargs = {'encoding': 'bytes'} if six.PY3 else {}
 
-pickle_load = functools.partial(pickle.load, **pickle_load_kwargs)
-pickle_dump = functools.partial(pickle.dump, protocol=0)
+
+def _check_header(header):
+    '''True for the current format, False for a legacy pickle'''
+    if not header.startswith(CACHE_MAGIC):
+        return False
+    version = struct.unpack('B', header[len(CACHE_MAGIC):])[0]
+    if version != CACHE_VERSION:
+        raise ValueError('unsupported cache format version %s' % version)
+    return True
+
+
+def pickle_dumps(obj):
+    return CACHE_HEADER + pickle.dumps(obj, protocol=PICKLE_PROTOCOL)
+
+
+def pickle_dump(obj, f):
+    f.write(pickle_dumps(obj))
+
+
+def pickle_loads(data, **kwargs):
+    data = bytes(data)
+    if _check_header(data[:len(CACHE_HEADER)]):
+        return pickle.loads(data[len(CACHE_HEADER):])
+    kwargs = dict(pickle_load_kwargs, **kwargs)
+    return pickle.loads(data, **kwargs)
+
+
+def pickle_load(f, **kwargs):
+    header = f.read(len(CACHE_HEADER))
+    if _check_header(header):
+        return pickle.load(f)
+    kwargs = dict(pickle_load_kwargs, **kwargs)
+    return pickle.loads(header + f.read(), **kwargs)
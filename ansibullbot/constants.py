@@ -250,6 +250,37 @@ DEFAULT_RATELIMIT = get_config(
     value_type='boolean'
 )
 
+# Points of the rate limit budget that are never spent
+DEFAULT_RATELIMIT_RESERVE = get_config(
+    p,
+    DEFAULTS,
+    'ratelimit_reserve',
+    '%s_RATELIMIT_RESERVE' % PROG_NAME.upper(),
+    100,
+    value_type='int'
+)
+
+# Below this fraction of the limit the calls are spread over the rest of
+# the rate limit window
+DEFAULT_RATELIMIT_PACE = get_config(
+    p,
+    DEFAULTS,
+    'ratelimit_pace',
+    '%s_RATELIMIT_PACE' % PROG_NAME.upper(),
+    0.2,
+    value_type='float'
+)
+
+# Seconds between writes of the rate limit budgets to disk
+DEFAULT_RATELIMIT_PERSIST = get_config(
+    p,
+    DEFAULTS,
+    'ratelimit_persist',
+    '%s_RATELIMIT_PERSIST' % PROG_NAME.upper(),
+    60,
+    value_type='int'
+)
+
 DEFAULT_GITHUB_URL = get_config(
     p,
     DEFAULTS,
@@ -286,6 +317,17 @@ DEFAULT_GITHUB_TOKEN = get_config(
     value_type='string'
 )
 
+# More tokens, such as app installation tokens, to spread the api calls
+# over. Each has its own rate limit budget.
+DEFAULT_GITHUB_TOKENS = get_config(
+    p,
+    DEFAULTS,
+    'github_tokens',
+    '%s_GITHUB_TOKENS' % PROG_NAME.upper(),
+    '',
+    value_type='list'
+)
+
 DEFAULT_SHIPPABLE_TOKEN = get_config(
     p,
     DEFAULTS,
@@ -332,6 +374,46 @@ DEFAULT_STALE_WINDOW = get_config(
     value_type='int'
 )
 
+# Connections kept alive per host and the number of hosts to keep pools for
+DEFAULT_HTTP_POOL_MAXSIZE = get_config(
+    p,
+    DEFAULTS,
+    'http_pool_maxsize',
+    '%s_HTTP_POOL_MAXSIZE' % PROG_NAME.upper(),
+    20,
+    value_type='int'
+)
+
+DEFAULT_HTTP_POOL_CONNECTIONS = get_config(
+    p,
+    DEFAULTS,
+    'http_pool_connections',
+    '%s_HTTP_POOL_CONNECTIONS' % PROG_NAME.upper(),
+    10,
+    value_type='int'
+)
+
+# Pages of a paginated github listing fetched at the same time
+DEFAULT_PAGINATION_WORKERS = get_config(
+    p,
+    DEFAULTS,
+    'pagination_workers',
+    '%s_PAGINATION_WORKERS' % PROG_NAME.upper(),
+    4,
+    value_type='int'
+)
+
+# Hours between full re-syncs of the graphql issue summaries, the loops in
+# between only fetch what was updated since the last sync
+DEFAULT_SUMMARY_RESYNC = get_config(
+    p,
+    DEFAULTS,
+    'summary_resync',
+    '%s_SUMMARY_RESYNC' % PROG_NAME.upper(),
+    24,
+    value_type='int'
+)
+
 
 # Pickle the issue objects?
 DEFAULT_PICKLE_ISSUES = get_config(
@@ -343,6 +425,87 @@ DEFAULT_PICKLE_ISSUES = get_config(
     value_type='boolean'
 )
 
+# Where the cached issue data lives: sqlite keeps it in one database per
+# repo, files in pickle and json files per issue directory
+DEFAULT_CACHE_BACKEND = get_config(
+    p,
+    DEFAULTS,
+    'cache_backend',
+    '%s_CACHE_BACKEND' % PROG_NAME.upper(),
+    u'sqlite',
+    value_type='string'
+)
+
+# Byte budgets in MB of the api response caches, the least recently
+# used responses are evicted past them but commits are always kept
+DEFAULT_CACHED_REQUESTS_MAX_MB = get_config(
+    p,
+    DEFAULTS,
+    'cached_requests_max_mb',
+    '%s_CACHED_REQUESTS_MAX_MB' % PROG_NAME.upper(),
+    2048,
+    value_type='int'
+)
+
+DEFAULT_HTTP_CACHE_MAX_MB = get_config(
+    p,
+    DEFAULTS,
+    'http_cache_max_mb',
+    '%s_HTTP_CACHE_MAX_MB' % PROG_NAME.upper(),
+    1024,
+    value_type='int'
+)
+
+DEFAULT_SHIPPABLE_CACHE_MAX_MB = get_config(
+    p,
+    DEFAULTS,
+    'shippable_cache_max_mb',
+    '%s_SHIPPABLE_CACHE_MAX_MB' % PROG_NAME.upper(),
+    1024,
+    value_type='int'
+)
+
+# How many decoded get_cached_request responses are kept in memory for
+# the run, the same commit is asked for by several facts of an issue
+DEFAULT_REQUEST_MEMO_SIZE = get_config(
+    p,
+    DEFAULTS,
+    'request_memo_size',
+    '%s_REQUEST_MEMO_SIZE' % PROG_NAME.upper(),
+    1024,
+    value_type='int'
+)
+
+# The daemon archives the caches of issues closed for longer than the
+# retention in days, 0 turns it off. With a budget in MB more recently
+# closed issues are collected too until the cache of a repo fits.
+DEFAULT_CACHE_GC_RETENTION = get_config(
+    p,
+    DEFAULTS,
+    'cache_gc_retention',
+    '%s_CACHE_GC_RETENTION' % PROG_NAME.upper(),
+    90,
+    value_type='int'
+)
+
+DEFAULT_CACHE_GC_MAX_MB = get_config(
+    p,
+    DEFAULTS,
+    'cache_gc_max_mb',
+    '%s_CACHE_GC_MAX_MB' % PROG_NAME.upper(),
+    0,
+    value_type='int'
+)
+
+DEFAULT_CACHE_GC_ARCHIVE = get_config(
+    p,
+    DEFAULTS,
+    'cache_gc_archive',
+    '%s_CACHE_GC_ARCHIVE' % PROG_NAME.upper(),
+    True,
+    value_type='boolean'
+)
+
 
 ###########################################
 #   METADATA RECEIVER
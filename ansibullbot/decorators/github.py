@@ -20,15 +20,13 @@ from requests.exceptions import ReadTimeout
 
 from ansibullbot._text_compat import to_text
 from ansibullbot.errors import RateLimitError
-from ansibullbot.utils.sqlite_utils import AnsibullbotDatabase
+import ansibullbot.utils.ratelimit as ratelimit
+import ansibullbot.utils.transport as transport
 
 import ansibullbot.constants as C
 
 
-ADB = AnsibullbotDatabase()
-
-
-def get_rate_limit():
+def get_rate_limit(token=None):
     url = C.DEFAULT_GITHUB_URL
     if not url:
         url = 'https://api.github.com/rate_limit'
@@ -36,7 +34,8 @@ def get_rate_limit():
         url += '/rate_limit'
     username = C.DEFAULT_GITHUB_USERNAME
     password = C.DEFAULT_GITHUB_PASSWORD
-    token = C.DEFAULT_GITHUB_TOKEN
+    if token is None:
+        token = C.DEFAULT_GITHUB_TOKEN
 
     if token:
         success = False
@@ -46,7 +45,7 @@ def get_rate_limit():
             except Exception as e:
                 pass
             try:
-                rr = requests.get(
+                rr = transport.get(
                     url,
                     headers={'Authorization': 'token %s' % token}
                 )
@@ -61,7 +60,7 @@ def get_rate_limit():
         while not success:
             logging.debug(url)
             try:
-                rr = requests.get(
+                rr = transport.get(
                     url,
                     auth=(username, password)
                 )
@@ -77,7 +76,7 @@ def get_rate_limit():
         logging.warning('Unable to fetch rate limit %r', response.get('message'))
         return False
 
-    ADB.set_rate_limit(username=username, token=token, rawjson=response)
+    ratelimit.get_budget(token).update_from_json(response)
 
     return response
 
@@ -88,7 +87,13 @@ def get_reset_time(fn, args):
     # default to 62 minutes
     reset_time = 60 * 62
 
-    rl = get_rate_limit()
+    # the token that ran out, another one of the pool may still have budget
+    pool = ratelimit.get_pool()
+    token = pool.current()
+    rl = get_rate_limit(token=token)
+    if len(pool.tokens) > 1 and pool.pick() != token:
+        logging.debug('get_reset_time [return]: switching tokens')
+        return 5
 
     if rl:
         # The time at which the current rate limit window resets
@@ -107,6 +112,20 @@ def get_reset_time(fn, args):
 
 
 def RateLimited(fn):
+    '''Take a point of the rate limit budget per call and retry on errors'''
+    return _rate_limited(fn, acquire=True)
+
+
+def RetryOnRateLimit(fn):
+    '''Retry on errors like RateLimited, without taking budget
+
+    For calls that go through RateLimited functions for each of their
+    requests, so every request is only charged once.
+    '''
+    return _rate_limited(fn, acquire=False)
+
+
+def _rate_limited(fn, acquire=True):
 
     def inner(*args, **kwargs):
 
@@ -114,29 +133,30 @@ def RateLimited(fn):
         if not C.DEFAULT_RATELIMIT:
             return fn(*args, **kwargs)
 
+        # kept up to date from the headers of every api response
+        pool = ratelimit.get_pool()
+
         success = False
         count = 0
         while not success:
             count += 1
 
-            # use cached ratelimit data and a query counter to reduce api calls for rate_limit
-            rl = ADB.get_rate_limit_rawjson(token=C.DEFAULT_GITHUB_TOKEN)
-            qcounter = ADB.get_rate_limit_query_counter(token=C.DEFAULT_GITHUB_TOKEN)
-            if rl is None or qcounter is None or qcounter > 100 or (rl and rl['resources']['core']['remaining'] < 100):
-                rl = get_rate_limit()
-                ADB.set_rate_limit(token=C.DEFAULT_GITHUB_TOKEN, rawjson=rl)
-                qcounter = ADB.get_rate_limit_query_counter(token=C.DEFAULT_GITHUB_TOKEN)
-
-            logging.debug('qcounter: %s' % qcounter)
-            rl['resources']['core']['remaining'] -= qcounter            
-
-            if rl:
-                func_name = fn.__name__ if six.PY3 else fn.func_name
-                logging.debug('ratelimited call #%s [%s] [%s] [%s]' %
-                              (count,
-                               type(args[0]),
-                               func_name,
-                               rl['resources']['core']['remaining']))
+            token = pool.pick() if acquire else pool.current()
+            budget = ratelimit.get_budget(token)
+            if acquire:
+                if not budget.known():
+                    # the rate_limit endpoint does not count against the limit
+                    get_rate_limit(token=token)
+
+                # waits for capacity when the budget of every token is low
+                pool.acquire(token=token)
+
+            func_name = fn.__name__ if six.PY3 else fn.func_name
+            logging.debug('ratelimited call #%s [%s] [%s] [%s]' %
+                          (count,
+                           type(args[0]),
+                           func_name,
+                           budget.resources.get('core', {}).get('remaining')))
 
             if count > 10:
                 logging.error('HIT 10 loop iteration on call, giving up')
@@ -26,14 +26,16 @@
 #   * different workflows should be a matter of enabling different plugins
 
 import datetime
+import functools
 from distutils.version import LooseVersion
 import io
 import json
 import logging
 import os
+import threading
+import time
 from pprint import pprint
 
-import requests
 
 from ansibullbot._json_compat import json_dump
 from ansibullbot._text_compat import to_bytes, to_text
@@ -46,22 +48,34 @@ from ansibullbot.wrappers.issuewrapper import IssueWrapper
 
 from ansibullbot.parsers.botmetadata import BotMetadataParser
 
+from ansibullbot.utils.cache_gc import CacheCollector
 from ansibullbot.utils.component_tools import AnsibleComponentMatcher
 from ansibullbot.utils.extractors import extract_pr_number_from_comment
+from ansibullbot.utils.factmemo import FactMemo, fingerprint
+import ansibullbot.utils.instrumentation as instrumentation
 from ansibullbot.utils.git_tools import GitRepoWrapper
-from ansibullbot.utils.iterators import RepoIssuesIterator
+from ansibullbot.utils.iterators import IssuePrefetcher, RepoIssuesIterator
 from ansibullbot.utils.moduletools import ModuleIndexer
+import ansibullbot.utils.ratelimit as ratelimit
 from ansibullbot.utils.timetools import strip_time_safely
+import ansibullbot.utils.transport as transport
 from ansibullbot.utils.version_tools import AnsibleVersionIndexer
 from ansibullbot.utils.shippable_api import ShippableCI
+from ansibullbot.utils.sqlite_utils import AnsibullbotDatabase, reset_database_connections
+from ansibullbot.utils.summary_table import SummaryTable
 from ansibullbot.utils.systemtools import run_command
 from ansibullbot.utils.receiver_client import post_to_receiver
+from ansibullbot.utils.scheduler import PRIORITY_ACTIVITY, PRIORITY_CI, PRIORITY_REBUILD, PRIORITY_STALE
+from ansibullbot.utils.scheduler import TriageScheduler, TriageTimers
 from ansibullbot.utils.webscraper import GithubWebScraper
+from ansibullbot.utils.workpool import run_workers
 from ansibullbot.utils.gh_gql_client import GithubGraphQLClient
 
 from ansibullbot.decorators.github import RateLimited
 from ansibullbot.errors import LabelWafflingError
 
+from ansibullbot.triagers.plugins import COMMITS, HISTORY, REVIEWS
+from ansibullbot.triagers.plugins import get_requirements, requires
 from ansibullbot.triagers.plugins.backports import get_backport_facts
 from ansibullbot.triagers.plugins.botstatus import get_bot_status_facts
 from ansibullbot.triagers.plugins.ci_rebuild import get_ci_facts
@@ -80,6 +94,7 @@ from ansibullbot.triagers.plugins.needs_info import is_needsinfo
 from ansibullbot.triagers.plugins.needs_info import needs_info_template_facts
 from ansibullbot.triagers.plugins.needs_info import needs_info_timeout_facts
 from ansibullbot.triagers.plugins.needs_revision import get_needs_revision_facts
+from ansibullbot.triagers.plugins.needs_revision import CI_STALE_DAYS
 from ansibullbot.triagers.plugins.needs_revision import get_shippable_run_facts
 from ansibullbot.triagers.plugins.contributors import get_contributor_facts
 from ansibullbot.triagers.plugins.notifications import get_notification_facts
@@ -199,6 +214,13 @@ class AnsibleTriage(DefaultTriager):
 
         self.last_run = None
 
+        # the github connections of the prefetch threads
+        self._prefetch_local = threading.local()
+
+        # time each stage and attribute api calls to it
+        instrumentation.install()
+        self.instrumentation = instrumentation.StageRecorder()
+
         self.github_url = C.DEFAULT_GITHUB_URL
         self.github_user = C.DEFAULT_GITHUB_USERNAME
         self.github_pass = C.DEFAULT_GITHUB_PASSWORD
@@ -207,9 +229,20 @@ class AnsibleTriage(DefaultTriager):
         # where to store junk
         self.cachedir_base = os.path.expanduser(self.cachedir_base)
 
+        # remember the rate limit budget across restarts
+        ratelimit.configure(os.path.join(self.cachedir_base, u'ratelimit.json'))
+
+        # unchanged github reads are answered from disk after a 304
+        if not self.no_http_cache:
+            transport.configure_cache(os.path.join(self.cachedir_base, u'http_cache'))
+
         self.set_logger()
         logging.info('starting bot')
 
+        if self.workers > 1 and self.prefetch > 0:
+            # the workers triage in parallel instead
+            logging.warning(u'--prefetch is ignored with --workers')
+
         # connect to github
         logging.info('creating api connection')
         self.gh = self._connect()
@@ -232,8 +265,29 @@ class AnsibleTriage(DefaultTriager):
         # repo objects
         self.repos = {}
 
+        # the scheduling fields of every meta.json
+        self.adb = AnsibullbotDatabase()
+
+        # when each issue has to be looked at again if nothing happens to it
+        self.timers = TriageTimers(
+            cachefile=os.path.join(self.cachedir_base, u'triage_timers.json')
+        )
+
+        # hash of the checkout and botmeta the memoized facts depend on
+        self.index_fingerprint = None
+        self.fact_memo = None
+
         # scraped summaries for all issues
         self.issue_summaries = {}
+        # the fields of the summaries the collection filters on
+        self.summary_tables = {}
+
+        # graphql details fetched ahead for the next --graphql_batch issues
+        self.issue_details = {}
+        self._issue_details_lock = threading.Lock()
+
+        # archives the caches of long closed issues in daemon mode
+        self._gc_thread = None
 
         # create the scraper for www data
         logging.info(u'creating webscraper')
@@ -282,6 +336,9 @@ class AnsibleTriage(DefaultTriager):
             use_galaxy=not self.args.ignore_galaxy
         )
 
+        # the memoized facts of the first pass depend on these too
+        self.index_fingerprint = fingerprint(self.gitrepo.get_head(), self.botmeta)
+
         logging.info('creating CI wrapper')
         self.ci = ShippableCI(self.cachedir_base)
         self.ci.update()
@@ -328,229 +385,733 @@ class AnsibleTriage(DefaultTriager):
 
         if self.ITERATION > 0:
             # update on each run to pull in new data
-            logging.info('updating checkout')
-            self.gitrepo.update()
+            self.update_indexes()
+
+        self.set_automerge()
+
+        # get all of the open issues [or just one]
+        self.collect_repos()
+
+        # stop here if we're just collecting issues to populate cache
+        if self.collect_only:
+            return
+
+        # loop through each repo made by collect_repos
+        items = list(self.repos.items())
+        for item in items:
+            repopath = item[0]
+
+            issues = item[1][u'issues']
+            if self.workers > 1 and isinstance(issues, RepoIssuesIterator):
+                icount += len(issues.numbers)
+                self.triage_with_workers(repopath, issues)
+                continue
+
+            if self.prefetch > 0 and isinstance(issues, RepoIssuesIterator):
+                # fetch the github data for the next N issues in the
+                # background while the current issue is being triaged
+                issues = IssuePrefetcher(
+                    issues.numbers,
+                    functools.partial(self.prefetch_issue, repopath, issues),
+                    depth=self.prefetch
+                )
+
+            try:
+                for issue in issues:
+
+                    iw = None
+                    if isinstance(issue, IssueWrapper):
+                        iw = issue
+                        issue = iw.instance
+
+                    if issue is None:
+                        if C.DEFAULT_BREAKPOINTS:
+                            logging.error('breakpoint!')
+                            import epdb; epdb.st()
+                        continue
+
+                    icount += 1
+
+                    self.triage_issue(repopath, issue, iw=iw)
+            finally:
+                if isinstance(issues, IssuePrefetcher):
+                    issues.close()
+
+            self.timers.save()
+
+        ts2 = datetime.datetime.now()
+        td = (ts2 - ts1).total_seconds()
+        logging.info('triaged %s issues in %s seconds' % (icount, td))
+
+        self.write_instrumentation_report()
+
+    def run_plugin(self, func, *args, **kwargs):
+        '''Call a facts plugin and record its timing and api usage'''
+        return self.instrumentation.run(func.__name__, func, *args, **kwargs)
+
+    def get_issue_fingerprint(self, iw):
+        '''The parts of an issue that change when anything happens to it'''
+        parts = [iw.repo_full_name, iw.number, to_text(iw.updated_at)]
+        if iw.is_pullrequest():
+            parts.append(iw.pullrequest.head.sha)
+            # the CI run ids and states
+            parts.append(iw.pullrequest_status)
+        return parts
+
+    def run_memoized_plugin(self, iw, inputs, func, *args, **kwargs):
+        '''Run a pure facts plugin unless its inputs match the last run
 
-            self.load_botmeta()
+        inputs is anything the plugin reads besides the issue, the checkout
+        and botmeta, such as the meta built by the plugins before it.
+        '''
+        if self.fact_memo is None or self.index_fingerprint is None:
+            return self.run_plugin(func, *args, **kwargs)
 
-            logging.info('updating module indexer')
-            self.module_indexer.update(botmeta=self.botmeta)
+        key = fingerprint(
+            self.get_issue_fingerprint(iw),
+            self.index_fingerprint,
+            inputs
+        )
+        facts = self.fact_memo.get(func.__name__, key)
+        if facts is None:
+            facts = self.run_plugin(func, *args, **kwargs)
+            self.fact_memo.set(func.__name__, key, facts)
+        return facts
+
+    def write_instrumentation_report(self):
+        '''Summarize the stage timings of this run next to the cache'''
+        self.log_cache_stats()
+        if not self.instrumentation.samples:
+            return
 
-            logging.info('updating component matcher')
-            self.component_matcher.update(
-                email_cache=self.module_indexer.emails_cache,
-                usecache=True,
-                use_galaxy=not self.args.ignore_galaxy,
-                botmeta=self.botmeta,
+        report = self.instrumentation.report()
+        self.instrumentation.log_report(report)
+        self.instrumentation.dump(
+            os.path.join(self.cachedir_base, u'instrumentation.json'),
+            report=report
+        )
+        if self.post_instrumentation:
+            post_to_receiver(u'instrumentation', {u'iteration': self.ITERATION}, report)
+
+        self.instrumentation.pop_samples()
+
+    def log_cache_stats(self):
+        '''Report the size and evictions of the api response caches'''
+        memo = getattr(getattr(self, u'ghw', None), u'request_memo', None)
+        if memo is not None:
+            logging.info(u'request memo: %s hits, %s misses, %s of %s entries' % (
+                memo.hits, memo.misses, len(memo), memo.maxsize))
+
+        stores = [
+            (u'cached_requests', getattr(getattr(self, u'ghw', None), u'_cached_requests', None)),
+            (u'shippable', getattr(getattr(self, u'ci', None), u'_raw_cache', None)),
+            (u'http', transport.get_cache()),
+        ]
+        for name, store in stores:
+            if store is None:
+                continue
+            stats = store.stats()
+            logging.info(
+                u'%s cache: %s keys (%s pinned), %s blobs, %s of %s bytes, '
+                u'evicted %s keys and %s bytes' % (
+                    name,
+                    stats[u'keys'],
+                    stats[u'pinned'],
+                    stats[u'blobs'],
+                    stats[u'bytes'],
+                    stats[u'max_bytes'],
+                    stats[u'evicted_keys'],
+                    stats[u'evicted_bytes'],
+                )
             )
 
-            logging.info('updating CI run data')
-            self.ci.update()
+    def update_indexes(self):
+        '''Refresh the checkout and everything derived from it'''
+        logging.info('updating checkout')
+        self.gitrepo.update()
+
+        self.load_botmeta()
+
+        logging.info('updating module indexer')
+        self.module_indexer.update(botmeta=self.botmeta)
+
+        logging.info('updating component matcher')
+        self.component_matcher.update(
+            email_cache=self.module_indexer.emails_cache,
+            usecache=True,
+            use_galaxy=not self.args.ignore_galaxy,
+            botmeta=self.botmeta,
+        )
 
+        logging.info('updating CI run data')
+        self.ci.update()
+
+        self.index_fingerprint = fingerprint(self.gitrepo.get_head(), self.botmeta)
+
+    def set_automerge(self):
         # is automerge allowed?
         self.automerge_on = False
         if self.botmeta.get(u'automerge'):
             if self.botmeta[u'automerge'] in [u'Yes', u'yes', u'y', True, 1]:
                 self.automerge_on = True
 
-        # get all of the open issues [or just one]
-        self.collect_repos()
+    def loop(self):
+        '''Triage by priority in daemon mode unless sweeps were requested'''
+        if self.daemonize_sweep:
+            return super(AnsibleTriage, self).loop()
 
-        # stop here if we're just collecting issues to populate cache
-        if self.collect_only:
+        self.scheduler = TriageScheduler(
+            cachefile=os.path.join(self.cachedir_base, u'triage_schedule.json')
+        )
+
+        last_sweep = None
+        last_poll = None
+
+        while True:
+            now = time.time()
+
+            if last_sweep is None or (now - last_sweep) > self.daemonize_interval:
+                if last_sweep is not None:
+                    self.write_instrumentation_report()
+                    self.ITERATION += 1
+                    self.update_indexes()
+                self.set_automerge()
+                self.collect_repos()
+                for repopath in self.repos:
+                    self.schedule_sweep(repopath)
+                self.collect_garbage()
+                self.save_schedule()
+                last_sweep = last_poll = now
+
+            elif (now - last_poll) > self.daemonize_poll:
+                self.ci.update()
+                for repopath in self.repos:
+                    self.schedule_activity(repopath)
+                self.save_schedule()
+                last_poll = now
+
+            # facts that change just because time passed
+            for repopath, number in self.timers.pop_due(now):
+                if repopath in self.repos:
+                    self.scheduler.push(repopath, number, PRIORITY_STALE, reason=u'timer')
+
+            job = self.scheduler.pop()
+            if job is None:
+                self.save_schedule()
+                wait = self.get_idle_time(last_poll, time.time())
+                logging.info('schedule is empty, sleep %ss' % int(wait))
+                time.sleep(wait)
+                continue
+
+            repopath, number, priority, reason = job
+            logging.info(u'scheduled %s#%s [p%s %s], %s queued' % (
+                repopath, number, priority, reason, len(self.scheduler))
+            )
+
+            started = datetime.datetime.utcnow()
+            issue = self.repos[repopath][u'issues'].get_issue(number)
+            if issue is not None:
+                self.triage_issue(repopath, issue)
+                self.scheduler.mark_processed(
+                    repopath,
+                    number,
+                    updated_at=issue.updated_at.isoformat(),
+                    time=started.isoformat()
+                )
+
+    def get_idle_time(self, last_poll, now):
+        '''Seconds until the next poll, or the next timer if it is due first'''
+        wait = last_poll + self.daemonize_poll - now
+        next_due = self.timers.next_due()
+        if next_due is not None:
+            wait = min(wait, next_due - now)
+        return max(wait, 1)
+
+    def save_schedule(self):
+        '''Write the queue and timers, triaged issues are saved at the next poll'''
+        self.scheduler.save()
+        self.timers.save()
+
+    def collect_garbage(self):
+        '''Archive the caches of long closed issues in a background thread'''
+        if not C.DEFAULT_CACHE_GC_RETENTION:
+            return
+        if self._gc_thread is not None and self._gc_thread.is_alive():
             return
 
-        # loop through each repo made by collect_repos
-        items = list(self.repos.items())
-        for item in items:
-            repopath = item[0]
-            repo = item[1][u'repo']
+        jobs = []
+        for repopath in self.repos:
+            summaries = self.issue_summaries.get(repopath) or []
+            if isinstance(summaries, dict):
+                summaries = summaries.values()
+            # a copy, the next sweep replaces the summaries
+            jobs.append((repopath, list(summaries)))
+
+        def run():
+            for repopath, summaries in jobs:
+                collector = CacheCollector(os.path.join(self.cachedir_base, repopath), repopath)
+                try:
+                    collector.collect(
+                        summaries,
+                        C.DEFAULT_CACHE_GC_RETENTION,
+                        max_bytes=C.DEFAULT_CACHE_GC_MAX_MB * 1024 * 1024,
+                        archive=C.DEFAULT_CACHE_GC_ARCHIVE,
+                        # queued issues are about to be triaged
+                        keep=lambda number, rp=repopath: (rp, number) in self.scheduler
+                    )
+                except Exception as e:
+                    logging.error(u'cache gc of %s failed: %s' % (repopath, to_text(e)))
 
-            # set the relative cachedir
-            cachedir = os.path.join(self.cachedir_base, repopath)
+        self._gc_thread = threading.Thread(target=run, name=u'cache-gc')
+        self._gc_thread.daemon = True
+        self._gc_thread.start()
 
-            for issue in item[1][u'issues']:
+    def get_ci_completion_dates(self):
+        '''Map PR numbers to the end time of their latest CI run'''
+        completed = {}
+        for run in self.ci.runs:
+            if not run.get(u'endedAt'):
+                continue
+            number = run[u'commitUrl'].rstrip(u'/').split(u'/')[-1]
+            if not number.isdigit():
+                continue
+            number = int(number)
+            if number not in completed or completed[number] < run[u'endedAt']:
+                completed[number] = run[u'endedAt']
+        return completed
+
+    def schedule_sweep(self, repopath):
+        '''Queue every open issue that needs attention based on the index'''
+        summaries = self.issue_summaries.get(repopath, {})
+        indexes = self.adb.get_triage_indexes(repopath)
+        completed = self.get_ci_completion_dates()
+        now = time.time()
+
+        # most recently active first within each priority
+        numbers = sorted(
+            summaries.keys(),
+            key=lambda x: summaries[x].get(u'updated_at') or u'',
+            reverse=True
+        )
 
-                if issue is None:
-                    if C.DEFAULT_BREAKPOINTS:
-                        logging.error('breakpoint!')
-                        import epdb; epdb.st()
-                    continue
+        for number in numbers:
+            summary = summaries[number]
+            if summary[u'state'] != u'open':
+                continue
+            if self.only_prs and summary[u'type'] != u'pullrequest':
+                continue
+            if self.only_issues and summary[u'type'] != u'issue':
+                continue
 
-                icount += 1
+            number = int(number)
+            meta = self.load_triage_index(repopath, number, indexes=indexes)
 
-                self.COMPONENTS = []
-                self.meta = {}
-                number = issue.number
-                self.set_resume(item[0], number)
+            if not meta:
+                self.scheduler.push(repopath, number, PRIORITY_ACTIVITY, reason=u'new')
+                continue
 
-                # keep track of known issues
-                self.repos[repopath][u'processed'].append(number)
+            mua = strip_time_safely(meta[u'updated_at'])
+            if summary.get(u'updated_at') and strip_time_safely(summary[u'updated_at']) > mua:
+                self.scheduler.push(repopath, number, PRIORITY_ACTIVITY, reason=u'updated')
+                continue
 
-                if issue.state == u'closed' and not self.ignore_state:
-                    logging.info(to_text(number) + u' is closed, skipping')
-                    redo = False
-                    continue
+            if completed.get(number) and completed[number] > mua:
+                self.scheduler.push(repopath, number, PRIORITY_CI, reason=u'ci')
+                continue
 
-                if self.only_prs and u'pull' not in issue.html_url:
-                    logging.info(to_text(number) + u' is issue, skipping')
-                    redo = False
+            if meta.get(u'needs_rebuild') or meta.get(u'admin_merge'):
+                self.scheduler.push(repopath, number, PRIORITY_REBUILD, reason=u'rebuild')
+                continue
+
+            # stale items are normally queued by their timers
+            if self.timers.get(repopath, number) is None:
+                due = meta[u'next_check']
+                self.timers.set(repopath, number, due)
+                if due is not None and due <= now:
+                    self.scheduler.push(repopath, number, PRIORITY_STALE, reason=u'stale')
+
+        if summaries:
+            # closed and deleted issues are not triaged again
+            self.scheduler.prune(
+                repopath,
+                [int(x) for x in summaries if summaries[x][u'state'] == u'open']
+            )
+
+        logging.info(u'%s issues scheduled after sweeping %s' % (len(self.scheduler), repopath))
+
+    def schedule_activity(self, repopath):
+        '''Queue issues updated or with CI finished since they were triaged'''
+        repo = self.repos[repopath][u'repo']
+        issues = self.repos[repopath][u'issues']
+
+        since = self.repos[repopath][u'since']
+        if since:
+            since = strip_time_safely(since)
+            newest = None
+            for issue in repo.get_issues(since=since):
+                if self.only_prs and issue.pull_request is None:
+                    continue
+                if self.only_issues and issue.pull_request is not None:
                     continue
 
-                if self.only_issues and u'pull' in issue.html_url:
-                    logging.info(to_text(number) + u' is pullrequest, skipping')
-                    redo = False
+                ua = issue.updated_at.isoformat()
+                if newest is None or ua > newest:
+                    newest = ua
+
+                last = self.scheduler.last_processed(repopath, issue.number)
+                if last.get(u'updated_at') and last[u'updated_at'] >= ua:
                     continue
 
-                # users may want to re-run this issue after manual intervention
-                redo = True
+                issues.issuecache[issue.number] = issue
+                self.scheduler.push(repopath, issue.number, PRIORITY_ACTIVITY, reason=u'updated')
 
-                # keep track of how many times this isssue has been re-done
-                loopcount = 0
+            if newest:
+                self.repos[repopath][u'since'] = newest
 
-                # time each issue
-                its1 = datetime.datetime.now()
+        for number, ended in self.get_ci_completion_dates().items():
+            last = self.scheduler.last_processed(repopath, number)
+            if last.get(u'time') and strip_time_safely(last[u'time']) < ended:
+                self.scheduler.push(repopath, number, PRIORITY_CI, reason=u'ci')
 
-                while redo:
+    def load_meta_by_number(self, repopath, number):
+        mfile = os.path.join(
+            self.cachedir_base,
+            repopath,
+            u'issues',
+            to_text(number),
+            u'meta.json'
+        )
+        if not os.path.isfile(mfile):
+            return {}
+        try:
+            with open(mfile, 'rb') as f:
+                return json.load(f)
+        except ValueError as e:
+            logging.error('failed to parse %s: %s' % (to_text(mfile), to_text(e)))
+            return {}
+
+    def triage_with_workers(self, repopath, issues):
+        '''Triage the issues in forked workers fed from a shared queue'''
+        logging.info(u'triaging %s issues with %s workers' % (len(issues.numbers), self.workers))
+
+        def init_worker():
+            # sockets and sqlite connections must not be shared with the parent
+            reset_database_connections()
+            self.module_indexer.engine.dispose()
+            self.module_indexer.session = self.module_indexer.Session()
+            self.gh = self._connect()
+            self.ghw = GithubWrapper(self.gh, token=self.github_token, cachedir=self.cachedir_base)
+            self.repos[repopath][u'repo'] = self.ghw.get_repo(repopath, verbose=False)
+            issues.repo = self.repos[repopath][u'repo']
+
+        def triage_number(number):
+            issue = issues.get_issue(number)
+            if issue is None:
+                return
+            self.triage_issue(repopath, issue)
+            return {
+                u'next_check': self.timers.get(repopath, number),
+                u'samples': self.instrumentation.pop_samples(),
+            }
 
-                    # use the loopcount to check new data
-                    loopcount += 1
+        results = run_workers(
+            issues.numbers,
+            triage_number,
+            workers=self.workers,
+            initializer=init_worker
+        )
 
-                    if loopcount <= 1:
-                        logging.info('starting triage for %s' % issue.html_url)
-                    else:
-                        # if >1 get latest data
-                        logging.info('restarting triage for %s' % number)
-                        issue = repo.get_issue(number)
-
-                    # clear redo
-                    redo = False
-
-                    # create the wrapper on each loop iteration
-                    iw = IssueWrapper(
-                        github=self.ghw,
-                        repo=repo,
-                        issue=issue,
-                        cachedir=cachedir,
-                        gitrepo=self.gitrepo,
-                    )
+        # the children's state is gone, so merge what they reported
+        for result in results:
+            self.repos[repopath][u'processed'].append(result[u'item'])
+            if result[u'status'] != u'ok':
+                logging.error(u'%s failed: %s' % (result[u'item'], result[u'error']))
+            elif result[u'result']:
+                self.timers.set(repopath, result[u'item'], result[u'result'][u'next_check'])
+                self.instrumentation.merge_samples(result[u'result'][u'samples'])
+        self.timers.save()
+
+        if results:
+            elapsed = sorted([x[u'elapsed'] for x in results])
+            logging.info(u'workers triaged %s issues, slowest %s took %.2fs' % (
+                len(results),
+                max(results, key=lambda x: x[u'elapsed'])[u'item'],
+                elapsed[-1])
+            )
 
-                    if self.skip_no_update:
-                        lmeta = self.load_meta(iw)
-
-                        if lmeta:
-
-                            now = datetime.datetime.now()
-                            skip = False
-
-                            if lmeta[u'updated_at'] == to_text(iw.updated_at.isoformat()):
-                                skip = True
-
-                            if skip:
-                                if iw.is_pullrequest():
-                                    ua = to_text(iw.pullrequest.updated_at.isoformat())
-                                    if lmeta[u'updated_at'] < ua:
-                                        skip = False
-
-                            if skip:
-
-                                # re-check ansible/ansible after
-                                # a window of time since the last check.
-                                lt = lmeta[u'time']
-                                lt = strip_time_safely(lt)
-                                delta = (now - lt)
-                                delta = delta.days
-                                if delta > C.DEFAULT_STALE_WINDOW:
-                                    msg = u'!skipping: %s' % delta
-                                    msg += u' days since last check'
-                                    logging.info(msg)
-                                    skip = False
-
-                                # if last process time is older than
-                                # last completion time on CI, we need
-                                # to reprocess because the CI status has
-                                # probabaly changed.
-                                if skip and iw.is_pullrequest():
-                                    ua = to_text(iw.pullrequest.updated_at.isoformat())
-                                    mua = strip_time_safely(lmeta[u'updated_at'])
-                                    lsr = self.ci.get_last_completion_date(iw.number)
-                                    if (lsr and lsr > mua) or \
-                                            ua > lmeta[u'updated_at']:
-                                        skip = False
-
-                            # was this in the stale list?
-                            if skip:
-                                if iw.number in self.repos[repopath][u'stale']:
-                                    skip = False
-
-                            # always poll rebuilds till they are merged
-                            if lmeta.get(u'needs_rebuild') or lmeta.get(u'admin_merge'):
-                                skip = False
-
-                            # do a final check on the timestamp in meta
-                            if skip:
-                                mts = strip_time_safely(lmeta[u'time'])
-                                delta = (now - mts).days
-                                if delta > C.DEFAULT_STALE_WINDOW:
-                                    skip = False
-
-                            if skip:
-                                msg = u'skipping: no changes since last run'
-                                logging.info(msg)
-                                continue
-
-                    # force an update on the PR data
-                    iw.update_pullrequest()
-                    # build the history
-                    self.build_history(iw)
-
-                    actions = AnsibleActions()
-                    self.process(iw)
-
-                    # build up actions from the meta
-                    self.create_actions(iw, actions)
-                    self.save_meta(iw, self.meta, actions)
-
-                    # DEBUG!
-                    logging.info('url: %s' % iw.html_url)
-                    logging.info('title: %s' % iw.title)
-                    if iw.is_pullrequest():
-                        for fn in iw.files:
-                            logging.info('component[f]: %s' % fn)
-                    else:
-                        for line in iw.template_data.get(u'component_raw', u'').split(u'\n'):
-                            logging.info('component[t]: %s' % line)
-                        for fn in self.meta[u'component_filenames']:
-                            logging.info('component[m]: %s' % fn)
-
-                    if self.meta[u'template_missing_sections']:
-                        logging.info(
-                            u'missing sections: ' +
-                            u', '.join(self.meta[u'template_missing_sections'])
-                        )
-                    if self.meta[u'is_needs_revision']:
-                        logging.info(u'needs_revision')
-                        for msg in self.meta[u'is_needs_revision_msgs']:
-                            logging.info('needs_revision_msg: %s' % msg)
-                    if self.meta[u'is_needs_rebase']:
-                        logging.info('needs_rebase')
-                        for msg in self.meta[u'is_needs_rebase_msgs']:
-                            logging.info('needs_rebase_msg: %s' % msg)
-
-                    pprint(vars(actions))
-
-                    # do the actions
-                    action_meta = self.apply_actions(iw, actions)
-                    if action_meta[u'REDO']:
-                        redo = True
-
-                its2 = datetime.datetime.now()
-                td = (its2 - its1).total_seconds()
-                logging.info(u'finished triage for %s in %ss' % (to_text(iw), td))
+    def prefetch_issue(self, repopath, issues, number):
+        '''Fetch an issue and all of its github data [threaded]'''
+        with self.instrumentation.stage(u'prefetch'):
+            return self._prefetch_issue(repopath, issues, number)
+
+    def get_prefetch_connection(self, repopath):
+        '''A github connection and repo wrapper of the calling prefetch thread'''
+        local = self._prefetch_local
+        if getattr(local, u'repos', None) is None:
+            local.ghw = GithubWrapper(self._connect(), token=self.github_token, cachedir=self.cachedir_base)
+            local.repos = {}
+        if repopath not in local.repos:
+            local.repos[repopath] = local.ghw.get_repo(repopath, verbose=False)
+        return local.ghw, local.repos[repopath]
+
+    def _prefetch_issue(self, repopath, issues, number):
+        # pygithub requests are serialized per connection, a connection
+        # per thread keeps the prefetches from waiting on each other
+        ghw, repo = self.get_prefetch_connection(repopath)
+
+        issue = issues.issuecache.get(number) or repo.get_issue(number)
+        if issue is None:
+            return None
 
-        ts2 = datetime.datetime.now()
-        td = (ts2 - ts1).total_seconds()
-        logging.info('triaged %s issues in %s seconds' % (icount, td))
+        iw = IssueWrapper(
+            github=ghw,
+            repo=repo,
+            issue=issue,
+            cachedir=os.path.join(self.cachedir_base, repopath),
+            gitrepo=self.gitrepo,
+        )
+
+        # don't waste api calls on issues that will not be triaged
+        if issue.state == u'closed' and not self.ignore_state:
+            return iw
+        if self.only_prs and not iw.is_pullrequest():
+            return iw
+        if self.only_issues and iw.is_pullrequest():
+            return iw
+
+        try:
+            if self.skip_no_update and self.skip_issue(iw, repopath):
+                return iw
+
+            self.load_issue_details(repopath, iw)
+            iw.update_pullrequest()
+            iw.prefetch(self.get_plugin_requirements(iw))
+        except Exception as e:
+            # the triage loop will fetch the data again and handle errors
+            logging.warning(u'prefetch failed for %s: %s' % (number, to_text(e)))
+
+        return iw
+
+    def get_issue_details(self, repopath, number):
+        '''The graphql details of an issue, fetching the following ones too'''
+        if not self.gqlc or self.graphql_batch < 1:
+            return None
+
+        with self._issue_details_lock:
+            details = self.issue_details.setdefault(repopath, {})
+            if number not in details:
+                issues = self.repos.get(repopath, {}).get(u'issues')
+                numbers = [number]
+                if isinstance(issues, RepoIssuesIterator) and number in issues.numbers:
+                    idx = issues.numbers.index(number)
+                    numbers = issues.numbers[idx:idx + self.graphql_batch]
+
+                owner, repo = repopath.split(u'/', 1)
+                try:
+                    fetched = self.gqlc.get_issue_details(owner, repo, numbers)
+                except Exception as e:
+                    # the wrapper falls back to the REST calls
+                    logging.warning(u'graphql details for %s failed: %s' % (number, to_text(e)))
+                    fetched = {}
+
+                details.update(fetched)
+                # mark misses so they are not queried again
+                for x in numbers:
+                    details.setdefault(x, None)
+
+            return details.pop(number, None)
+
+    def load_issue_details(self, repopath, iw):
+        details = self.get_issue_details(repopath, iw.number)
+        if details:
+            iw.load_details(details)
+
+    def skip_issue(self, iw, repopath):
+        '''Should the issue be skipped because nothing has changed?'''
+        lmeta = self.load_triage_index(repopath, iw.number)
+
+        if not lmeta:
+            return False
+
+        now = datetime.datetime.now()
+        skip = False
+
+        if lmeta[u'updated_at'] == to_text(iw.updated_at.isoformat()):
+            skip = True
+
+        if skip:
+            if iw.is_pullrequest():
+                ua = to_text(iw.pullrequest.updated_at.isoformat())
+                if lmeta[u'updated_at'] < ua:
+                    skip = False
+
+        if skip:
+
+            # re-check ansible/ansible after
+            # a window of time since the last check.
+            lt = lmeta[u'time']
+            lt = strip_time_safely(lt)
+            delta = (now - lt)
+            delta = delta.days
+            if delta > C.DEFAULT_STALE_WINDOW:
+                msg = u'!skipping: %s' % delta
+                msg += u' days since last check'
+                logging.info(msg)
+                skip = False
+
+            # if last process time is older than
+            # last completion time on CI, we need
+            # to reprocess because the CI status has
+            # probabaly changed.
+            if skip and iw.is_pullrequest():
+                ua = to_text(iw.pullrequest.updated_at.isoformat())
+                mua = strip_time_safely(lmeta[u'updated_at'])
+                lsr = self.ci.get_last_completion_date(iw.number)
+                if (lsr and lsr > mua) or \
+                        ua > lmeta[u'updated_at']:
+                    skip = False
+
+        # was this in the stale list?
+        if skip:
+            if iw.number in self.repos[repopath][u'stale']:
+                skip = False
+
+        # always poll rebuilds till they are merged
+        if lmeta.get(u'needs_rebuild') or lmeta.get(u'admin_merge'):
+            skip = False
+
+        # do a final check on the timestamp in meta
+        if skip:
+            mts = strip_time_safely(lmeta[u'time'])
+            delta = (now - mts).days
+            if delta > C.DEFAULT_STALE_WINDOW:
+                skip = False
+
+        return skip
+
+    def triage_issue(self, repopath, issue, iw=None):
+        '''Triage a single issue and apply the resulting actions'''
+
+        repo = self.repos[repopath][u'repo']
+
+        # set the relative cachedir
+        cachedir = os.path.join(self.cachedir_base, repopath)
+
+        self.COMPONENTS = []
+        self.meta = {}
+        number = issue.number
+        self.set_resume(repopath, number)
+
+        # keep track of known issues
+        self.repos[repopath][u'processed'].append(number)
+
+        if issue.state == u'closed' and not self.ignore_state:
+            logging.info(to_text(number) + u' is closed, skipping')
+            self.timers.remove(repopath, number)
+            return
+
+        if self.only_prs and u'pull' not in issue.html_url:
+            logging.info(to_text(number) + u' is issue, skipping')
+            return
+
+        if self.only_issues and u'pull' in issue.html_url:
+            logging.info(to_text(number) + u' is pullrequest, skipping')
+            return
+
+        # users may want to re-run this issue after manual intervention
+        redo = True
+
+        # keep track of how many times this isssue has been re-done
+        loopcount = 0
+
+        # time each issue
+        its1 = datetime.datetime.now()
+
+        while redo:
+
+            # use the loopcount to check new data
+            loopcount += 1
+
+            if loopcount <= 1:
+                logging.info('starting triage for %s' % issue.html_url)
+            else:
+                # if >1 get latest data
+                logging.info('restarting triage for %s' % number)
+                issue = repo.get_issue(number)
+                iw = None
+
+            # clear redo
+            redo = False
+
+            # create the wrapper on each loop iteration
+            if iw is None:
+                iw = IssueWrapper(
+                    github=self.ghw,
+                    repo=repo,
+                    issue=issue,
+                    cachedir=cachedir,
+                    gitrepo=self.gitrepo,
+                )
+
+            if self.skip_no_update and self.skip_issue(iw, repopath):
+                msg = u'skipping: no changes since last run'
+                logging.info(msg)
+                continue
+
+            # only fetch what the plugins need for this type of issue
+            needs = self.get_plugin_requirements(iw)
+
+            # force an update on the PR data
+            if not iw.prefetched:
+                self.instrumentation.run(u'graphql_details', self.load_issue_details, repopath, iw)
+                self.instrumentation.run(u'update_pullrequest', iw.update_pullrequest)
+                self.instrumentation.run(u'prefetch', iw.prefetch, needs)
+            # build the history
+            self.instrumentation.run(u'build_history', self.build_history, iw, needs=needs)
+
+            actions = AnsibleActions()
+            self.instrumentation.run(u'process', self.process, iw)
+
+            # build up actions from the meta
+            self.instrumentation.run(u'create_actions', self.create_actions, iw, actions)
+            self.instrumentation.run(u'save_meta', self.save_meta, iw, self.meta, actions)
+
+            # DEBUG!
+            logging.info('url: %s' % iw.html_url)
+            logging.info('title: %s' % iw.title)
+            if iw.is_pullrequest():
+                for fn in iw.files:
+                    logging.info('component[f]: %s' % fn)
+            else:
+                for line in iw.template_data.get(u'component_raw', u'').split(u'\n'):
+                    logging.info('component[t]: %s' % line)
+                for fn in self.meta[u'component_filenames']:
+                    logging.info('component[m]: %s' % fn)
+
+            if self.meta[u'template_missing_sections']:
+                logging.info(
+                    u'missing sections: ' +
+                    u', '.join(self.meta[u'template_missing_sections'])
+                )
+            if self.meta[u'is_needs_revision']:
+                logging.info(u'needs_revision')
+                for msg in self.meta[u'is_needs_revision_msgs']:
+                    logging.info('needs_revision_msg: %s' % msg)
+            if self.meta[u'is_needs_rebase']:
+                logging.info('needs_rebase')
+                for msg in self.meta[u'is_needs_rebase_msgs']:
+                    logging.info('needs_rebase_msg: %s' % msg)
+
+            pprint(vars(actions))
+
+            # do the actions
+            action_meta = self.instrumentation.run(u'apply_actions', self.apply_actions, iw, actions)
+            if action_meta[u'REDO']:
+                redo = True
+
+        its2 = datetime.datetime.now()
+        td = (its2 - its1).total_seconds()
+        logging.info(u'finished triage for %s in %ss' % (to_text(iw), td))
 
     def eval_pr_param(self, pr):
         '''PR/ID can be a number, numberlist, script, jsonfile, or url'''
@@ -562,7 +1123,7 @@ class AnsibleTriage(DefaultTriager):
             pr = int(pr)
 
         elif pr.startswith(u'http'):
-            rr = requests.get(pr)
+            rr = transport.get(pr)
             numbers = rr.json()
             pr = numbers[:]
 
@@ -616,7 +1177,14 @@ class AnsibleTriage(DefaultTriager):
                             self.issue_summaries[repopath][to_text(num)] = node
 
                 else:
-                    self.issue_summaries[repopath] = self.gqlc.get_issue_summaries(rp)
+                    # only what changed since the last loop is fetched
+                    cachefile = os.path.join(
+                        self.cachedir_base, rp, u'graphql_summaries.json.gz'
+                    )
+                    self.issue_summaries[repopath] = self.gqlc.get_issue_summaries(
+                        rp,
+                        cachefile=cachefile
+                    )
             else:
                 # scrape all summaries rom www for later opchecking
 
@@ -632,6 +1200,8 @@ class AnsibleTriage(DefaultTriager):
                     cachefile=cachefile
                 )
 
+            self.summary_tables[repopath] = SummaryTable(self.issue_summaries[repopath])
+
     def save_meta(self, issuewrapper, meta, actions):
         # save the meta+actions
         dmeta = meta.copy()
@@ -669,6 +1239,7 @@ class AnsibleTriage(DefaultTriager):
             dmeta[u'pullrequest_reviews'] = []
 
         self.dump_meta(issuewrapper, dmeta)
+        self.update_triage_index(issuewrapper.repo_full_name, issuewrapper.number, dmeta)
         rfn = issuewrapper.repo_full_name
         rfn_parts = rfn.split(u'/', 1)
         namespace = rfn_parts[0]
@@ -705,6 +1276,34 @@ class AnsibleTriage(DefaultTriager):
                 return {}
         return meta
 
+    def update_triage_index(self, repopath, number, meta):
+        '''Store the fields needed to decide when to triage again'''
+        fields = {
+            u'updated_at': meta[u'updated_at'],
+            u'time': meta[u'time'],
+            u'next_check': self.get_next_check_time(meta),
+            u'needs_rebuild': bool(meta.get(u'needs_rebuild')),
+            u'admin_merge': bool(meta.get(u'admin_merge')),
+        }
+        self.adb.set_triage_index(repopath, number, **fields)
+        self.timers.set(repopath, number, fields[u'next_check'])
+        return fields
+
+    def load_triage_index(self, repopath, number, indexes=None):
+        '''Scheduling fields for an issue, indexing its meta.json if needed'''
+        if indexes is None:
+            lmeta = self.adb.get_triage_index(repopath, number)
+        else:
+            lmeta = indexes.get(number, {})
+        if lmeta:
+            return lmeta
+
+        # triaged before the index existed
+        meta = self.load_meta_by_number(repopath, number)
+        if not meta:
+            return {}
+        return self.update_triage_index(repopath, number, meta)
+
     def dump_meta(self, issuewrapper, meta):
         mfile = os.path.join(
             issuewrapper.full_cachedir,
@@ -713,6 +1312,10 @@ class AnsibleTriage(DefaultTriager):
         meta[u'time'] = to_text(datetime.datetime.now().isoformat())
         logging.info('dump meta to %s' % mfile)
 
+        # with the sqlite cache backend nothing else creates the directory
+        if not os.path.isdir(issuewrapper.full_cachedir):
+            os.makedirs(issuewrapper.full_cachedir)
+
         with io.open(mfile, 'w', encoding='utf-8') as f:
             json_dump(meta, f)
 
@@ -1574,56 +2177,46 @@ class AnsibleTriage(DefaultTriager):
     def get_stale_numbers(self, reponame):
         # https://github.com/ansible/ansibullbot/issues/458
 
-        stale = []
-        reasons = {}
-
-        for number, summary in self.issue_summaries[reponame].items():
+        now = time.time()
+        table = self.summary_tables[reponame]
+        closed = set(table.select(state=u'closed'))
+        numbers = [x for x in table.number if x not in closed]
 
-            if number in stale:
-                continue
-
-            if summary[u'state'] == u'closed':
-                continue
-
-            number = int(number)
-            mfile = os.path.join(
-                self.cachedir_base,
-                reponame,
-                u'issues',
-                to_text(number),
-                u'meta.json'
-            )
+        indexes = self.adb.get_triage_indexes(reponame)
 
-            if not os.path.isfile(mfile):
-                reasons[number] = u'%s missing' % mfile
+        stale = []
+        for number in numbers:
+            lmeta = self.load_triage_index(reponame, number, indexes=indexes)
+            if not lmeta:
                 stale.append(number)
                 continue
 
-            try:
-                with open(mfile, 'rb') as f:
-                    meta = json.load(f)
-            except ValueError as e:
-                logging.error('failed to parse %s: %s' % (to_text(mfile), to_text(e)))
-                os.remove(mfile)
-                reasons[number] = u'%s missing' % mfile
+            if lmeta[u'next_check'] is not None and lmeta[u'next_check'] <= now:
                 stale.append(number)
-                continue
-
-            ts = meta[u'time']
-            ts = strip_time_safely(ts)
-            now = datetime.datetime.now()
-            delta = (now - ts).days
 
-            if delta > C.DEFAULT_STALE_WINDOW:
-                reasons[number] = u'%s delta' % delta
-                stale.append(number)
-
-        stale = sorted(set([int(x) for x in stale]))
+        stale = sorted(set(stale))
         if 10 >= len(stale) > 0:
             logging.info(u'stale: %s' % u','.join([to_text(x) for x in stale]))
 
         return stale
 
+    def get_next_check_time(self, meta):
+        '''When could the facts change without any activity on github?'''
+        # the stale window checks use "more than N days"
+        last = meta.get(u'time') or datetime.datetime.now().isoformat()
+        checks = [
+            strip_time_safely(last) + datetime.timedelta(days=C.DEFAULT_STALE_WINDOW + 1)
+        ]
+
+        if meta.get(u'needs_info_next_check'):
+            checks.append(strip_time_safely(meta[u'needs_info_next_check']))
+
+        if meta.get(u'ci_date') and not meta.get(u'ci_stale'):
+            ci_date = strip_time_safely(meta[u'ci_date'])
+            checks.append(ci_date + datetime.timedelta(days=CI_STALE_DAYS + 1))
+
+        return time.mktime(min(checks).timetuple())
+
     def collect_repos(self):
         '''Populate the local cache of repos'''
         # this should do a few things:
@@ -1684,8 +2277,8 @@ class AnsibleTriage(DefaultTriager):
         self.update_issue_summaries(repopath=repo, issuenums=issuenums)
 
         issuecache = {}
-        numbers = self.issue_summaries[repo].keys()
-        numbers = set(int(x) for x in numbers)
+        table = self.summary_tables[repo]
+        numbers = set(table.number)
         if issuenums:
             numbers.intersection_update(issuenums)
             numbers = list(numbers)
@@ -1694,19 +2287,9 @@ class AnsibleTriage(DefaultTriager):
         if self.daemonize:
 
             if not self.repos[repo][u'since']:
-                ts = [
-                    x[1][u'updated_at'] for x in
-                    self.issue_summaries[repo].items()
-                    if x[1][u'updated_at']
-                ]
-                ts += [
-                    x[1][u'created_at'] for x in
-                    self.issue_summaries[repo].items()
-                    if x[1][u'created_at']
-                ]
-                ts = sorted(set(ts))
+                ts = table.latest_timestamp()
                 if ts:
-                    self.repos[repo][u'since'] = ts[-1]
+                    self.repos[repo][u'since'] = ts
             else:
                 since = strip_time_safely(self.repos[repo][u'since'])
                 api_since = self.repos[repo][u'repo'].get_issues(since=since)
@@ -1723,9 +2306,7 @@ class AnsibleTriage(DefaultTriager):
                     (len(numbers), since)
                 )
 
-                for k, v in self.issue_summaries[repo].items():
-                    if v[u'created_at'] > self.repos[repo][u'since']:
-                        numbers.append(k)
+                numbers += table.select(created_after=self.repos[repo][u'since'])
 
                 numbers = sorted(set(numbers))
                 logging.info(
@@ -1752,25 +2333,15 @@ class AnsibleTriage(DefaultTriager):
 
         # filter just the open numbers
         if not self.only_closed and not self.ignore_state:
-            numbers = [
-                x for x in numbers
-                if (to_text(x) in self.issue_summaries[repo] and
-                self.issue_summaries[repo][to_text(x)][u'state'] == u'open')
-            ]
+            numbers = table.select(numbers, state=u'open')
             logging.info('%s numbers after checking state' % len(numbers))
 
         # filter by type
         if self.only_issues:
-            numbers = [
-                x for x in numbers
-                if self.issue_summaries[repo][to_text(x)][u'type'] == u'issue'
-            ]
+            numbers = table.select(numbers, itype=u'issue')
             logging.info('%s numbers after checking type' % len(numbers))
         elif self.only_prs:
-            numbers = [
-                x for x in numbers
-                if self.issue_summaries[repo][to_text(x)][u'type'] == u'pullrequest'
-            ]
+            numbers = table.select(numbers, itype=u'pullrequest')
             logging.info('%s numbers after checking type' % len(numbers))
 
         numbers = sorted(set([int(x) for x in numbers]))
@@ -1795,6 +2366,11 @@ class AnsibleTriage(DefaultTriager):
         # clear the actions+meta
         self.meta = MetaDict()
 
+        if self.no_fact_memo:
+            self.fact_memo = None
+        else:
+            self.fact_memo = FactMemo(store=iw.store, repo=iw.repo_full_name, number=iw.number)
+
         self.meta[u'state'] = iw.state
         self.meta[u'submitter'] = iw.submitter
 
@@ -1820,7 +2396,7 @@ class AnsibleTriage(DefaultTriager):
         # get ansible version
         if iw.is_issue():
             self.meta[u'ansible_version'] = \
-                self.get_ansible_version_by_issue(iw)
+                self.run_plugin(self.get_ansible_version_by_issue, iw)
         else:
             # use the submit date's current version
             self.meta[u'ansible_version'] = \
@@ -1841,7 +2417,10 @@ class AnsibleTriage(DefaultTriager):
 
         # what component(s) is this about?
         self.meta.update(
-            get_component_match_facts(
+            self.run_memoized_plugin(
+                iw,
+                self.valid_labels,
+                get_component_match_facts,
                 iw,
                 self.component_matcher,
                 self.valid_labels
@@ -1850,7 +2429,10 @@ class AnsibleTriage(DefaultTriager):
 
         # collections?
         self.meta.update(
-            get_collection_facts(
+            self.run_memoized_plugin(
+                iw,
+                self.meta,
+                get_collection_facts,
                 iw,
                 self.component_matcher,
                 self.meta,
@@ -1858,23 +2440,24 @@ class AnsibleTriage(DefaultTriager):
         )
 
         # python3 ?
-        self.meta.update(get_python3_facts(iw))
+        self.meta.update(self.run_plugin(get_python3_facts, iw))
 
         # backports
-        self.meta.update(get_backport_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_backport_facts, iw, self.meta))
 
         # performance
-        self.meta.update(get_performance_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_performance_facts, iw, self.meta))
 
         # traceback
-        self.meta.update(get_traceback_facts(iw))
+        self.meta.update(self.run_plugin(get_traceback_facts, iw))
 
         # small_patch
-        self.meta.update(get_small_patch_facts(iw))
+        self.meta.update(self.run_plugin(get_small_patch_facts, iw))
 
         # shipit?
         self.meta.update(
-            get_needs_revision_facts(
+            self.run_plugin(
+                get_needs_revision_facts,
                 self,
                 iw,
                 self.meta,
@@ -1884,7 +2467,8 @@ class AnsibleTriage(DefaultTriager):
 
         # needs_contributor?
         self.meta.update(
-            get_needs_contributor_facts(
+            self.run_plugin(
+                get_needs_contributor_facts,
                 self,
                 iw,
                 self.meta,
@@ -1892,22 +2476,25 @@ class AnsibleTriage(DefaultTriager):
         )
 
         # who needs to be notified or assigned?
-        self.meta.update(get_notification_facts(iw, self.meta, botmeta=self.botmeta))
+        self.meta.update(self.run_plugin(get_notification_facts, iw, self.meta, botmeta=self.botmeta))
 
         # ci_verified and test results
         self.meta.update(
-            get_shippable_run_facts(iw, self.meta, self.ci)
+            self.run_plugin(get_shippable_run_facts, iw, self.meta, self.ci)
         )
 
         # needsinfo?
-        self.meta[u'is_needs_info'] = is_needsinfo(self, iw)
-        self.meta.update(self.process_comment_commands(iw, self.meta))
-        self.meta.update(needs_info_template_facts(iw, self.meta))
-        self.meta.update(needs_info_timeout_facts(iw, self.meta))
+        self.meta[u'is_needs_info'] = self.run_plugin(is_needsinfo, self, iw)
+        self.meta.update(self.run_plugin(self.process_comment_commands, iw, self.meta))
+        self.meta.update(self.run_plugin(needs_info_template_facts, iw, self.meta))
+        self.meta.update(self.run_plugin(needs_info_timeout_facts, iw, self.meta))
 
         # who is this person?
         self.meta.update(
-            get_submitter_facts(
+            self.run_memoized_plugin(
+                iw,
+                self.meta,
+                get_submitter_facts,
                 iw,
                 self.meta,
                 self.module_indexer.emails_cache,
@@ -1917,22 +2504,26 @@ class AnsibleTriage(DefaultTriager):
 
         # shipit?
         self.meta.update(
-            get_shipit_facts(
+            self.run_memoized_plugin(
+                iw,
+                [self.meta, self.ansible_core_team],
+                get_shipit_facts,
                 iw, self.meta, self.module_indexer.botmeta[u'files'],
                 core_team=self.ansible_core_team, botnames=self.BOTNAMES
             )
         )
-        self.meta.update(get_review_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_review_facts, iw, self.meta))
 
         # bot_status needed?
-        self.meta.update(get_bot_status_facts(iw, self.module_indexer.all_maintainers, core_team=self.ansible_core_team, bot_names=self.BOTNAMES))
+        self.meta.update(self.run_plugin(get_bot_status_facts, iw, self.module_indexer.all_maintainers, core_team=self.ansible_core_team, bot_names=self.BOTNAMES))
 
         # who is this waiting on?
-        self.meta.update(self.waiting_on(iw, self.meta))
+        self.meta.update(self.run_plugin(self.waiting_on, iw, self.meta))
 
         # community label manipulation
         self.meta.update(
-            get_label_command_facts(
+            self.run_plugin(
+                get_label_command_facts,
                 iw,
                 self.meta,
                 self.module_indexer.all_maintainers,
@@ -1943,7 +2534,8 @@ class AnsibleTriage(DefaultTriager):
 
         # waffling overrides [label_waffling_overrides]
         self.meta.update(
-            get_waffling_overrides(
+            self.run_plugin(
+                get_waffling_overrides,
                 iw,
                 self.meta,
                 self.module_indexer.all_maintainers,
@@ -1953,22 +2545,23 @@ class AnsibleTriage(DefaultTriager):
         )
 
         # filament
-        self.meta.update(get_filament_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_filament_facts, iw, self.meta))
 
         # test_support_plugins
         self.meta.update(
-            get_test_support_plugins_facts(iw, self.component_matcher)
+            self.run_plugin(get_test_support_plugins_facts, iw, self.component_matcher)
         )
 
         # ci
-        self.meta.update(get_ci_facts(iw))
+        self.meta.update(self.run_plugin(get_ci_facts, iw))
 
         # ci rebuilds
-        self.meta.update(get_rebuild_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_rebuild_facts, iw, self.meta))
 
         # ci rebuild + merge
         self.meta.update(
-            get_rebuild_merge_facts(
+            self.run_plugin(
+                get_rebuild_merge_facts,
                 iw,
                 self.meta,
                 self.ansible_core_team,
@@ -1977,20 +2570,21 @@ class AnsibleTriage(DefaultTriager):
 
         # ci rebuild requested?
         self.meta.update(
-            get_rebuild_command_facts(
+            self.run_plugin(
+                get_rebuild_command_facts,
                 iw,
                 self.meta,
             )
         )
 
         # first time contributor?
-        self.meta.update(get_contributor_facts(iw))
+        self.meta.update(self.run_plugin(get_contributor_facts, iw))
 
         # is it deprecated?
-        self.meta.update(get_deprecation_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_deprecation_facts, iw, self.meta))
 
         # does it have a pr or does it have an issue?
-        self.meta.update(get_cross_reference_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_cross_reference_facts, iw, self.meta))
 
         # need these keys to always exist
         if u'merge_commits' not in self.meta:
@@ -2012,15 +2606,18 @@ class AnsibleTriage(DefaultTriager):
                 self.meta[u'migrated_issue_state'] = None
 
         # spam!
-        self.meta.update(get_spam_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_spam_facts, iw, self.meta))
 
         # automerge
-        self.meta.update(get_automerge_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_automerge_facts, iw, self.meta))
 
         # community working groups
-        self.meta.update(get_community_workgroup_facts(iw, self.meta))
+        self.meta.update(self.run_plugin(get_community_workgroup_facts, iw, self.meta))
 
-    def build_history(self, issuewrapper):
+        if self.fact_memo is not None:
+            self.fact_memo.save()
+
+    def build_history(self, issuewrapper, needs=None):
         '''Set the history and merge other event sources'''
         iw = issuewrapper
         iw._history = False
@@ -2033,11 +2630,57 @@ class AnsibleTriage(DefaultTriager):
                 iw._migrated_issue = mi
 
         if iw.is_pullrequest():
-            iw.history.merge_reviews(iw.reviews)
-            iw.history.merge_commits(iw.commits)
+            if needs is None or REVIEWS in needs:
+                iw.history.merge_reviews(iw.reviews)
+            if needs is None or COMMITS in needs:
+                iw.history.merge_commits(iw.commits)
 
         return iw
 
+    def get_facts_plugins(self):
+        '''Everything process() calls to build the meta'''
+        return [
+            self.get_ansible_version_by_issue,
+            get_component_match_facts,
+            get_collection_facts,
+            get_python3_facts,
+            get_backport_facts,
+            get_performance_facts,
+            get_traceback_facts,
+            get_small_patch_facts,
+            get_needs_revision_facts,
+            get_needs_contributor_facts,
+            get_notification_facts,
+            get_shippable_run_facts,
+            is_needsinfo,
+            self.process_comment_commands,
+            needs_info_template_facts,
+            needs_info_timeout_facts,
+            get_submitter_facts,
+            get_shipit_facts,
+            get_review_facts,
+            get_bot_status_facts,
+            self.waiting_on,
+            get_label_command_facts,
+            get_waffling_overrides,
+            get_filament_facts,
+            get_test_support_plugins_facts,
+            get_ci_facts,
+            get_rebuild_facts,
+            get_rebuild_merge_facts,
+            get_rebuild_command_facts,
+            get_contributor_facts,
+            get_deprecation_facts,
+            get_cross_reference_facts,
+            get_spam_facts,
+            get_automerge_facts,
+            get_community_workgroup_facts,
+        ]
+
+    def get_plugin_requirements(self, iw):
+        '''The issue data the facts plugins will read for this issue'''
+        return get_requirements(self.get_facts_plugins(), is_pullrequest=iw.is_pullrequest())
+
     def guess_issue_type(self, issuewrapper):
         iw = issuewrapper
 
@@ -2111,6 +2754,7 @@ class AnsibleTriage(DefaultTriager):
         )
         return mw
 
+    @requires(HISTORY)
     def process_comment_commands(self, issuewrapper, meta):
 
         vcommands = [x for x in self.VALID_COMMANDS]
@@ -2207,6 +2851,7 @@ class AnsibleTriage(DefaultTriager):
 
         return commands
 
+    @requires()
     def waiting_on(self, issuewrapper, meta):
         iw = issuewrapper
         wo = None
@@ -2233,6 +2878,7 @@ class AnsibleTriage(DefaultTriager):
 
         return {u'waiting_on': wo}
 
+    @requires(HISTORY)
     def get_ansible_version_by_issue(self, iw):
         aversion = None
 
@@ -2400,6 +3046,38 @@ class AnsibleTriage(DefaultTriager):
         parser.add_argument('--ignore_galaxy', action='store_true',
                             help='do not index or search for components in galaxy')
 
+        parser.add_argument('--daemonize_sweep', action='store_true',
+                            help='daemon mode triages every number in order '
+                                 'instead of by priority')
+
+        parser.add_argument('--daemonize_poll', type=int, default=30,
+                            help='seconds between checks for new activity '
+                                 'when daemon mode triages by priority')
+
+        parser.add_argument('--post_instrumentation', action='store_true',
+                            help='send the per run stage timing report to the receiver')
+
+        parser.add_argument('--workers', type=int, default=1,
+                            help='triage in N forked processes sharing one '
+                                 'set of indexers [1=disabled]')
+
+        parser.add_argument('--no_fact_memo', action='store_true',
+                            help='always rerun the facts plugins instead of '
+                                 'reusing results for unchanged inputs')
+
+        parser.add_argument('--no_http_cache', action='store_true',
+                            help='do not send conditional requests for github '
+                                 'api reads or cache their responses')
+
+        parser.add_argument('--graphql_batch', type=int, default=0,
+                            help='fetch the timeline, reviews, commits and files '
+                                 'of N issues per graphql query [0=disabled]')
+
+        parser.add_argument('--prefetch', type=int, default=0,
+                            help='fetch github data for the next N issues in '
+                                 'the background while triaging, ignored with '
+                                 '--workers [0=disabled]')
+
         return parser
 
     def get_resume(self):
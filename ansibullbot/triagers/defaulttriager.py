@@ -39,7 +39,7 @@ import ansibullbot.constants as C
 from ansibullbot._pickle_compat import pickle_dump, pickle_load
 from ansibullbot._text_compat import to_text
 from ansibullbot.decorators.github import RateLimited
-from ansibullbot.wrappers.ghapiwrapper import GithubWrapper
+from ansibullbot.wrappers.ghapiwrapper import GithubWrapper, wrap_requester
 from ansibullbot.wrappers.issuewrapper import IssueWrapper
 from ansibullbot.utils.logs import set_logger
 
@@ -162,13 +162,14 @@ class DefaultTriager(object):
     def _connect(self):
         """Connects to GitHub's API"""
         if self.github_token:
-            return Github(base_url=self.github_url, login_or_token=self.github_token)
+            gh = Github(base_url=self.github_url, login_or_token=self.github_token)
         else:
-            return Github(
+            gh = Github(
                 base_url=self.github_url,
                 login_or_token=self.github_user,
                 password=self.github_pass
             )
+        return wrap_requester(gh)
 
     def is_pr(self, issue):
         if '/pull/' in issue.html_url:
@@ -326,40 +327,79 @@ class DefaultTriager(object):
     def execute_actions(self, iw, actions):
         """Turns the actions into API calls"""
 
+        actor = self.BOTNAMES[0]
+
         for commentid in actions.uncomment:
             iw.remove_comment_by_id(commentid)
+            iw.history.remove_comment(commentid)
 
         for comment in actions.comments:
             logging.info("acton: comment - " + comment)
             iw.add_comment(comment=comment)
+            iw.history.record_event(u'commented', actor, body=comment)
 
         if actions.close:
             # https://github.com/PyGithub/PyGithub/blob/master/github/Issue.py#L263
             logging.info('action: close')
             iw.instance.edit(state='closed')
+            iw.history.record_event(u'closed', actor)
 
         else:
 
-            for unlabel in actions.unlabel:
-                logging.info('action: unlabel - ' + unlabel)
-                iw.remove_label(label=unlabel)
-            for newlabel in actions.newlabel:
-                logging.info('action: label - ' + newlabel)
-                iw.add_label(label=newlabel)
-
-            for user in actions.assign:
-                logging.info('action: assign - ' + user)
-                iw.assign_user(user)
-
-            for user in actions.unassign:
-                logging.info('action: unassign - ' + user)
-                iw.unassign_user(user)
+            current = [x for x in iw.labels]
+            labels = self.compile_labels(current, actions)
+            if labels is not None:
+                added = [x for x in labels if x not in current]
+                removed = [x for x in current if x not in labels]
+                if added:
+                    logging.info('action: label - %s' % u', '.join(added))
+                    iw.add_labels(added)
+                # there is no bulk delete, and replacing the whole set
+                # would drop labels added since the issue was fetched
+                for label in removed:
+                    logging.info('action: unlabel - %s' % label)
+                    iw.remove_label(label=label)
+                for label in removed:
+                    iw.history.record_event(u'unlabeled', actor, label=label)
+                for label in added:
+                    iw.history.record_event(u'labeled', actor, label=label)
+
+            current = [x for x in iw.assignees]
+            assignees = self.compile_assignees(current, actions)
+            if assignees is not None:
+                logging.info('action: assignees - %s' % u', '.join(assignees))
+                iw.set_assignees(assignees)
+                for user in assignees:
+                    if user not in current:
+                        iw.history.record_event(u'assigned', actor, assignee=user, assigner=actor)
+                for user in current:
+                    if user not in assignees:
+                        iw.history.record_event(u'unassigned', actor, assignee=user, assigner=actor)
 
             if actions.merge:
                 iw.merge()
 
-        # FIXME why?
-        self.build_history(iw)
+    @staticmethod
+    def compile_labels(current, actions):
+        """The labels after the actions, None if nothing would change"""
+        labels = [x for x in current if x not in actions.unlabel]
+        for label in actions.newlabel:
+            if label not in labels:
+                labels.append(label)
+        if sorted(labels) == sorted(current):
+            return None
+        return labels
+
+    @staticmethod
+    def compile_assignees(current, actions):
+        """The assignees after the actions, None if nothing would change"""
+        assignees = [x for x in current if x not in actions.unassign]
+        for user in actions.assign:
+            if user not in assignees:
+                assignees.append(user)
+        if sorted(assignees) == sorted(current):
+            return None
+        return assignees
 
     #@RateLimited
     def is_pr_merged(self, number, repo):
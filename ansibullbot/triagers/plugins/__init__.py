@@ -0,0 +1,41 @@
+'''
+Facts plugins declare the issue data they read with the requires
+decorator. The triager fetches the union of those needs for an issue in
+one batch before any plugin runs, instead of each plugin triggering its
+own lazy fetches on the wrapper.
+'''
+
+# the timeline, comments and labels events
+HISTORY = u'history'
+# the pullrequest object itself, base/head refs and mergeable state
+PULLREQUEST = u'pullrequest'
+# commit statuses, which carry the CI state
+PR_STATUS = u'pr_status'
+REVIEWS = u'reviews'
+# commits, merge commits and committer emails
+COMMITS = u'commits'
+# changed and renamed files
+FILES = u'files'
+
+ALL = frozenset([HISTORY, PULLREQUEST, PR_STATUS, REVIEWS, COMMITS, FILES])
+
+# data that plain issues do not have
+PULLREQUEST_ONLY = frozenset([PULLREQUEST, PR_STATUS, REVIEWS, COMMITS, FILES])
+
+
+def requires(*needs):
+    '''Declare the issue data a plugin reads'''
+    def decorator(func):
+        func.requires = frozenset(needs)
+        return func
+    return decorator
+
+
+def get_requirements(plugins, is_pullrequest=True):
+    '''The union of what the plugins need, undeclared plugins need everything'''
+    needs = set()
+    for plugin in plugins:
+        needs.update(getattr(plugin, u'requires', ALL))
+    if not is_pullrequest:
+        needs.difference_update(PULLREQUEST_ONLY)
+    return needs
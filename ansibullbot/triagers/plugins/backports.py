@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+from ansibullbot.triagers.plugins import PULLREQUEST, requires
 
+
+@requires(PULLREQUEST)
 def get_backport_facts(issuewrapper, meta):
     # https://github.com/ansible/ansibullbot/issues/367
 
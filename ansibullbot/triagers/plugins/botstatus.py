@@ -1,3 +1,7 @@
+from ansibullbot.triagers.plugins import HISTORY, requires
+
+
+@requires(HISTORY)
 def get_bot_status_facts(issuewrapper, all_maintainers, core_team=[], bot_names=[]):
     iw = issuewrapper
     bs = False
@@ -1,6 +1,8 @@
 from ansibullbot.utils.shippable_api import ShippableCI
+from ansibullbot.triagers.plugins import COMMITS, HISTORY, PR_STATUS, requires
 
 
+@requires(PR_STATUS)
 def get_ci_facts(iw):
     cifacts = {
         u'ci_run_number': None
@@ -19,6 +21,7 @@ def get_ci_facts(iw):
     return {'ci_run_number': last_run[u'run_id']}
 
 
+@requires()
 def get_rebuild_facts(iw, meta, force=False):
     rbmeta = {
         u'needs_rebuild': False,
@@ -65,6 +68,7 @@ def _get_last_command(iw, command, username):
 
 
 # https://github.com/ansible/ansibullbot/issues/640
+@requires(HISTORY, COMMITS, PR_STATUS)
 def get_rebuild_merge_facts(iw, meta, core_team):
     rbmerge_meta = {
         u'needs_rebuild': meta.get(u'needs_rebuild', False),
@@ -111,6 +115,7 @@ def get_rebuild_merge_facts(iw, meta, core_team):
 
 
 # https://github.com/ansible/ansibullbot/issues/1161
+@requires(HISTORY, COMMITS, PR_STATUS)
 def get_rebuild_command_facts(iw, meta):
     rbmerge_meta = {
         u'needs_rebuild': meta.get(u'needs_rebuild', False),
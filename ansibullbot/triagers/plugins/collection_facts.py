@@ -3,8 +3,10 @@
 import copy
 import json
 import os
+from ansibullbot.triagers.plugins import FILES, HISTORY, PULLREQUEST, requires
 
 
+@requires(HISTORY, PULLREQUEST, FILES)
 def get_collection_facts(iw, component_matcher, meta):
 
     # Skip redirection of backports or <2.10 issues ...
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+from ansibullbot.triagers.plugins import HISTORY, requires
 
+
+@requires(HISTORY)
 def get_community_workgroup_facts(issuewrapper, meta):
 
     # https://github.com/ansible/ansibullbot/issues/820
@@ -2,8 +2,10 @@
 
 import logging
 import re
+from ansibullbot.triagers.plugins import COMMITS, FILES, HISTORY, requires
 
 
+@requires(HISTORY, FILES, COMMITS)
 def get_component_match_facts(iw, component_matcher, valid_labels):
     '''High level abstraction for matching components to repo files'''
 
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 
 import logging
+from ansibullbot.triagers.plugins import PULLREQUEST, requires
 
 
+@requires(PULLREQUEST)
 def get_contributor_facts(issuewrapper):
 
     # https://github.com/blog/2397-making-it-easier-to-grow-communities-on-github
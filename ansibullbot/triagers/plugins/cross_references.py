@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+from ansibullbot.triagers.plugins import HISTORY, requires
 
+
+@requires(HISTORY)
 def get_cross_reference_facts(issuewrapper, meta):
 
     iw = issuewrapper
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 
 import os
+from ansibullbot.triagers.plugins import requires
 
 
+@requires()
 def get_deprecation_facts(issuewrapper, meta):
     # https://github.com/ansible/ansibullbot/issues/29
 
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+from ansibullbot.triagers.plugins import FILES, requires
 
+
+@requires(FILES)
 def get_filament_facts(issuewrapper, meta):
     # https://github.com/ansible/ansible/pull/26921
 
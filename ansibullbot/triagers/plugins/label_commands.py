@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+from ansibullbot.triagers.plugins import HISTORY, requires
 
+
+@requires(HISTORY)
 def get_label_command_facts(issuewrapper, meta, all_maintainers, core_team=[], valid_labels=[]):
 
     iw = issuewrapper
@@ -96,6 +99,7 @@ def get_label_command_facts(issuewrapper, meta, all_maintainers, core_team=[], v
     return fact
 
 
+@requires(HISTORY)
 def get_waffling_overrides(issuewrapper, meta, all_maintainers, core_team=[], valid_labels=[]):
 
     iw = issuewrapper
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+from ansibullbot.triagers.plugins import HISTORY, requires
 
+
+@requires(HISTORY)
 def get_needs_contributor_facts(triager, issuewrapper, meta):
     needs_contributor = False
 
@@ -4,8 +4,10 @@ import datetime
 import logging
 import pytz
 import ansibullbot.constants as C
+from ansibullbot.triagers.plugins import HISTORY, requires
 
 
+@requires(HISTORY)
 def is_needsinfo(triager, issue):
 
     needs_info = False
@@ -63,6 +65,7 @@ def is_needsinfo(triager, issue):
     return needs_info
 
 
+@requires(HISTORY)
 def needs_info_template_facts(iw, meta):
 
     nifacts = {
@@ -109,6 +112,7 @@ def needs_info_template_facts(iw, meta):
     return nifacts
 
 
+@requires(HISTORY)
 def needs_info_timeout_facts(iw, meta):
 
     # warn at 30 days
@@ -117,7 +121,9 @@ def needs_info_timeout_facts(iw, meta):
     NI_EXPIRE = int(C.DEFAULT_NEEDS_INFO_EXPIRE - C.DEFAULT_NEEDS_INFO_WARN)
 
     nif = {
-        u'needs_info_action': None
+        u'needs_info_action': None,
+        # when the action could change if nothing happens on the issue
+        u'needs_info_next_check': None,
     }
 
     if not meta[u'is_needs_info']:
@@ -139,6 +145,7 @@ def needs_info_timeout_facts(iw, meta):
     md_bpd = iw.history.last_date_for_boilerplate(u'issue_missing_data')
 
     now = pytz.utc.localize(datetime.datetime.now())
+    next_check = None
 
     # use the most recent date among the two templates
     bpd = None
@@ -178,9 +185,21 @@ def needs_info_timeout_facts(iw, meta):
         elif delta > NI_WARN:
             if len(bp_comments_found) == 0:
                 nif[u'needs_info_action'] = u'warn'
+            else:
+                next_check = bpd + datetime.timedelta(days=NI_EXPIRE)
+        elif len(bp_comments_found) >= 1:
+            next_check = bpd + datetime.timedelta(days=NI_EXPIRE)
+        else:
+            next_check = bpd + datetime.timedelta(days=min(NI_WARN + 1, NI_EXPIRE))
     else:
         delta = (now - la).days
         if delta > NI_WARN:
             nif[u'needs_info_action'] = u'warn'
+        else:
+            next_check = la + datetime.timedelta(days=NI_WARN + 1)
+
+    if next_check is not None:
+        # same clock as "now" above
+        nif[u'needs_info_next_check'] = next_check.replace(tzinfo=None).isoformat()
 
     return nif
@@ -7,11 +7,13 @@ from ansibullbot.triagers.plugins.shipit import is_approval
 from ansibullbot.utils.timetools import strip_time_safely
 
 import ansibullbot.constants as C
+from ansibullbot.triagers.plugins import COMMITS, FILES, HISTORY, PR_STATUS, PULLREQUEST, REVIEWS, requires
 
 
 CI_STALE_DAYS = 7
 
 
+@requires(HISTORY, PULLREQUEST, PR_STATUS, REVIEWS, COMMITS, FILES)
 def get_needs_revision_facts(triager, issuewrapper, meta, shippable):
     # Thanks @adityacs for this PR. This PR requires revisions, either
     # because it fails to build or by reviewer request. Please make the
@@ -32,6 +34,7 @@ def get_needs_revision_facts(triager, issuewrapper, meta, shippable):
     needs_rebase_msgs = []
     ci_state = None
     ci_stale = False
+    ci_date = None
     mstate = None
     change_requested = None
     ready_for_review = None
@@ -67,6 +70,7 @@ def get_needs_revision_facts(triager, issuewrapper, meta, shippable):
         u'change_requested': change_requested,
         u'ci_state': ci_state,
         u'ci_stale': ci_stale,
+        u'ci_date': ci_date,
         u'reviews': None,
         u'ready_for_review': ready_for_review,
         u'has_shippable_yaml': has_shippable_yaml,
@@ -346,6 +350,7 @@ def get_needs_revision_facts(triager, issuewrapper, meta, shippable):
         u'change_requested': change_requested,
         u'ci_state': ci_state,
         u'ci_stale': ci_stale,
+        u'ci_date': ci_date,
         u'reviews': iw.reviews,
         u'ready_for_review_date': ready_for_review,
         u'ready_for_review': bool(ready_for_review),
@@ -358,6 +363,8 @@ def get_needs_revision_facts(triager, issuewrapper, meta, shippable):
     }
     if rmeta[u'ready_for_review_date']:
         rmeta[u'ready_for_review_date'] = rmeta[u'ready_for_review_date'].isoformat()
+    if rmeta[u'ci_date']:
+        rmeta[u'ci_date'] = rmeta[u'ci_date'].isoformat()
 
     return rmeta
 
@@ -444,6 +451,7 @@ def _get_review_state(reviews, submitter, number=None):
     return user_reviews
 
 
+@requires(HISTORY, PR_STATUS)
 def get_shippable_run_facts(iw, meta, shippable):
     '''Does an issue need the test result comment?'''
     # https://github.com/ansible/ansibullbot/issues/312
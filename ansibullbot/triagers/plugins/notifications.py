@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 
 import logging
+from ansibullbot.triagers.plugins import COMMITS, HISTORY, requires
 
 
+@requires(HISTORY, COMMITS)
 def get_notification_facts(issuewrapper, meta, botmeta=None):
     '''Build facts about mentions/pings'''
     iw = issuewrapper
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+from ansibullbot.triagers.plugins import requires
 
+
+@requires()
 def get_performance_facts(issuewrapper, meta):
     iw = issuewrapper
 
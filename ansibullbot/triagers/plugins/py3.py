@@ -3,8 +3,10 @@
 import logging
 
 import six
+from ansibullbot.triagers.plugins import HISTORY, requires
 
 
+@requires(HISTORY)
 def get_python3_facts(issuewrapper):
     '''Is the issue related to python3?'''
     iw = issuewrapper
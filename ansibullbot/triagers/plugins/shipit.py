@@ -5,6 +5,7 @@ import logging
 from fnmatch import fnmatch
 
 import ansibullbot.constants as C
+from ansibullbot.triagers.plugins import FILES, HISTORY, requires
 
 
 def replace_ansible(maintainers, ansible_members, bots=[]):
@@ -34,6 +35,7 @@ def is_rebuild_merge(body):
     return u'rebuild_merge' in lines
 
 
+@requires()
 def get_automerge_facts(issuewrapper, meta):
     '''Can this be automerged? If not, why?'''
 
@@ -179,6 +181,7 @@ def needs_community_review(meta, issue):
     return True
 
 
+@requires()
 def get_review_facts(issuewrapper, meta):
     # Thanks @jpeck-resilient for this new module. When this module
     # receives 'shipit' comments from two community members and any
@@ -225,6 +228,7 @@ def get_review_facts(issuewrapper, meta):
     return rfacts
 
 
+@requires(HISTORY, FILES)
 def get_shipit_facts(issuewrapper, inmeta, botmeta_files, core_team=[], botnames=[]):
     """ Count shipits by maintainers/community/other """
 
@@ -500,6 +504,7 @@ def get_supported_by(issuewrapper, meta):
     return supported_by
 
 
+@requires()
 def get_submitter_facts(issuewrapper, meta, emails_cache, component_matcher):
     '''Summary stats of submitter's commit history'''
     sfacts = {
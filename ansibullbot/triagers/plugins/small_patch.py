@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import re
+from ansibullbot.triagers.plugins import COMMITS, requires
 
 
 FILE_MAX_CHANGED_LINES = 6
@@ -22,6 +23,7 @@ class CommitFile:
         return self.raw_data.get('changes')
 
 
+@requires(COMMITS)
 def get_small_patch_facts(iw):
     sfacts = {
         u'is_small_patch': False
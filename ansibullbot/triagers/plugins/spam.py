@@ -1,6 +1,8 @@
 import ansibullbot.constants as C
+from ansibullbot.triagers.plugins import HISTORY, requires
 
 
+@requires(HISTORY)
 def get_spam_facts(issuewrapper, meta):
 
     iw = issuewrapper
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import os.path
+from ansibullbot.triagers.plugins import FILES, requires
 
 
 # https://github.com/ansible/ansible/pull/46028
@@ -10,6 +11,7 @@ import os.path
 # https://github.com/ansible/ansible/pull/69326
 
 
+@requires(FILES)
 def get_test_support_plugins_facts(iw, component_matcher):
     tmeta = {
         u'test_support_plugins': {}
@@ -1,11 +1,13 @@
 #!/usr/bin/env python
 
 import re
+from ansibullbot.triagers.plugins import requires
 
 
 RE_FILE_LINE = r'file "(.*)", line \d+, in'
 
 
+@requires()
 def get_traceback_facts(iw):
     tfacts = {
         u'has_traceback': False
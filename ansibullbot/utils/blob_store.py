@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+'''
+A size bounded, content addressed store for cached api responses.
+
+Responses are stored once per distinct body as a gzipped json blob
+named by its sha256, so identical responses for different urls share
+a blob. An sqlite index maps each key to its blob and records when it
+was last used.
+
+When the blobs outgrow the byte budget the least recently used keys
+are dropped, along with the blobs no other key refers to, until the
+store is back under the low watermark. Pinned keys, like commits that
+can never change, are not evicted.
+'''
+
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from ansibullbot._text_compat import to_bytes, to_text
+import ansibullbot.utils.instrumentation as instrumentation
+
+
+INDEX_FILE = u'index.sqlite'
+
+# eviction stops once the blobs fit in this share of the budget
+LOW_WATERMARK = 0.9
+
+
+class BlobStore(object):
+
+    SCHEMA = (
+        u'''
+        CREATE TABLE IF NOT EXISTS refs (
+            key TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            atime REAL NOT NULL,
+            pinned INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        u'CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest)',
+        u'CREATE INDEX IF NOT EXISTS refs_atime ON refs (pinned, atime)',
+        u'''
+        CREATE TABLE IF NOT EXISTS blobs (
+            digest TEXT PRIMARY KEY,
+            size INTEGER NOT NULL
+        )
+        ''',
+        u'''
+        CREATE TABLE IF NOT EXISTS totals (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        ''',
+        # the running total of the blob sizes, summed once for older indexes
+        u'''
+        INSERT OR IGNORE INTO totals (name, value)
+        SELECT 'bytes', COALESCE(SUM(size), 0) FROM blobs
+        ''',
+    )
+
+    def __init__(self, cachedir, max_bytes=None):
+        self.cachedir = cachedir
+        self.max_bytes = max_bytes
+        self.dbfile = os.path.join(cachedir, INDEX_FILE)
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        self.evicted = {u'keys': 0, u'blobs': 0, u'bytes': 0}
+        # a connection per thread, forked workers open their own
+        self._local = threading.local()
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, u'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.dbfile, timeout=60, isolation_level=None)
+            conn.execute(u'PRAGMA journal_mode=WAL')
+            conn.execute(u'PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        conn = self.connection
+        conn.execute(u'BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute(u'ROLLBACK')
+            raise
+        conn.execute(u'COMMIT')
+
+    def blobpath(self, digest):
+        return os.path.join(self.cachedir, digest[:2], digest + u'.json.gz')
+
+    def get(self, key, default=None):
+        row = self.connection.execute(
+            u'SELECT digest FROM refs WHERE key=?', (key,)
+        ).fetchone()
+        if row is None:
+            return default
+
+        path = self.blobpath(row[0])
+        try:
+            with gzip.open(path, 'r') as f:
+                data = json.loads(to_text(f.read()))
+        except Exception as e:
+            logging.error(u'failed to load %s: %s' % (path, to_text(e)))
+            self.delete(key)
+            return default
+
+        self.connection.execute(
+            u'UPDATE refs SET atime=? WHERE key=?', (time.time(), key)
+        )
+        return data
+
+    def set(self, key, data, pinned=False):
+        '''Store the data of a key, pinned keys are never evicted'''
+        body = to_bytes(json.dumps(data, sort_keys=True))
+        digest = to_text(hashlib.sha256(body).hexdigest())
+
+        # blob files are written and removed while holding the index's
+        # write lock, so a concurrent eviction can not remove a blob
+        # that is being referenced again
+        path = self.blobpath(digest)
+        with self.transaction() as conn:
+            row = conn.execute(u'SELECT size FROM blobs WHERE digest=?', (digest,)).fetchone()
+            added = row is None
+            if added or not os.path.isfile(path):
+                self._write_blob(path, body)
+            if added:
+                size = os.path.getsize(path)
+                conn.execute(u'INSERT INTO blobs (digest, size) VALUES (?, ?)', (digest, size))
+                conn.execute(u"UPDATE totals SET value=value+? WHERE name='bytes'", (size,))
+            old = conn.execute(u'SELECT digest FROM refs WHERE key=?', (key,)).fetchone()
+            conn.execute(
+                u'INSERT OR REPLACE INTO refs (key, digest, atime, pinned) VALUES (?, ?, ?, ?)',
+                (key, digest, time.time(), int(bool(pinned)))
+            )
+            self._drop_orphans(conn, [old[0]] if old and old[0] != digest else [])
+
+        if added and self.max_bytes and self.size() > self.max_bytes:
+            self.evict()
+
+    def delete(self, key):
+        with self.transaction() as conn:
+            row = conn.execute(u'SELECT digest FROM refs WHERE key=?', (key,)).fetchone()
+            if row is None:
+                return
+            conn.execute(u'DELETE FROM refs WHERE key=?', (key,))
+            self._drop_orphans(conn, [row[0]])
+
+    def size(self):
+        '''Bytes used by the blobs'''
+        row = self.connection.execute(u"SELECT value FROM totals WHERE name='bytes'").fetchone()
+        return row[0] if row else 0
+
+    def _write_blob(self, path, body):
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        tmpfile = u'%s.%s.tmp' % (path, os.getpid())
+        with gzip.open(tmpfile, 'w') as f:
+            f.write(body)
+        os.rename(tmpfile, path)
+
+    def _drop_orphans(self, conn, digests):
+        '''Remove the blobs no key refers to anymore'''
+        orphans = []
+        for digest in digests:
+            if conn.execute(u'SELECT 1 FROM refs WHERE digest=? LIMIT 1', (digest,)).fetchone():
+                continue
+            row = conn.execute(u'SELECT size FROM blobs WHERE digest=?', (digest,)).fetchone()
+            if row is None:
+                continue
+            conn.execute(u'DELETE FROM blobs WHERE digest=?', (digest,))
+            conn.execute(u"UPDATE totals SET value=value-? WHERE name='bytes'", (row[0],))
+            path = self.blobpath(digest)
+            if os.path.isfile(path):
+                os.remove(path)
+            orphans.append((digest, row[0]))
+        return orphans
+
+    def evict(self, max_bytes=None):
+        '''Drop the least recently used keys until the blobs fit the budget'''
+        max_bytes = max_bytes or self.max_bytes
+        if not max_bytes:
+            return self.stats()
+
+        target = int(max_bytes * LOW_WATERMARK)
+        keys = 0
+        orphans = []
+        with self.transaction() as conn:
+            total = self.size()
+            rows = conn.execute(
+                u'SELECT key, digest FROM refs WHERE pinned=0 ORDER BY atime'
+            ).fetchall()
+            for key, digest in rows:
+                if total <= target:
+                    break
+                conn.execute(u'DELETE FROM refs WHERE key=?', (key,))
+                keys += 1
+                for orphan in self._drop_orphans(conn, [digest]):
+                    orphans.append(orphan)
+                    total -= orphan[1]
+
+        freed = sum(x[1] for x in orphans)
+        self.evicted[u'keys'] += keys
+        self.evicted[u'blobs'] += len(orphans)
+        self.evicted[u'bytes'] += freed
+        instrumentation.count(u'cache_evict', keys)
+
+        if keys:
+            logging.info(u'evicted %s keys and %s blobs (%s bytes) from %s' % (
+                keys, len(orphans), freed, self.cachedir))
+        if total > target:
+            logging.warning(u'%s holds %s bytes of pinned blobs, over its %s byte budget' % (
+                self.cachedir, total, max_bytes))
+
+        return self.stats()
+
+    def stats(self):
+        conn = self.connection
+        return {
+            u'keys': conn.execute(u'SELECT COUNT(*) FROM refs').fetchone()[0],
+            u'pinned': conn.execute(u'SELECT COUNT(*) FROM refs WHERE pinned=1').fetchone()[0],
+            u'blobs': conn.execute(u'SELECT COUNT(*) FROM blobs').fetchone()[0],
+            u'bytes': self.size(),
+            u'max_bytes': self.max_bytes,
+            u'evicted_keys': self.evicted[u'keys'],
+            u'evicted_blobs': self.evicted[u'blobs'],
+            u'evicted_bytes': self.evicted[u'bytes'],
+        }
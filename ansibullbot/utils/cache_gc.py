@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+'''
+Garbage collection of the issue caches.
+
+Closed and merged issues are not triaged again, but their directories
+and store entries were kept forever. The collector uses the issue
+summaries to find the issues closed for longer than the retention
+window and archives or deletes their caches. With a byte budget it
+also collects more recently closed issues, oldest first, until the
+repo's cache fits. Open issues are never collected.
+
+An archive segment is a tar.gz per collection under
+<repo cachedir>/archive with the files of each collected issue and its
+store entries, restore() puts an issue back if it is reopened.
+'''
+
+import datetime
+import glob
+import io
+import logging
+import os
+import shutil
+import tarfile
+import time
+
+from ansibullbot._pickle_compat import pickle_dumps, pickle_loads
+from ansibullbot._text_compat import to_text
+from ansibullbot.utils.cache_store import get_store
+from ansibullbot.utils.summary_table import to_epoch
+
+
+ARCHIVE_DIR = u'archive'
+STORE_MEMBER = u'cache_store.pickle'
+CLOSED_STATES = (u'closed', u'merged')
+
+
+def dir_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for fn in files:
+            try:
+                total += os.path.getsize(os.path.join(root, fn))
+            except OSError:
+                pass
+    return total
+
+
+def last_modified(path):
+    '''Newest mtime of the files under a directory, 0 if there are none'''
+    mtimes = [0]
+    for root, dirs, files in os.walk(path):
+        for fn in files:
+            try:
+                mtimes.append(os.path.getmtime(os.path.join(root, fn)))
+            except OSError:
+                pass
+    return max(mtimes)
+
+
+class CacheCollector(object):
+    '''Archive or delete the caches of a repo's long closed issues'''
+
+    def __init__(self, repodir, repo, store=None):
+        self.repodir = repodir
+        self.repo = repo
+        self.store = store or get_store(repodir)
+        self.issuesdir = os.path.join(repodir, u'issues')
+        self.archivedir = os.path.join(repodir, ARCHIVE_DIR)
+
+    def issuedir(self, number):
+        return os.path.join(self.issuesdir, to_text(number))
+
+    def cached_sizes(self):
+        '''Bytes cached per issue number, in its directory and the store'''
+        sizes = dict(self.store.sizes(self.repo))
+        if os.path.isdir(self.issuesdir):
+            for dn in os.listdir(self.issuesdir):
+                if dn.isdigit():
+                    number = int(dn)
+                    sizes[number] = sizes.get(number, 0) + dir_size(self.issuedir(number))
+        return sizes
+
+    def candidates(self, sizes, summaries, retention_days, max_bytes=None, now=None, keep=None):
+        '''Numbers to collect, the least recently active first
+
+        Args:
+            sizes             (dict): bytes cached per number
+            summaries   (dict/list): the repo's issue summaries
+            retention_days     (int): keep issues closed more recently than this
+            max_bytes          (int): collect closed issues until the cache fits
+            now              (float): the current epoch
+            keep          (callable): numbers it returns True for are kept
+        '''
+        if not summaries:
+            # without summaries there is no telling which issues are closed
+            return []
+        if isinstance(summaries, dict):
+            summaries = summaries.values()
+        summaries = dict((int(x[u'number']), x) for x in summaries)
+
+        now = now or time.time()
+        cutoff = now - retention_days * 86400
+
+        touched = self.store.touched(self.repo)
+
+        closed = []
+        for number in sizes:
+            if keep is not None and keep(number):
+                continue
+            summary = summaries.get(number)
+            if summary is not None and summary.get(u'state') not in CLOSED_STATES:
+                continue
+            # a full sync only returns open issues, so issues missing from
+            # the summaries or filled in as closed without an updated_at
+            # were closed, transferred or deleted at an unknown time
+            updated = to_epoch(summary.get(u'updated_at')) if summary else 0
+            if not updated:
+                updated = max(last_modified(self.issuedir(number)), touched.get(number, 0))
+            closed.append((updated, number))
+        closed.sort()
+
+        selected = [x[1] for x in closed if x[0] < cutoff]
+        if max_bytes:
+            remaining = sum(sizes.values()) - sum(sizes[x] for x in selected)
+            for updated, number in closed:
+                if remaining <= max_bytes:
+                    break
+                if updated >= cutoff:
+                    selected.append(number)
+                    remaining -= sizes[number]
+        return selected
+
+    def archive(self, numbers):
+        '''Write the caches of the issues into a new archive segment'''
+        if not os.path.isdir(self.archivedir):
+            os.makedirs(self.archivedir)
+        stamp = datetime.datetime.utcnow().strftime(u'%Y%m%dT%H%M%S')
+        path = os.path.join(self.archivedir, u'issues-%s-%s.tar.gz' % (stamp, os.getpid()))
+
+        tmpfile = path + u'.tmp'
+        with tarfile.open(tmpfile, 'w:gz') as tar:
+            for number in numbers:
+                issuedir = self.issuedir(number)
+                if os.path.isdir(issuedir):
+                    tar.add(issuedir, arcname=to_text(number))
+                entries = self.store.entries(self.repo, number)
+                if entries:
+                    data = pickle_dumps(entries)
+                    info = tarfile.TarInfo(u'%s/%s' % (number, STORE_MEMBER))
+                    info.size = len(data)
+                    info.mtime = time.time()
+                    tar.addfile(info, io.BytesIO(data))
+        os.rename(tmpfile, path)
+        return path
+
+    def restore(self, number):
+        '''Put an archived issue back into the cache, newest segment first'''
+        prefix = u'%s/' % number
+        segments = sorted(glob.glob(os.path.join(self.archivedir, u'issues-*.tar.gz')), reverse=True)
+        for segment in segments:
+            with tarfile.open(segment, 'r:gz') as tar:
+                members = [x for x in tar.getmembers() if x.isfile() and x.name.startswith(prefix)]
+                if not members:
+                    continue
+                for member in members:
+                    data = tar.extractfile(member).read()
+                    name = member.name[len(prefix):]
+                    if name == STORE_MEMBER:
+                        self.store.set_many(self.repo, number, pickle_loads(data))
+                        continue
+                    path = os.path.join(self.issuedir(number), *name.split(u'/'))
+                    if not os.path.isdir(os.path.dirname(path)):
+                        os.makedirs(os.path.dirname(path))
+                    with open(path, 'wb') as f:
+                        f.write(data)
+            logging.info(u'restored %s#%s from %s' % (self.repo, number, segment))
+            return True
+        return False
+
+    def collect(self, summaries, retention_days, max_bytes=None, archive=True,
+                dry_run=False, now=None, keep=None):
+        '''Archive or delete the caches of the long closed issues
+
+        Returns a report of the cache size and what was collected.
+        '''
+        ts = time.time()
+        sizes = self.cached_sizes()
+        numbers = self.candidates(sizes, summaries, retention_days, max_bytes=max_bytes,
+                                  now=now, keep=keep)
+
+        report = {
+            u'repo': self.repo,
+            u'issues': len(sizes),
+            u'bytes': sum(sizes.values()),
+            u'collected': len(numbers),
+            u'freed': sum(sizes[x] for x in numbers),
+            u'archive': None,
+        }
+
+        if numbers and not dry_run:
+            if archive:
+                report[u'archive'] = self.archive(numbers)
+            for number in numbers:
+                self.store.purge(self.repo, number)
+                if os.path.isdir(self.issuedir(number)):
+                    shutil.rmtree(self.issuedir(number))
+
+        logging.info(u'%s cache gc: %s of %s issues, %s of %s bytes%s in %.1fs' % (
+            self.repo,
+            report[u'collected'],
+            report[u'issues'],
+            report[u'freed'],
+            report[u'bytes'],
+            u' (dry run)' if dry_run else u'',
+            time.time() - ts,
+        ))
+        return report
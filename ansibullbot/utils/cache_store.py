@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+
+'''
+Storage for the cached data of each issue.
+
+The wrappers keep github objects and api responses under a
+(repo, number, kind) key, number 0 holds the repo wide entries.
+
+The sqlite backend keeps every entry of a repo in one database in WAL
+mode, so readers never block the writer and several entries can be
+written in one transaction. The files backend keeps the historical
+layout of a pickle or json file per entry in the issue's directory.
+'''
+
+import contextlib
+import glob
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import ansibullbot.constants as C
+from ansibullbot._pickle_compat import pickle_dump, pickle_dumps, pickle_load, pickle_loads
+from ansibullbot._text_compat import to_text
+
+
+DBFILE = u'issue_cache.sqlite'
+
+# kinds the files backend stores as json
+JSON_KINDS = (u'timeline_data', u'timeline_meta', u'pr_status_log')
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def property_kind(property_name):
+    return u'property:%s' % property_name
+
+
+def filepath_kind(filepath):
+    return u'filepath:%s' % filepath
+
+
+class FileStore(object):
+    '''A file per entry under <cachedir>/issues/<number>'''
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+
+    def issuedir(self, number):
+        if not number:
+            return self.cachedir
+        return os.path.join(self.cachedir, u'issues', to_text(number))
+
+    def filename(self, kind):
+        prefix, _, name = kind.partition(u':')
+        if prefix == u'property':
+            return u'%s.pickle' % name
+        if prefix == u'filepath':
+            return name.replace(u'.', u'_').replace(u'/', u'_') + u'.pickle'
+        if kind in JSON_KINDS:
+            return u'%s.json' % kind
+        return u'%s.pickle' % kind
+
+    def path(self, number, kind):
+        return os.path.join(self.issuedir(number), self.filename(kind))
+
+    def get(self, repo, number, kind, default=None):
+        path = self.path(number, kind)
+        if not os.path.isfile(path):
+            return default
+        try:
+            if kind in JSON_KINDS:
+                with open(path, 'r') as f:
+                    return json.loads(f.read())
+            with open(path, 'rb') as f:
+                return pickle_load(f)
+        except Exception as e:
+            logging.error(u'failed to load %s: %s' % (path, to_text(e)))
+            return default
+
+    def set(self, repo, number, kind, value):
+        path = self.path(number, kind)
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        if kind in JSON_KINDS:
+            with open(path, 'w') as f:
+                f.write(json.dumps(value))
+        else:
+            with open(path, 'wb') as f:
+                pickle_dump(value, f)
+
+    def set_many(self, repo, number, values):
+        for kind, value in values.items():
+            self.set(repo, number, kind, value)
+
+    def delete(self, repo, number, kind):
+        path = self.path(number, kind)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def numbers(self, repo, kind):
+        pattern = os.path.join(self.cachedir, u'issues', u'*', self.filename(kind))
+        return sorted([int(x.split(os.path.sep)[-2]) for x in glob.glob(pattern)])
+
+    def sizes(self, repo):
+        '''Bytes per issue kept outside the issue directories'''
+        return {}
+
+    def entries(self, repo, number):
+        '''Entries of an issue kept outside its directory, by kind'''
+        return {}
+
+    def touched(self, repo):
+        '''Epoch of the last write per issue kept outside the issue directories'''
+        return {}
+
+    def purge(self, repo, number):
+        issuedir = self.issuedir(number)
+        if number and os.path.isdir(issuedir):
+            shutil.rmtree(issuedir)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        yield self
+
+
+class SqliteStore(object):
+    '''Every entry of a repo in one sqlite database'''
+
+    SCHEMA = u'''
+        CREATE TABLE IF NOT EXISTS entries (
+            repo TEXT NOT NULL,
+            number INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            value BLOB NOT NULL,
+            updated REAL NOT NULL,
+            PRIMARY KEY (repo, number, kind)
+        )
+    '''
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        self.dbfile = os.path.join(cachedir, DBFILE)
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        # a connection per thread, forked workers open their own
+        self._local = threading.local()
+        self.connection.execute(self.SCHEMA)
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, u'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # autocommit, transactions are opened explicitly
+            conn = sqlite3.connect(self.dbfile, timeout=60, isolation_level=None)
+            conn.execute(u'PRAGMA journal_mode=WAL')
+            conn.execute(u'PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.depth = 0
+        return conn
+
+    def get(self, repo, number, kind, default=None):
+        row = self.connection.execute(
+            u'SELECT value FROM entries WHERE repo=? AND number=? AND kind=?',
+            (repo, int(number or 0), kind)
+        ).fetchone()
+        if row is None:
+            return default
+        try:
+            return pickle_loads(bytes(row[0]))
+        except Exception as e:
+            logging.error(u'failed to load %s #%s %s: %s' % (repo, number, kind, to_text(e)))
+            return default
+
+    def set(self, repo, number, kind, value):
+        self.set_many(repo, number, {kind: value})
+
+    def set_many(self, repo, number, values):
+        now = time.time()
+        rows = [
+            (repo, int(number or 0), kind, sqlite3.Binary(pickle_dumps(value)), now)
+            for kind, value in values.items()
+        ]
+        with self.transaction():
+            self.connection.executemany(
+                u'INSERT OR REPLACE INTO entries (repo, number, kind, value, updated) '
+                u'VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def delete(self, repo, number, kind):
+        with self.transaction():
+            self.connection.execute(
+                u'DELETE FROM entries WHERE repo=? AND number=? AND kind=?',
+                (repo, int(number or 0), kind)
+            )
+
+    def numbers(self, repo, kind):
+        rows = self.connection.execute(
+            u'SELECT number FROM entries WHERE repo=? AND kind=? AND number > 0 ORDER BY number',
+            (repo, kind)
+        )
+        return [x[0] for x in rows]
+
+    def sizes(self, repo):
+        '''Bytes per issue kept outside the issue directories'''
+        rows = self.connection.execute(
+            u'SELECT number, SUM(LENGTH(value)) FROM entries WHERE repo=? AND number > 0 GROUP BY number',
+            (repo,)
+        )
+        return dict(rows)
+
+    def touched(self, repo):
+        '''Epoch of the last write per issue kept outside the issue directories'''
+        rows = self.connection.execute(
+            u'SELECT number, MAX(updated) FROM entries WHERE repo=? AND number > 0 GROUP BY number',
+            (repo,)
+        )
+        return dict(rows)
+
+    def entries(self, repo, number):
+        '''Entries of an issue kept outside its directory, by kind'''
+        rows = self.connection.execute(
+            u'SELECT kind FROM entries WHERE repo=? AND number=?', (repo, int(number))
+        ).fetchall()
+        return dict((x[0], self.get(repo, number, x[0])) for x in rows)
+
+    def purge(self, repo, number):
+        '''Drop every entry of an issue, freed pages are reused by later writes'''
+        with self.transaction():
+            self.connection.execute(
+                u'DELETE FROM entries WHERE repo=? AND number=?', (repo, int(number))
+            )
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''Group writes, nested transactions join the outer one'''
+        conn = self.connection
+        if self._local.depth == 0:
+            conn.execute(u'BEGIN IMMEDIATE')
+        self._local.depth += 1
+        try:
+            yield self
+        except Exception:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.execute(u'ROLLBACK')
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.execute(u'COMMIT')
+
+
+BACKENDS = {
+    u'files': FileStore,
+    u'sqlite': SqliteStore,
+}
+
+
+def get_store(cachedir, backend=None):
+    '''The store of a repo's cachedir'''
+    backend = backend or C.DEFAULT_CACHE_BACKEND
+    key = (os.path.abspath(cachedir), backend)
+    store = _stores.get(key)
+    if store is None:
+        with _lock:
+            store = _stores.get(key)
+            if store is None:
+                store = BACKENDS[backend](cachedir)
+                _stores[key] = store
+    return store
+
+
+# files in the cachedirs that are not cache entries
+SKIP_FILES = (u'repo.pickle', u'github.pickle')
+
+
+def _legacy_entries(source, number):
+    '''The entries of the files backend for an issue, by kind'''
+    issuedir = source.issuedir(number)
+    entries = {}
+    for fn in sorted(os.listdir(issuedir)):
+        path = os.path.join(issuedir, fn)
+        if fn in SKIP_FILES or not os.path.isfile(path):
+            continue
+        name, ext = os.path.splitext(fn)
+        if ext == u'.json' and name in JSON_KINDS:
+            kind = name
+        elif ext == u'.pickle' and name in (u'issue', u'pullrequest', u'history', u'pr_status', u'fact_memo'):
+            kind = name
+        elif ext == u'.pickle':
+            # properties are [fetched, data], the file names of the
+            # filepath entries can not be mapped back to the path
+            kind = property_kind(name)
+        else:
+            continue
+
+        value = source.get(None, number, kind)
+        if value is None:
+            continue
+        if kind.startswith(u'property:') and \
+                not (isinstance(value, list) and len(value) == 2 and hasattr(value[0], u'isoformat')):
+            continue
+        entries[kind] = (path, value)
+    return entries
+
+
+def migrate(cachedir, repo, store=None, delete=False):
+    '''Import the files of a repo's cachedir into a store
+
+    Returns the number of imported entries.
+    '''
+    source = FileStore(cachedir)
+    if store is None:
+        store = get_store(cachedir, backend=u'sqlite')
+
+    numbers = [0]
+    issuesdir = os.path.join(cachedir, u'issues')
+    if os.path.isdir(issuesdir):
+        numbers += sorted([int(x) for x in os.listdir(issuesdir) if x.isdigit()])
+
+    count = 0
+    for number in numbers:
+        entries = _legacy_entries(source, number)
+        if not entries:
+            continue
+        with store.transaction():
+            store.set_many(repo, number, dict((k, v[1]) for k, v in entries.items()))
+        count += len(entries)
+        if delete:
+            for path, value in entries.values():
+                os.remove(path)
+    return count
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+'''
+Memoized facts plugin results.
+
+Plugins such as component matching and the shipit counters are pure
+functions of the issue data and the global indexes. Their results are
+stored as the fact_memo entry of the issue in the cache store, next to
+a fingerprint of those inputs, so a re-triage of an untouched issue
+becomes a lookup instead of a recomputation.
+'''
+
+import copy
+import hashlib
+import json
+
+from ansibullbot._text_compat import to_bytes, to_text
+import ansibullbot.utils.instrumentation as instrumentation
+
+
+# bump to discard memos written by older plugin code
+MEMO_VERSION = 1
+
+# the kind of the memo in the cache store
+MEMO_KIND = u'fact_memo'
+
+
+def _default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return sorted([to_text(x) for x in obj])
+    return to_text(obj)
+
+
+def fingerprint(*parts):
+    '''Stable hash of any json-ish data'''
+    data = json.dumps(parts, sort_keys=True, default=_default)
+    return to_text(hashlib.sha1(to_bytes(data)).hexdigest())
+
+
+class FactMemo(object):
+
+    def __init__(self, store=None, repo=None, number=None):
+        self.store = store
+        self.repo = repo
+        self.number = number
+        # plugin name -> (fingerprint, facts)
+        self.facts = {}
+        self.dirty = False
+        self.load()
+
+    def get(self, name, key):
+        '''The stored facts for the plugin if its inputs are unchanged'''
+        stored = self.facts.get(name)
+        if stored is None or stored[0] != key:
+            instrumentation.count(u'cache_miss')
+            return None
+        instrumentation.count(u'cache_hit')
+        # the triager mutates meta values in place
+        return copy.deepcopy(stored[1])
+
+    def set(self, name, key, facts):
+        self.facts[name] = (key, copy.deepcopy(facts))
+        self.dirty = True
+
+    def load(self):
+        if self.store is None:
+            return
+
+        data = self.store.get(self.repo, self.number, MEMO_KIND)
+        if isinstance(data, dict) and data.get(u'version') == MEMO_VERSION:
+            self.facts = data.get(u'facts', {})
+
+    def save(self):
+        if self.store is None or not self.dirty:
+            return
+
+        self.store.set(self.repo, self.number, MEMO_KIND, {u'version': MEMO_VERSION, u'facts': self.facts})
+        self.dirty = False
@@ -6,7 +6,6 @@ import os
 import tarfile
 
 import yaml
-import requests
 
 from github import Github
 
@@ -14,6 +13,7 @@ import ansibullbot.constants as C
 from ansibullbot.wrappers.ghapiwrapper import GithubWrapper
 from ansibullbot.utils.git_tools import GitRepoWrapper
 from ansibullbot.utils.timetools import strip_time_safely
+import ansibullbot.utils.transport as transport
 
 
 class GalaxyQueryTool:
@@ -96,7 +96,7 @@ class GalaxyQueryTool:
             if (now - ts).days <= days:
                 return jdata
 
-        rr = requests.get(url)
+        rr = transport.get(url)
         jdata = rr.json()
 
         with open(cachefile, 'w') as f:
@@ -223,7 +223,7 @@ class GalaxyQueryTool:
         self.GALAXY_FQCNS = set()
 
         url = 'https://sivel.eng.ansible.com/api/v1/collections/file_map'
-        rr = requests.get(url)
+        rr = transport.get(url)
         self.GALAXY_FILES = rr.json()
 
         for k,v in self.GALAXY_FILES.items():
@@ -231,7 +231,7 @@ class GalaxyQueryTool:
                 self.GALAXY_FQCNS.add(fqcn)
 
         url = 'https://sivel.eng.ansible.com/api/v1/collections/list'
-        rr = requests.get(url)
+        rr = transport.get(url)
         self.GALAXY_MANIFESTS = rr.json()
 
         self._verify_galaxy_files()
@@ -274,10 +274,10 @@ class GalaxyQueryTool:
             if rurl is None:
                 # https://galaxy.ansible.com/api/v2/collections/devoperate/base/
                 curl = self._baseurl + '/api/v2/collections/' + fqcn.replace('.', '/') + '/'
-                rr = requests.get(curl)
+                rr = transport.get(curl)
                 jdata = rr.json()
                 vurl = jdata['latest_version']['href']
-                rr2 = requests.get(vurl)
+                rr2 = transport.get(vurl)
                 jdata2 = rr2.json()
                 rurl = jdata2.get('metadata', {}).get('repository')
 
@@ -324,7 +324,7 @@ class GalaxyQueryTool:
         # make the list of known collections
         jdata = {'next': '/api/v2/collections/?page=1'}
         while jdata.get('next'):
-            rr = requests.get(self._baseurl + jdata['next'])
+            rr = transport.get(self._baseurl + jdata['next'])
             jdata = rr.json()
             for collection in jdata['results']:
                 key = '%s.%s' % (collection['namespace']['name'], collection['name'])
@@ -336,7 +336,7 @@ class GalaxyQueryTool:
             jdata = {'next': cd['versions_url']}
             while jdata.get('next'):
                 logging.debug(jdata['next'])
-                rr = requests.get(jdata['next'])
+                rr = transport.get(jdata['next'])
                 jdata = rr.json()
                 for version in jdata['results']:
                     versions[version['version']] = version['href']
@@ -350,7 +350,7 @@ class GalaxyQueryTool:
                 tarfn = os.path.join(self.tarcache, os.path.basename(durl))
                 if not os.path.exists(tarfn):
                     logging.debug('%s -> %s' % (durl, tarfn))
-                    rr = requests.get(durl, stream=True)
+                    rr = transport.get(durl, stream=True)
                     with open(tarfn, 'wb') as f:
                         f.write(rr.raw.read())
                 # list it
@@ -3,9 +3,11 @@
 # https://developer.github.com/v4/explorer/
 # https://developer.github.com/v4/guides/forming-calls/
 
+import datetime
 import jinja2
 import json
 import logging
+import os
 import requests
 from collections import defaultdict
 from operator import itemgetter
@@ -14,7 +16,9 @@ import six
 
 from tenacity import retry, wait_random, stop_after_attempt
 from ansibullbot._text_compat import to_bytes, to_text
+from ansibullbot.utils.file_tools import read_gzip_json_file, write_gzip_json_file
 from ansibullbot.utils.receiver_client import post_to_receiver
+import ansibullbot.utils.transport as transport
 
 import ansibullbot.constants as C
 
@@ -51,6 +55,12 @@ QUERY_TEMPLATE = """
 }
 """
 
+# newest activity first, for syncing what changed since the last run
+ORDER_BY_UPDATED = u'orderBy: {field: UPDATED_AT, direction: DESC}'
+
+# bump to discard summary stores written by older code
+SUMMARY_VERSION = 1
+
 QUERY_TEMPLATE_SINGLE_NODE = """
 {
     repository(owner:"{{ OWNER }}", name:"{{ REPO }}") {
@@ -89,6 +99,264 @@ query {
 }
 """
 
+# fields of the timeline items shared by issues and pullrequests
+QUERY_TIMELINE_COMMON = """
+__typename
+... on IssueComment { id databaseId author { login } body createdAt updatedAt url }
+... on LabeledEvent { id actor { login } createdAt label { name } }
+... on UnlabeledEvent { id actor { login } createdAt label { name } }
+... on AssignedEvent { id actor { login } createdAt assignee { ... on Actor { login } } }
+... on UnassignedEvent { id actor { login } createdAt assignee { ... on Actor { login } } }
+... on ReferencedEvent { id actor { login } createdAt commit { oid } }
+... on CrossReferencedEvent {
+    id actor { login } createdAt
+    source {
+        ... on Issue { number title url state repository { nameWithOwner } }
+        ... on PullRequest { number title url state repository { nameWithOwner } }
+    }
+}
+... on ClosedEvent { id actor { login } createdAt }
+... on ReopenedEvent { id actor { login } createdAt }
+... on RenamedTitleEvent { id actor { login } createdAt previousTitle currentTitle }
+... on MentionedEvent { id actor { login } createdAt }
+... on SubscribedEvent { id actor { login } createdAt }
+"""
+
+QUERY_TIMELINE_TYPES = u'ISSUE_COMMENT, LABELED_EVENT, UNLABELED_EVENT, ASSIGNED_EVENT, ' \
+    u'UNASSIGNED_EVENT, REFERENCED_EVENT, CROSS_REFERENCED_EVENT, CLOSED_EVENT, ' \
+    u'REOPENED_EVENT, RENAMED_TITLE_EVENT, MENTIONED_EVENT, SUBSCRIBED_EVENT'
+
+QUERY_TIMELINE_TYPES_PULLREQUEST = QUERY_TIMELINE_TYPES + \
+    u', MERGED_EVENT, HEAD_REF_FORCE_PUSHED_EVENT, REVIEW_REQUESTED_EVENT, PULL_REQUEST_REVIEW'
+
+QUERY_COMMIT_FIELDS = """
+oid
+message
+author { name email date user { login } }
+committer { name email date user { login } }
+parents(first: 2) { totalCount nodes { oid } }
+"""
+
+QUERY_TEMPLATE_DETAILS = """
+{
+    repository(owner:"{{ OWNER }}", name:"{{ REPO }}") {
+    {% for number in NUMBERS %}
+        n{{ number }}: issueOrPullRequest(number: {{ number }}) {
+            ... on Issue {
+                number
+                updatedAt
+                labels(first: 100) { nodes { name } }
+                assignees(first: 100) { nodes { login } }
+                issueTimeline: timelineItems(first: {{ PAGE }}, itemTypes: [{{ ISSUE_TYPES }}]) {
+                    pageInfo { hasNextPage }
+                    nodes { {{ TIMELINE }} }
+                }
+            }
+            ... on PullRequest {
+                number
+                updatedAt
+                mergeable
+                labels(first: 100) { nodes { name } }
+                assignees(first: 100) { nodes { login } }
+                pullTimeline: timelineItems(first: {{ PAGE }}, itemTypes: [{{ PULL_TYPES }}]) {
+                    pageInfo { hasNextPage }
+                    nodes {
+                        {{ TIMELINE }}
+                        ... on MergedEvent { id actor { login } createdAt commit { oid } }
+                        ... on HeadRefForcePushedEvent { id actor { login } createdAt }
+                        ... on ReviewRequestedEvent {
+                            id actor { login } createdAt
+                            requestedReviewer { ... on User { login } }
+                        }
+                        ... on PullRequestReview {
+                            id databaseId author { login } state body submittedAt commit { oid }
+                        }
+                    }
+                }
+                reviews(first: {{ PAGE }}) {
+                    pageInfo { hasNextPage }
+                    nodes { id databaseId author { login } state body submittedAt commit { oid } }
+                }
+                pullCommits: commits(first: {{ PAGE }}) {
+                    pageInfo { hasNextPage }
+                    nodes { commit { {{ COMMIT }} } }
+                }
+                files(first: {{ PAGE }}) {
+                    pageInfo { hasNextPage }
+                    nodes { path additions deletions changeType }
+                }
+                headCommit: commits(last: 1) {
+                    nodes {
+                        commit {
+                            oid
+                            status {
+                                contexts { context state targetUrl description createdAt creator { login } }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    {% endfor %}
+    }
+}
+"""
+
+# graphql timeline types and the REST timeline event names
+TIMELINE_EVENTS = {
+    u'IssueComment': u'commented',
+    u'LabeledEvent': u'labeled',
+    u'UnlabeledEvent': u'unlabeled',
+    u'AssignedEvent': u'assigned',
+    u'UnassignedEvent': u'unassigned',
+    u'ReferencedEvent': u'referenced',
+    u'CrossReferencedEvent': u'cross-referenced',
+    u'ClosedEvent': u'closed',
+    u'ReopenedEvent': u'reopened',
+    u'RenamedTitleEvent': u'renamed',
+    u'MentionedEvent': u'mentioned',
+    u'SubscribedEvent': u'subscribed',
+    u'MergedEvent': u'merged',
+    u'HeadRefForcePushedEvent': u'head_ref_force_pushed',
+    u'ReviewRequestedEvent': u'review_requested',
+    u'PullRequestReview': u'reviewed',
+}
+
+# PullRequestChangedFile.changeType and the REST file status
+FILE_STATUSES = {
+    u'ADDED': u'added',
+    u'DELETED': u'removed',
+    u'MODIFIED': u'modified',
+    u'RENAMED': u'renamed',
+    u'COPIED': u'copied',
+    u'CHANGED': u'changed',
+}
+
+
+def _login(actor):
+    if not actor:
+        return None
+    return {u'login': actor.get(u'login')}
+
+
+def _review(node):
+    '''A review in the shape of the REST reviews endpoint'''
+    return {
+        u'id': node.get(u'databaseId'),
+        u'node_id': node[u'id'],
+        u'user': _login(node.get(u'author')),
+        u'body': node.get(u'body'),
+        u'state': node[u'state'],
+        u'submitted_at': node.get(u'submittedAt'),
+        u'commit_id': (node.get(u'commit') or {}).get(u'oid'),
+    }
+
+
+def _timeline_event(node):
+    '''A timeline item in the shape of the REST timeline endpoint'''
+    typename = node[u'__typename']
+    event = {
+        u'event': TIMELINE_EVENTS[typename],
+        u'node_id': node[u'id'],
+        u'actor': _login(node.get(u'actor') or node.get(u'author')),
+        u'created_at': node.get(u'createdAt'),
+    }
+
+    if typename == u'IssueComment':
+        event[u'id'] = node[u'databaseId']
+        event[u'user'] = event[u'actor']
+        event[u'body'] = node[u'body']
+        event[u'updated_at'] = node[u'updatedAt']
+        event[u'html_url'] = node[u'url']
+    elif typename in (u'LabeledEvent', u'UnlabeledEvent'):
+        event[u'label'] = {u'name': node[u'label'][u'name']}
+    elif typename in (u'AssignedEvent', u'UnassignedEvent'):
+        event[u'assignee'] = _login(node.get(u'assignee'))
+    elif typename in (u'ReferencedEvent', u'MergedEvent'):
+        event[u'commit_id'] = (node.get(u'commit') or {}).get(u'oid')
+    elif typename == u'CrossReferencedEvent':
+        source = node.get(u'source') or {}
+        event[u'source'] = {
+            u'type': u'issue',
+            u'issue': {
+                u'number': source.get(u'number'),
+                u'title': source.get(u'title'),
+                u'html_url': source.get(u'url'),
+                u'state': (source.get(u'state') or u'').lower(),
+                u'repository': {
+                    u'full_name': (source.get(u'repository') or {}).get(u'nameWithOwner')
+                },
+            }
+        }
+    elif typename == u'RenamedTitleEvent':
+        event[u'rename'] = {u'from': node[u'previousTitle'], u'to': node[u'currentTitle']}
+    elif typename == u'ReviewRequestedEvent':
+        event[u'requested_reviewer'] = _login(node.get(u'requestedReviewer'))
+    elif typename == u'PullRequestReview':
+        # reviews carry submitted_at and user instead of created_at and actor
+        del event[u'actor']
+        del event[u'created_at']
+        event.update(_review(node))
+        event[u'state'] = event[u'state'].lower()
+
+    return event
+
+
+def _git_actor(actor):
+    return {
+        u'name': actor.get(u'name'),
+        u'email': actor.get(u'email'),
+        u'date': actor.get(u'date'),
+    }
+
+
+def _commit(node, owner, repo):
+    '''A commit in the shape of the REST pull commits endpoint'''
+    sha = node[u'oid']
+    return {
+        u'sha': sha,
+        u'url': u'%s/repos/%s/%s/commits/%s' % (C.DEFAULT_GITHUB_URL, owner, repo, sha),
+        u'commit': {
+            u'message': node[u'message'],
+            u'author': _git_actor(node[u'author']),
+            u'committer': _git_actor(node[u'committer']),
+        },
+        u'author': _login(node[u'author'].get(u'user')),
+        u'committer': _login(node[u'committer'].get(u'user')),
+        u'parents': [{u'sha': x[u'oid']} for x in node[u'parents'][u'nodes']],
+    }
+
+
+def _changed_file(node):
+    '''A file in the shape of the REST pull files endpoint'''
+    return {
+        u'filename': node[u'path'],
+        u'status': FILE_STATUSES.get(node[u'changeType'], node[u'changeType'].lower()),
+        u'additions': node[u'additions'],
+        u'deletions': node[u'deletions'],
+        u'changes': node[u'additions'] + node[u'deletions'],
+    }
+
+
+def _status(node):
+    '''A commit status in the shape of the REST statuses endpoint'''
+    return {
+        u'context': node[u'context'],
+        u'state': node[u'state'].lower(),
+        u'target_url': node.get(u'targetUrl'),
+        u'description': node.get(u'description'),
+        u'created_at': node[u'createdAt'],
+        u'updated_at': node[u'createdAt'],
+        u'creator': _login(node.get(u'creator')),
+    }
+
+
+def _complete(connection):
+    '''The nodes of a connection, None if they did not fit on one page'''
+    if connection is None or connection[u'pageInfo'][u'hasNextPage']:
+        return None
+    return connection[u'nodes']
+
 
 class GithubGraphQLClient(object):
     baseurl = u'https://api.github.com/graphql'
@@ -112,11 +380,11 @@ class GithubGraphQLClient(object):
         Args:
             repo_url  (str): username/repository
             baseurl   (str): not used
-            cachefile (str): not used
+            cachefile (str): summary store for incremental syncs
         """
         owner = repo_url.split(u'/', 1)[0]
         repo = repo_url.split(u'/', 1)[1]
-        summaries = self.get_all_summaries(owner, repo)
+        summaries = self.get_all_summaries(owner, repo, cachefile=cachefile)
 
         issues = {}
         for x in summaries:
@@ -153,30 +421,25 @@ class GithubGraphQLClient(object):
         else:
             return psummaries[-1][u'number']
 
-    def get_all_summaries(self, owner, repo):
+    def get_all_summaries(self, owner, repo, cachefile=None):
         """Collect all the summary data for issues and pullreuests
 
         Args:
-            owner (str): the github namespace
-            repo  (str): the github repository
+            owner     (str): the github namespace
+            repo      (str): the github repository
+            cachefile (str): summary store for incremental syncs
         """
-        isummaries = self.get_summaries(owner, repo, otype='issues')
-        psummaries = self.get_summaries(owner, repo, otype='pullRequests')
-        summaries = []
-        for iis in isummaries:
-            summaries.append(iis)
-        for prs in psummaries:
-            summaries.append(prs)
+        if cachefile:
+            summaries = self.sync_summaries(owner, repo, cachefile)
+        else:
+            summaries = self.get_summaries(owner, repo, otype='issues')
+            summaries += self.get_summaries(owner, repo, otype='pullRequests')
 
         if not summaries:
             return []
 
-        numbers = [x[u'number'] for x in summaries]
-        if numbers:
-            missing = (x for x in range(1, numbers[-1]) if x not in numbers)
-        else:
-            missing = []
-        for x in missing:
+        numbers = set([x[u'number'] for x in summaries])
+        for x in sorted(set(range(1, max(numbers))) - numbers):
             data = {
                 u'created_at': None,
                 u'updated_at': None,
@@ -192,7 +455,74 @@ class GithubGraphQLClient(object):
 
         return sorted(summaries, key=itemgetter(u'number'))
 
-    def get_summaries(self, owner, repo, otype='issues', last=None, first='first: 100', states='states: OPEN', paginate=True):
+    def sync_summaries(self, owner, repo, cachefile):
+        """Update the stored summaries with what changed since the last sync
+
+        Issues and pullrequests are fetched newest activity first and the
+        pagination stops at the watermark of the previous sync. The store
+        is rebuilt from the open issues every DEFAULT_SUMMARY_RESYNC hours
+        to drop transferred and deleted issues.
+
+        Args:
+            owner     (str): the github namespace
+            repo      (str): the github repository
+            cachefile (str): path to the gzipped json store
+        """
+        store = {}
+        if os.path.isfile(cachefile):
+            try:
+                store = read_gzip_json_file(cachefile)
+            except Exception as e:
+                logging.error(u'failed to load %s: %s' % (cachefile, to_text(e)))
+            if store.get(u'version') != SUMMARY_VERSION:
+                store = {}
+
+        now = datetime.datetime.utcnow()
+        watermark = store.get(u'watermark')
+        synced_at = store.get(u'synced_at')
+        if synced_at:
+            resync = datetime.timedelta(hours=C.DEFAULT_SUMMARY_RESYNC)
+            if datetime.datetime.strptime(synced_at, u'%Y-%m-%dT%H:%M:%SZ') + resync < now:
+                logging.info(u'%s/%s summaries are due for a full sync' % (owner, repo))
+                watermark = None
+
+        if watermark is None:
+            nodes = {}
+            synced_at = now.strftime(u'%Y-%m-%dT%H:%M:%SZ')
+            fetched = self.get_summaries(owner, repo, otype='issues')
+            fetched += self.get_summaries(owner, repo, otype='pullRequests')
+        else:
+            nodes = store[u'nodes']
+            # closed issues have to be seen too, they replace the open ones
+            fetched = self.get_summaries(owner, repo, otype='issues', states=None,
+                                         orderby=ORDER_BY_UPDATED, since=watermark)
+            fetched += self.get_summaries(owner, repo, otype='pullRequests', states=None,
+                                          orderby=ORDER_BY_UPDATED, since=watermark)
+
+        logging.info(u'%s/%s summaries: %s updated since %s' % (owner, repo, len(fetched), watermark))
+
+        for node in fetched:
+            nodes[to_text(node[u'number'])] = node
+
+        updated = [x[u'updated_at'] for x in fetched if x[u'updated_at']]
+        if watermark:
+            updated.append(watermark)
+
+        store = {
+            u'version': SUMMARY_VERSION,
+            u'synced_at': synced_at,
+            u'watermark': max(updated) if updated else None,
+            u'nodes': nodes,
+        }
+        cachedir = os.path.dirname(cachefile)
+        if cachedir and not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        write_gzip_json_file(cachefile, store)
+
+        return list(nodes.values())
+
+    def get_summaries(self, owner, repo, otype='issues', last=None, first='first: 100', states='states: OPEN', paginate=True,
+                      orderby=None, since=None):
         """Collect all the summary data for issues or pullreuests
 
         Args:
@@ -203,6 +533,9 @@ class GithubGraphQLClient(object):
             last      (str): number of nodes per page, newest to oldest
             states    (str): open or closed issues
             paginate (bool): recurse through page results
+            orderby   (str): sort order of the nodes
+            since     (str): with orderby=ORDER_BY_UPDATED, stop at nodes
+                             updated before this timestamp
 
         """
 
@@ -224,7 +557,7 @@ class GithubGraphQLClient(object):
             logging.debug(u'%s/%s %s pagecount:%s nodecount: %s' %
                           (owner, repo, otype, pagecount, len(nodes)))
 
-            issueparams = u', '.join([x for x in [states, first, last, after] if x])
+            issueparams = u', '.join([x for x in [states, orderby, first, last, after] if x])
             query = templ.render(OWNER=owner, REPO=repo, OBJECT_TYPE=otype, OBJECT_PARAMS=issueparams, FIELDS=QUERY_FIELDS)
 
             payload = {
@@ -233,7 +566,7 @@ class GithubGraphQLClient(object):
                 u'variables': u'{}',
                 u'operationName': None
             }
-            rr = requests.post(self.baseurl, headers=self.headers, data=json.dumps(payload))
+            rr = transport.post(self.baseurl, headers=self.headers, data=json.dumps(payload))
             if not rr.ok:
                 break
             data = rr.json()
@@ -241,12 +574,17 @@ class GithubGraphQLClient(object):
                 break
 
             # keep each edge/node/issue
+            seen_all = False
             for edge in data.get(u'data', {}).get(u'repository', {}).get(otype, {}).get(u'edges', []):
                 node = edge[u'node']
+                if since and node[u'updatedAt'] < since:
+                    # everything after this is older
+                    seen_all = True
+                    break
                 self.update_node(node, otype.lower()[:-1], owner, repo)
                 nodes.append(node)
 
-            if not paginate:
+            if not paginate or seen_all:
                 break
 
             pageinfo = data.get(u'data', {}).get(u'repository', {}).get(otype, {}).get(u'pageInfo')
@@ -283,7 +621,7 @@ class GithubGraphQLClient(object):
         if six.PY3:
             payload[u'query'] = to_text(payload[u'query'], 'ascii')
 
-        rr = requests.post(self.baseurl, headers=self.headers, data=json.dumps(payload))
+        rr = transport.post(self.baseurl, headers=self.headers, data=json.dumps(payload))
         data = rr.json()
 
         node = data[u'data'][u'repository'][otype]
@@ -357,9 +695,117 @@ class GithubGraphQLClient(object):
             committers[github_id] = list(commits)
         return committers, emailmap
 
+    def get_issue_details(self, owner, repo, numbers, batch_size=10, page_size=100):
+        """Fetch what the triager needs for many issues in few requests
+
+        Each request has an aliased field per issue. The result maps the
+        numbers to dicts in the shapes of the REST endpoints the
+        IssueWrapper would otherwise call. A part that did not fit on one
+        page is set to None so the wrapper falls back to REST for it.
+
+        Args:
+            owner       (str): the github namespace
+            repo        (str): the github repository
+            numbers    (list): issue and pullrequest numbers
+            batch_size  (int): issues per request
+            page_size   (int): nodes per connection
+        """
+        template = self.environment.from_string(QUERY_TEMPLATE_DETAILS)
+
+        details = {}
+        numbers = list(numbers)
+        for idx in range(0, len(numbers), batch_size):
+            chunk = numbers[idx:idx + batch_size]
+            query = template.render(
+                OWNER=owner,
+                REPO=repo,
+                NUMBERS=chunk,
+                PAGE=page_size,
+                ISSUE_TYPES=QUERY_TIMELINE_TYPES,
+                PULL_TYPES=QUERY_TIMELINE_TYPES_PULLREQUEST,
+                TIMELINE=QUERY_TIMELINE_COMMON,
+                COMMIT=QUERY_COMMIT_FIELDS,
+            )
+            payload = {
+                u'query': to_text(query, 'ascii', 'ignore').strip(),
+                u'variables': u'{}',
+                u'operationName': None
+            }
+            data = self.partial_requests(payload)
+            repository = (data.get(u'data') or {}).get(u'repository') or {}
+
+            for number in chunk:
+                node = repository.get(u'n%s' % number)
+                if node:
+                    details[number] = self.parse_issue_details(node, owner, repo)
+
+        return details
+
+    def parse_issue_details(self, node, owner, repo):
+        is_pullrequest = u'pullTimeline' in node
+        detail = {
+            u'number': node[u'number'],
+            u'updated_at': node[u'updatedAt'],
+            u'is_pullrequest': is_pullrequest,
+            u'labels': [x[u'name'] for x in node[u'labels'][u'nodes']],
+            u'assignees': [x[u'login'] for x in node[u'assignees'][u'nodes']],
+        }
+
+        timeline = _complete(node.get(u'pullTimeline') or node.get(u'issueTimeline'))
+        if timeline is not None:
+            timeline = [_timeline_event(x) for x in timeline if x[u'__typename'] in TIMELINE_EVENTS]
+        detail[u'timeline'] = timeline
+
+        if not is_pullrequest:
+            return detail
+
+        detail[u'mergeable'] = node.get(u'mergeable')
+
+        reviews = _complete(node[u'reviews'])
+        if reviews is not None:
+            reviews = [_review(x) for x in reviews]
+        detail[u'reviews'] = reviews
+
+        commits = _complete(node[u'pullCommits'])
+        if commits is not None:
+            commits = [_commit(x[u'commit'], owner, repo) for x in commits]
+        detail[u'commits'] = commits
+
+        files = _complete(node[u'files'])
+        if files is not None:
+            files = [_changed_file(x) for x in files]
+        detail[u'files'] = files
+
+        detail[u'status_contexts'] = None
+        head = node[u'headCommit'][u'nodes']
+        if head:
+            status = head[0][u'commit'].get(u'status') or {}
+            detail[u'status_contexts'] = [_status(x) for x in status.get(u'contexts', [])]
+
+        return detail
+
+    @retry(wait=wait_random(min=1, max=2), stop=stop_after_attempt(5))
+    def partial_requests(self, payload):
+        """Like requests() but keep the data of the fields that resolved
+
+        A missing issue number only fails its own alias, graphql reports
+        that as an error next to the data for the others.
+        """
+        response = transport.post(self.baseurl, headers=self.headers, data=json.dumps(payload))
+        response.raise_for_status()
+        data = response.json()
+        errors = data.get(u'errors')
+        if errors:
+            msgs = u', '.join([e[u'message'] for e in errors])
+            if not data.get(u'data'):
+                raise requests.exceptions.InvalidSchema(
+                    u'Error(s) from graphql: %s' % msgs)
+            logging.warning(u'graphql: %s' % msgs)
+        return data
+
     @retry(wait=wait_random(min=1, max=2), stop=stop_after_attempt(5))
     def requests(self, payload):
-        response = requests.post(self.baseurl, headers=self.headers, data=json.dumps(payload))
+        response = transport.post(self.baseurl, headers=self.headers, data=json.dumps(payload))
         response.raise_for_status()
         # GitHub GraphQL will happily return a 200 result with errors. One
         # must dig through the data to see if there were errors.
@@ -7,10 +7,10 @@ import shutil
 import tarfile
 import tempfile
 
-import requests
 
 from ansibullbot._text_compat import to_text
 from ansibullbot.utils.systemtools import run_command
+import ansibullbot.utils.transport as transport
 
 
 class GitRepoWrapper(object):
@@ -78,7 +78,7 @@ class GitRepoWrapper(object):
 
             tfh,tfn = tempfile.mkstemp(suffix='.tar.gz')
 
-            rr = requests.get(self.repo, stream=True)
+            rr = transport.get(self.repo, stream=True)
             with open(tfn, 'wb') as f:
                 f.write(rr.raw.read())
 
@@ -182,6 +182,16 @@ class GitRepoWrapper(object):
                 fp = fp.replace('./', '', 1)
                 self._files.append(fp)
 
+    def get_head(self):
+        '''The commit the checkout is at, None for tarballs'''
+        if not self.isgit:
+            return None
+        cmd = u'cd {}; git rev-parse HEAD'.format(self.checkoutdir)
+        (rc, so, se) = run_command(cmd)
+        if rc != 0:
+            return None
+        return to_text(so).strip()
+
     def get_files_by_commit(self, commit):
         if commit not in self.files_by_commit:
             cmd = u'cd {}; git show --pretty="" --name-only {}'.format(self.checkoutdir, commit)
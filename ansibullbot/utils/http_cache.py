@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+'''
+Conditional request cache for GitHub API reads.
+
+Every GET to the api host is stored with its ETag and Last-Modified
+validators. The next GET for the same url sends them back as
+If-None-Match and If-Modified-Since, and a 304 answer, which does not
+count against the rate limit, is turned into the stored response.
+
+Each page of a paginated listing has its own url, so pagination chains
+are cached page by page. The entries are kept in a BlobStore, so the
+least recently used ones are evicted past the cache's byte budget.
+
+https://developer.github.com/v3/#conditional-requests
+'''
+
+import base64
+import glob
+import hashlib
+import logging
+import os
+
+import requests.adapters
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ansibullbot._text_compat import to_bytes, to_text
+from ansibullbot.utils.blob_store import INDEX_FILE, BlobStore
+import ansibullbot.utils.instrumentation as instrumentation
+
+
+# the stored body is already decoded
+SKIP_HEADERS = (u'content-encoding', u'content-length', u'transfer-encoding')
+
+
+def cache_key(url, accept=None):
+    '''The body of a url only depends on the media type asked for'''
+    return to_text(hashlib.sha1(to_bytes(u'%s %s' % (url, accept or u''))).hexdigest())
+
+
+class ConditionalCache(object):
+    '''Validators and bodies of GET responses, bounded by max_bytes'''
+
+    def __init__(self, cachedir, max_bytes=None):
+        self.cachedir = cachedir
+        if not os.path.isfile(os.path.join(cachedir, INDEX_FILE)):
+            self._remove_legacy()
+        self.store = BlobStore(cachedir, max_bytes=max_bytes)
+
+    def _remove_legacy(self):
+        '''Drop the unbounded one file per url entries of older versions'''
+        for path in glob.glob(os.path.join(self.cachedir, u'??', u'*.json.gz')):
+            # blobs are named by a sha256, the old entries by a sha1
+            if len(os.path.basename(path)) == 40 + len(u'.json.gz'):
+                os.remove(path)
+
+    def get(self, url, accept=None):
+        return self.store.get(cache_key(url, accept))
+
+    def set(self, url, accept, response):
+        entry = {
+            u'url': url,
+            u'etag': response.headers.get(u'ETag'),
+            u'last_modified': response.headers.get(u'Last-Modified'),
+            u'headers': dict(
+                (k, v) for k, v in response.headers.items()
+                if k.lower() not in SKIP_HEADERS
+            ),
+            u'body': to_text(base64.b64encode(response.content or b'')),
+        }
+        self.store.set(cache_key(url, accept), entry)
+
+    def stats(self):
+        return self.store.stats()
+
+    def validators(self, entry):
+        headers = {}
+        if entry.get(u'etag'):
+            headers[u'If-None-Match'] = entry[u'etag']
+        if entry.get(u'last_modified'):
+            headers[u'If-Modified-Since'] = entry[u'last_modified']
+        return headers
+
+    def build_response(self, entry, request, not_modified):
+        '''The stored response with the fresh headers of the 304'''
+        headers = CaseInsensitiveDict(entry[u'headers'])
+        for k, v in not_modified.headers.items():
+            if k.lower() not in SKIP_HEADERS:
+                headers[k] = v
+
+        response = Response()
+        response.status_code = 200
+        response.reason = u'OK'
+        response.headers = headers
+        response.encoding = get_encoding_from_headers(headers)
+        response._content = base64.b64decode(entry[u'body'])
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = not_modified.connection
+        response.from_cache = True
+        return response
+
+
+class CachingAdapter(requests.adapters.HTTPAdapter):
+    '''Send conditional GETs and answer 304s from the cache'''
+
+    def __init__(self, cache, *args, **kwargs):
+        self.cache = cache
+        super(CachingAdapter, self).__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        if request.method != u'GET' or u'If-None-Match' in request.headers:
+            return super(CachingAdapter, self).send(request, *args, **kwargs)
+
+        accept = request.headers.get(u'Accept')
+        entry = self.cache.get(request.url, accept)
+        if entry:
+            request.headers.update(self.cache.validators(entry))
+
+        response = super(CachingAdapter, self).send(request, *args, **kwargs)
+
+        if response.status_code == 304 and entry:
+            instrumentation.count(u'cache_hit')
+            return self.cache.build_response(entry, request, response)
+
+        instrumentation.count(u'cache_miss')
+        if response.status_code == 200 and \
+                (response.headers.get(u'ETag') or response.headers.get(u'Last-Modified')):
+            try:
+                self.cache.set(request.url, accept, response)
+            except Exception as e:
+                logging.error(u'failed to cache %s: %s' % (request.url, to_text(e)))
+
+        return response
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+'''
+Timing and API call attribution for the stages of a triage run.
+
+Each stage (a facts plugin, building the history, applying actions, ...)
+is timed and any http requests or cache lookups made while it runs are
+attributed to it. The samples for every issue are summarized per stage
+into a report with the p50, p95 and max of each metric.
+'''
+
+import contextlib
+import io
+import logging
+import math
+import os
+import threading
+import time
+
+import requests.adapters
+
+import ansibullbot.constants as C
+from ansibullbot._json_compat import json_dump
+
+
+METRICS = (
+    u'elapsed',
+    u'rest',
+    u'graphql',
+    u'other_http',
+    u'cache_hit',
+    u'cache_miss',
+    u'cache_evict',
+)
+
+_local = threading.local()
+_original_send = None
+
+
+def _current():
+    return getattr(_local, u'counters', None)
+
+
+def count(name, value=1):
+    '''Attribute an event to the stage running in this thread'''
+    counters = _current()
+    if counters is not None:
+        counters[name] = counters.get(name, 0) + value
+
+
+def classify_url(url):
+    if u'/graphql' in url:
+        return u'graphql'
+    if url.startswith(C.DEFAULT_GITHUB_URL) or u'api.github.com' in url:
+        return u'rest'
+    return u'other_http'
+
+
+def install():
+    '''Count every request made through python-requests
+
+    PyGithub, the graphql client and the CI wrappers all end up in the
+    requests HTTPAdapter, so this is the one place that sees all of them.
+    '''
+    global _original_send
+    if _original_send is not None:
+        return
+
+    _original_send = requests.adapters.HTTPAdapter.send
+
+    def send(self, request, *args, **kwargs):
+        count(classify_url(request.url))
+        return _original_send(self, request, *args, **kwargs)
+
+    requests.adapters.HTTPAdapter.send = send
+
+
+def percentile(values, pct):
+    '''Nearest rank percentile of a sorted list'''
+    if not values:
+        return None
+    rank = int(math.ceil(pct / 100.0 * len(values))) - 1
+    return values[max(0, min(rank, len(values) - 1))]
+
+
+class StageRecorder(object):
+
+    def __init__(self):
+        # stage name -> list of counters, one per call
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        parent = _current()
+        counters = {}
+        _local.counters = counters
+        ts1 = time.time()
+        try:
+            yield counters
+        finally:
+            counters[u'elapsed'] = time.time() - ts1
+            _local.counters = parent
+
+            # nested stages also count towards the outer stage
+            if parent is not None:
+                for k, v in counters.items():
+                    if k != u'elapsed':
+                        parent[k] = parent.get(k, 0) + v
+
+            with self._lock:
+                self.samples.setdefault(name, []).append(counters)
+
+    def run(self, name, func, *args, **kwargs):
+        with self.stage(name):
+            return func(*args, **kwargs)
+
+    def pop_samples(self):
+        with self._lock:
+            samples = self.samples
+            self.samples = {}
+        return samples
+
+    def merge_samples(self, samples):
+        with self._lock:
+            for name, values in samples.items():
+                self.samples.setdefault(name, []).extend(values)
+
+    def report(self):
+        report = {}
+        for name, samples in self.samples.items():
+            stats = {u'calls': len(samples)}
+            for metric in METRICS:
+                values = sorted([x.get(metric, 0) for x in samples])
+                stats[metric] = {
+                    u'p50': percentile(values, 50),
+                    u'p95': percentile(values, 95),
+                    u'max': values[-1],
+                    u'total': sum(values),
+                }
+            report[name] = stats
+        return report
+
+    def log_report(self, report=None, limit=10):
+        if report is None:
+            report = self.report()
+        slowest = sorted(
+            report.items(),
+            key=lambda x: x[1][u'elapsed'][u'total'],
+            reverse=True
+        )
+        for name, stats in slowest[:limit]:
+            logging.info(
+                u'%s: %s calls, %.2fs total, p95 %.3fs, max %.3fs, %s rest, %s graphql' % (
+                    name,
+                    stats[u'calls'],
+                    stats[u'elapsed'][u'total'],
+                    stats[u'elapsed'][u'p95'],
+                    stats[u'elapsed'][u'max'],
+                    stats[u'rest'][u'total'],
+                    stats[u'graphql'][u'total'],
+                )
+            )
+
+    def dump(self, filename, report=None):
+        if report is None:
+            report = self.report()
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with io.open(filename, 'w', encoding='utf-8') as f:
+            json_dump(report, f)
+        return report
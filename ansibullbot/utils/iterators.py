@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 
+import logging
+from collections import deque
+
 import six
+from concurrent.futures import ThreadPoolExecutor
 
 
 class RepoIssuesIterator(six.Iterator):
@@ -21,9 +25,64 @@ class RepoIssuesIterator(six.Iterator):
 
         thisnum = self.numbers[self.i]
         self.i += 1
-        if thisnum in self.issuecache:
-            issue = self.issuecache[thisnum]
-        else:
-            issue = self.repo.get_issue(thisnum)
 
-        return issue
+        return self.get_issue(thisnum)
+
+    def get_issue(self, number):
+        if number in self.issuecache:
+            return self.issuecache[number]
+        return self.repo.get_issue(number)
+
+
+class IssuePrefetcher(six.Iterator):
+    '''Run a fetch function for the next N numbers in a thread pool
+
+    Results are yielded in the same order as the numbers, so the consumer
+    can process one issue sequentially while the network bound fetching
+    for the following ones is already in flight. Use it as a context
+    manager so the queued fetches are dropped if the consumer stops early.
+    '''
+
+    def __init__(self, numbers, fetch, depth=4):
+        self.numbers = numbers
+        self.fetch = fetch
+        self.depth = max(1, depth)
+        self.i = 0
+        self.pending = deque()
+        self.executor = ThreadPoolExecutor(max_workers=self.depth)
+
+    def __iter__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        '''Cancel the fetches that have not started yet'''
+        while self.pending:
+            self.pending.popleft().cancel()
+        self.i = len(self.numbers)
+        self.executor.shutdown(wait=False)
+
+    def _fill(self):
+        while len(self.pending) < self.depth and self.i < len(self.numbers):
+            number = self.numbers[self.i]
+            self.i += 1
+            logging.debug(u'prefetch: queueing %s' % number)
+            self.pending.append(self.executor.submit(self.fetch, number))
+
+    def __next__(self):
+        self._fill()
+        if not self.pending:
+            self.close()
+            raise StopIteration()
+
+        future = self.pending.popleft()
+
+        # keep the pipeline full while the caller works on this result
+        self._fill()
+
+        return future.result()
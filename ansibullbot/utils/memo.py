@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+'''
+In memory memo of decoded api responses.
+
+Several facts of one issue ask for the same commit, and the prefetch
+threads may ask for it while the triager does. The memo keeps the most
+recently used responses of a run and lets concurrent callers for the
+same key share one fetch instead of each going through the rate limit
+and the disk cache.
+'''
+
+import collections
+import threading
+
+
+class _Flight(object):
+    '''A fetch other callers for the same key wait on'''
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightMemo(object):
+    '''LRU memo where concurrent misses for a key share one fetch'''
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, fetch):
+        '''The memoized value of key, calling fetch() to get it if needed
+
+        The value is shared by every caller and must not be modified.
+        '''
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                value = self._data.pop(key)
+                self._data[key] = value
+                return value
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self.hits += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            # failures are not memoized, the waiters see the same error
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._data[key] = flight.value
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+        return flight.value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
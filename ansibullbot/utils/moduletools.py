@@ -248,10 +248,9 @@ class ModuleIndexer(object):
             if not os.path.isfile(pfile):
                 refresh = True
             else:
-                pickle_kwargs = {'encoding': 'bytes'} if six.PY3 else {}
                 print(pfile)
                 with open(pfile, 'rb') as f:
-                    pdata = pickle_load(f, **pickle_kwargs)
+                    pdata = pickle_load(f)
                 if pdata[0] == mtime:
                     self.commits[k] = pdata[1]
                 else:
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+
+'''
+Process wide github rate limit budgets.
+
+Every api response carries X-RateLimit-Limit, -Remaining, -Reset and
+-Resource headers. The transport feeds them into a budget per token and
+resource, and @RateLimited takes a point from the budget before each
+call instead of querying sqlite. When the budget runs low the calls are
+paced so the rest of it lasts until the reset, and an empty budget
+blocks the callers until the window resets.
+
+The budgets are written to disk at most every DEFAULT_RATELIMIT_PERSIST
+seconds so a restarted bot does not start out blind.
+
+With several tokens configured the TokenPool hands out the one with the
+most headroom for the resource, preferring the same token for all calls
+of a worker process while it is not running low.
+'''
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+import ansibullbot.constants as C
+from ansibullbot._json_compat import json_dump
+from ansibullbot._text_compat import to_bytes, to_text
+
+
+# token -> RateBudget
+_budgets = {}
+_lock = threading.Lock()
+
+# where the budgets are persisted, None keeps them in memory
+_statefile = None
+_last_persist = 0
+
+_pool = None
+
+
+def token_key(token):
+    '''Budgets are stored by a hash of the token, never the token itself'''
+    if not token:
+        return u'anonymous'
+    return to_text(hashlib.sha1(to_bytes(token)).hexdigest())[:16]
+
+
+def token_from_headers(headers):
+    '''The token of an Authorization header'''
+    auth = (headers or {}).get(u'Authorization') or u''
+    parts = to_text(auth).split(None, 1)
+    if len(parts) == 2 and parts[0].lower() in (u'bearer', u'token'):
+        return parts[1]
+    return None
+
+
+class RateBudget(object):
+    '''Remaining points of one token, by api resource'''
+
+    def __init__(self):
+        # resource -> {limit, remaining, reset}
+        self.resources = {}
+        self._cond = threading.Condition(threading.Lock())
+
+    def known(self, resource=u'core'):
+        with self._cond:
+            return self._current(resource) is not None
+
+    def _current(self, resource):
+        '''The budget of the resource, None if unknown or from an old window'''
+        data = self.resources.get(resource)
+        if data is None or data[u'reset'] <= time.time():
+            return None
+        return data
+
+    def update(self, resource, limit, remaining, reset):
+        with self._cond:
+            data = self.resources.get(resource)
+            # the headers are authoritative within the same window
+            if data is None or reset >= data[u'reset']:
+                self.resources[resource] = {
+                    u'limit': limit,
+                    u'remaining': remaining,
+                    u'reset': reset,
+                }
+            if reset > time.time() and remaining > 0:
+                self._cond.notify_all()
+
+    def update_from_headers(self, headers):
+        try:
+            limit = int(headers[u'X-RateLimit-Limit'])
+            remaining = int(headers[u'X-RateLimit-Remaining'])
+            reset = int(headers[u'X-RateLimit-Reset'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        self.update(headers.get(u'X-RateLimit-Resource') or u'core', limit, remaining, reset)
+        return True
+
+    def update_from_json(self, rawjson):
+        '''Load the resources of a /rate_limit response'''
+        for resource, data in rawjson.get(u'resources', {}).items():
+            if not data.get(u'reset'):
+                continue
+            self.update(resource, data[u'limit'], data[u'remaining'], data[u'reset'])
+
+    def delay(self, resource=u'core', now=None):
+        '''Seconds to wait before the next call may be made'''
+        if now is None:
+            now = time.time()
+        data = self.resources.get(resource)
+        if data is None or data[u'reset'] <= now:
+            return 0
+
+        remaining = data[u'remaining'] - C.DEFAULT_RATELIMIT_RESERVE
+        window = data[u'reset'] - now
+        if remaining <= 0:
+            # pad like get_reset_time does, the reset clock may be skewed
+            return window + 5
+
+        if remaining < data[u'limit'] * C.DEFAULT_RATELIMIT_PACE:
+            # stretch what is left over the rest of the window
+            return window / remaining
+
+        return 0
+
+    def acquire(self, resource=u'core', cost=1):
+        '''Block until there is budget left and take cost points from it'''
+        waited = 0
+        with self._cond:
+            while True:
+                wait = self.delay(resource)
+                if wait <= 0:
+                    break
+                if wait > 60:
+                    logging.warning(u'rate limit budget exhausted: waiting %ss' % int(wait))
+                # an update from another thread may end the wait early
+                self._cond.wait(min(wait, 60))
+                waited += min(wait, 60)
+                data = self.resources.get(resource)
+                if data is not None and data[u'remaining'] > C.DEFAULT_RATELIMIT_RESERVE:
+                    # only pace once per call
+                    break
+
+            data = self._current(resource)
+            if data is not None:
+                data[u'remaining'] -= cost
+        return waited
+
+    def seconds_until_reset(self, resource=u'core'):
+        with self._cond:
+            data = self._current(resource)
+            if data is None:
+                return None
+            return max(0, int(data[u'reset'] - time.time()))
+
+    def to_dict(self):
+        with self._cond:
+            return dict((k, dict(v)) for k, v in self.resources.items())
+
+
+class TokenPool(object):
+    '''Route calls to the token with the most budget left'''
+
+    def __init__(self, tokens):
+        self.tokens = []
+        for token in tokens:
+            if token and token not in self.tokens:
+                self.tokens.append(token)
+        self._local = threading.local()
+
+    def __contains__(self, token):
+        return token in self.tokens
+
+    def headroom(self, token, resource=u'core'):
+        budget = get_budget(token)
+        with budget._cond:
+            data = budget._current(resource)
+            if data is None:
+                # unknown or reset since it was last seen
+                return float('inf')
+            return data[u'remaining']
+
+    def pick(self, resource=u'core'):
+        if not self.tokens:
+            return None
+
+        # stick to one token per worker to keep its connections warm
+        sticky = self.tokens[os.getpid() % len(self.tokens)]
+        if len(self.tokens) == 1 or get_budget(sticky).delay(resource) <= 0:
+            return sticky
+
+        return max(self.tokens, key=lambda x: self.headroom(x, resource))
+
+    def acquire(self, resource=u'core', cost=1, token=None):
+        '''Take budget from the best token and make it the thread's current one'''
+        if token is None:
+            token = self.pick(resource)
+        get_budget(token).acquire(resource=resource, cost=cost)
+        self._local.token = token
+        return token
+
+    def current(self, resource=u'core'):
+        '''The token acquired last by this thread, or the best one'''
+        token = getattr(self._local, u'token', None)
+        if token is None:
+            token = self.pick(resource)
+        return token
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = TokenPool([C.DEFAULT_GITHUB_TOKEN] + list(C.DEFAULT_GITHUB_TOKENS or []))
+    return _pool
+
+
+def get_budget(token=None):
+    key = token_key(token)
+    budget = _budgets.get(key)
+    if budget is None:
+        with _lock:
+            budget = _budgets.get(key)
+            if budget is None:
+                budget = RateBudget()
+                _budgets[key] = budget
+    return budget
+
+
+def pool_authorization(authorization, resource=u'core'):
+    '''The Authorization header with the token the pool routes the call to
+
+    Core calls are sent with the token @RateLimited took the budget from,
+    credentials outside of the pool are left alone.
+    '''
+    pool = get_pool()
+    if len(pool.tokens) < 2 or token_from_headers({u'Authorization': authorization}) not in pool:
+        return authorization
+
+    scheme = to_text(authorization).split(None, 1)[0]
+    if resource == u'core':
+        token = pool.current()
+    else:
+        token = pool.pick(resource=resource)
+    return u'%s %s' % (scheme, token)
+
+
+def observe_headers(request_headers, headers):
+    '''Update the budget of the token a response was sent with'''
+    if get_budget(token_from_headers(request_headers)).update_from_headers(headers):
+        maybe_persist()
+
+
+def observe(response):
+    '''Response hook for the transport session'''
+    observe_headers(response.request.headers if response.request is not None else None, response.headers)
+    return response
+
+
+def configure(statefile):
+    '''Persist the budgets to statefile and load what is there'''
+    global _statefile
+    _statefile = statefile
+    if not statefile or not os.path.isfile(statefile):
+        return
+
+    try:
+        with io.open(statefile, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        logging.error(u'failed to load %s: %s' % (statefile, to_text(e)))
+        return
+
+    for key, resources in data.items():
+        with _lock:
+            budget = _budgets.setdefault(key, RateBudget())
+        for resource, rl in resources.items():
+            budget.update(resource, rl[u'limit'], rl[u'remaining'], rl[u'reset'])
+
+
+def maybe_persist(force=False):
+    global _last_persist
+    if not _statefile:
+        return
+
+    now = time.time()
+    if not force and now - _last_persist < C.DEFAULT_RATELIMIT_PERSIST:
+        return
+    _last_persist = now
+
+    data = dict((k, v.to_dict()) for k, v in list(_budgets.items()))
+    dirname = os.path.dirname(_statefile)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    tmpfile = u'%s.%s.tmp' % (_statefile, os.getpid())
+    try:
+        with io.open(tmpfile, 'w', encoding='utf-8') as f:
+            json_dump(data, f)
+        os.rename(tmpfile, _statefile)
+    except Exception as e:
+        logging.error(u'failed to write %s: %s' % (_statefile, to_text(e)))
+
+
+def reset():
+    global _last_persist, _pool
+    with _lock:
+        _budgets.clear()
+        _pool = None
+    _last_persist = 0
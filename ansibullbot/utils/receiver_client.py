@@ -3,8 +3,8 @@
 import logging
 import ansibullbot.constants as C
 from ansibullbot._text_compat import to_text
+import ansibullbot.utils.transport as transport
 
-import requests
 
 
 def post_to_receiver(path, params, data):
@@ -25,7 +25,7 @@ def post_to_receiver(path, params, data):
         receiverurl += path
         logging.info(u'RECEIVER: POST to %s' % receiverurl)
         try:
-            rr = requests.post(receiverurl, params=params, json=data)
+            rr = transport.post(receiverurl, params=params, json=data)
         except Exception as e:
             logging.warning(e)
 
@@ -71,7 +71,7 @@ def get_receiver_summaries(username, reponame, state=None, number=None):
 
         rr = None
         try:
-            rr = requests.get(
+            rr = transport.get(
                 receiverurl,
                 params=params
             )
@@ -118,7 +118,7 @@ def get_receiver_metadata(username, reponame, number=None, keys=None):
 
         rr = None
         try:
-            rr = requests.get(
+            rr = transport.get(
                 receiverurl,
                 params=params
             )
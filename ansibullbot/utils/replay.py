@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+
+'''
+Record and replay of the http traffic of a triage run.
+
+GitHub REST and GraphQL, Shippable, galaxy and the receiver are all
+reached through the python-requests HTTPAdapter. Recording wraps the
+adapter and stores every exchange in an archive directory. Replaying
+swaps the adapter for a stand-in that serves the archived responses in
+the order they were recorded and never touches the network.
+'''
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+import requests.adapters
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from six.moves.urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from ansibullbot._json_compat import json_dump
+from ansibullbot._text_compat import to_bytes, to_text
+
+
+EXCHANGES_FILE = u'exchanges.json.gz'
+MANIFEST_FILE = u'manifest.json'
+
+# the stored body is already decoded
+SKIP_HEADERS = (u'content-encoding', u'content-length', u'transfer-encoding')
+
+_original_send = None
+
+
+def normalize_url(url):
+    '''Sort the query so the same request always gets the same key'''
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, u''))
+
+
+def request_key(method, url, body=None):
+    if body:
+        digest = hashlib.sha1(to_bytes(body)).hexdigest()
+    else:
+        digest = u''
+    return u'%s %s %s' % (method.upper(), normalize_url(url), digest)
+
+
+def loose_key(method, url):
+    '''Fallback when the query holds something like a timestamp'''
+    parts = urlsplit(url)
+    return u'%s %s://%s%s' % (method.upper(), parts.scheme, parts.netloc, parts.path)
+
+
+class HTTPArchive(object):
+    '''The recorded exchanges and a manifest describing the run'''
+
+    def __init__(self, path):
+        self.path = path
+        self.exchanges = []
+        self.manifest = {}
+        self._lock = threading.Lock()
+
+    def add(self, request, response):
+        headers = dict(
+            (k, v) for k, v in response.headers.items()
+            if k.lower() not in SKIP_HEADERS
+        )
+        with self._lock:
+            self.exchanges.append({
+                u'key': request_key(request.method, request.url, request.body),
+                u'loose_key': loose_key(request.method, request.url),
+                u'url': request.url,
+                u'status': response.status_code,
+                u'reason': response.reason,
+                u'headers': headers,
+                u'body': to_text(base64.b64encode(response.content or b'')),
+            })
+
+    def load(self):
+        mfile = os.path.join(self.path, MANIFEST_FILE)
+        if os.path.isfile(mfile):
+            with io.open(mfile, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        with gzip.open(os.path.join(self.path, EXCHANGES_FILE), 'r') as f:
+            self.exchanges = json.loads(to_text(f.read()))
+        return self
+
+    def save(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        with io.open(os.path.join(self.path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json_dump(self.manifest, f)
+        with gzip.open(os.path.join(self.path, EXCHANGES_FILE), 'w') as f:
+            f.write(to_bytes(json.dumps(self.exchanges)))
+
+
+class ReplayAdapter(object):
+    '''Serves archived responses in recorded order, repeating the last one'''
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.misses = []
+        self._queues = {}
+        self._loose = {}
+        self._lock = threading.Lock()
+        for exchange in archive.exchanges:
+            self._queues.setdefault(exchange[u'key'], []).append(exchange)
+            self._loose.setdefault(exchange[u'loose_key'], []).append(exchange)
+
+    def _next(self, queues, key):
+        queue = queues.get(key)
+        if not queue:
+            return None
+        if len(queue) > 1:
+            return queue.pop(0)
+        return queue[0]
+
+    def lookup(self, method, url, body=None):
+        with self._lock:
+            exchange = self._next(self._queues, request_key(method, url, body))
+            if exchange is None:
+                exchange = self._next(self._loose, loose_key(method, url))
+            if exchange is None:
+                self.misses.append(u'%s %s' % (method, url))
+            return exchange
+
+    def send(self, adapter, request, **kwargs):
+        exchange = self.lookup(request.method, request.url, request.body)
+        if exchange is None:
+            raise requests.exceptions.ConnectionError(
+                u'%s %s was not recorded' % (request.method, request.url),
+                request=request
+            )
+
+        response = Response()
+        response.status_code = exchange[u'status']
+        response.reason = exchange[u'reason']
+        response.headers = CaseInsensitiveDict(exchange[u'headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = base64.b64decode(exchange[u'body'])
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+
+def _patch(send):
+    global _original_send
+    if _original_send is None:
+        _original_send = requests.adapters.HTTPAdapter.send
+    requests.adapters.HTTPAdapter.send = send
+
+
+def uninstall():
+    global _original_send
+    if _original_send is not None:
+        requests.adapters.HTTPAdapter.send = _original_send
+        _original_send = None
+
+
+def record(archive):
+    '''Store every exchange made from now on in the archive'''
+    original = requests.adapters.HTTPAdapter.send
+
+    def send(self, request, *args, **kwargs):
+        response = original(self, request, *args, **kwargs)
+        try:
+            archive.add(request, response)
+        except Exception as e:
+            logging.error(u'failed to record %s: %s' % (request.url, to_text(e)))
+        return response
+
+    _patch(send)
+    return archive
+
+
+def replay(archive):
+    '''Serve every request from the archive instead of the network'''
+    stand_in = ReplayAdapter(archive)
+
+    def send(self, request, *args, **kwargs):
+        return stand_in.send(self, request, **kwargs)
+
+    _patch(send)
+    return stand_in
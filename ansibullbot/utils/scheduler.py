@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+
+'''
+Persistent priority queue of issues waiting to be triaged.
+
+Daemon mode used to sweep every open number in order before starting
+over. The scheduler lets the triager pick the issue that most needs
+attention next instead, where a lower priority value is served first and
+items with the same priority are served in the order they were queued.
+'''
+
+import heapq
+import io
+import itertools
+import json
+import logging
+import os
+
+from ansibullbot._json_compat import json_dump
+from ansibullbot._text_compat import to_text
+
+
+# new comments, commits or label changes by users
+PRIORITY_ACTIVITY = 0
+# a CI run finished since the issue was last triaged
+PRIORITY_CI = 1
+# waiting on a rebuild or an admin merge
+PRIORITY_REBUILD = 2
+# has not been looked at for longer than the stale window
+PRIORITY_STALE = 3
+
+
+class TriageScheduler(object):
+
+    def __init__(self, cachefile=None):
+        self.cachefile = cachefile
+        self._heap = []
+        # key -> live heap entry, replaced entries are marked as removed
+        self._entries = {}
+        self._counter = itertools.count()
+        # key -> data about the last time the issue was triaged
+        self.processed = {}
+        self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return self._key(*item) in self._entries
+
+    @staticmethod
+    def _key(repo, number):
+        return u'%s#%s' % (repo, number)
+
+    def push(self, repo, number, priority, reason=None):
+        '''Queue an issue, keeping the best priority if it is already queued'''
+        key = self._key(repo, number)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] <= priority:
+                return False
+            # lazily removed when it reaches the top of the heap
+            entry[-1] = None
+
+        entry = [priority, next(self._counter), repo, int(number), reason, key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        return True
+
+    def pop(self):
+        '''Return (repo, number, priority, reason) for the next issue or None'''
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if entry[-1] is None:
+                continue
+            self._entries.pop(entry[-1], None)
+            return entry[2], entry[3], entry[0], entry[4]
+        return None
+
+    def mark_processed(self, repo, number, updated_at=None, time=None):
+        self.processed[self._key(repo, number)] = {
+            u'updated_at': to_text(updated_at) if updated_at else None,
+            u'time': to_text(time) if time else None,
+        }
+
+    def last_processed(self, repo, number):
+        return self.processed.get(self._key(repo, number), {})
+
+    def prune(self, repo, numbers):
+        '''Forget the processed issues of a repo that are not in numbers'''
+        keep = set(self._key(repo, x) for x in numbers)
+        prefix = self._key(repo, u'')
+        for key in list(self.processed.keys()):
+            if key.startswith(prefix) and key not in keep:
+                del self.processed[key]
+
+    def load(self):
+        if not self.cachefile or not os.path.isfile(self.cachefile):
+            return
+
+        try:
+            with io.open(self.cachefile, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError as e:
+            logging.error(u'failed to load %s: %s' % (self.cachefile, to_text(e)))
+            return
+
+        self.processed = data.get(u'processed', {})
+        for priority, repo, number, reason in data.get(u'queue', []):
+            self.push(repo, number, priority, reason=reason)
+
+    def save(self):
+        if not self.cachefile:
+            return
+
+        queue = sorted([x for x in self._heap if x[-1] is not None])
+        data = {
+            u'queue': [[x[0], x[2], x[3], x[4]] for x in queue],
+            u'processed': self.processed,
+        }
+
+        cachedir = os.path.dirname(self.cachefile)
+        if cachedir and not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+
+        tmpfile = self.cachefile + u'.tmp'
+        with io.open(tmpfile, 'w', encoding='utf-8') as f:
+            json_dump(data, f)
+        os.rename(tmpfile, self.cachefile)
+
+
+class TriageTimers(object):
+    '''Min-heap of the next time each issue's facts can change on their own
+
+    Some facts only change because time passes (needs_info warnings, the
+    stale window, stale CI results). Each triaged issue records when that
+    will next happen so it can be revisited exactly then.
+    '''
+
+    def __init__(self, cachefile=None):
+        self.cachefile = cachefile
+        self._heap = []
+        # key -> due time, heap entries that don't match are outdated
+        self.timers = {}
+        self.load()
+
+    def __len__(self):
+        return len(self.timers)
+
+    @staticmethod
+    def _key(repo, number):
+        return u'%s#%s' % (repo, number)
+
+    def get(self, repo, number):
+        return self.timers.get(self._key(repo, number))
+
+    def set(self, repo, number, due):
+        '''Wake the issue at the epoch time due, None removes the timer'''
+        key = self._key(repo, number)
+        if due is None:
+            self.timers.pop(key, None)
+            return
+        due = float(due)
+        if self.timers.get(key) == due:
+            return
+        self.timers[key] = due
+        heapq.heappush(self._heap, (due, repo, int(number)))
+
+    def remove(self, repo, number):
+        self.set(repo, number, None)
+
+    def _prune(self):
+        while self._heap:
+            due, repo, number = self._heap[0]
+            if self.timers.get(self._key(repo, number)) == due:
+                break
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        '''The epoch time of the earliest timer, None without timers'''
+        self._prune()
+        if not self._heap:
+            return None
+        return self._heap[0][0]
+
+    def pop_due(self, now):
+        '''Remove and return the (repo, number) timers that expired'''
+        expired = []
+        while True:
+            self._prune()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            due, repo, number = heapq.heappop(self._heap)
+            self.timers.pop(self._key(repo, number), None)
+            expired.append((repo, number))
+        return expired
+
+    def load(self):
+        if not self.cachefile or not os.path.isfile(self.cachefile):
+            return
+
+        try:
+            with io.open(self.cachefile, 'r', encoding='utf-8') as f:
+                timers = json.load(f)
+        except ValueError as e:
+            logging.error(u'failed to load %s: %s' % (self.cachefile, to_text(e)))
+            return
+
+        self.timers = dict((k, float(v)) for k, v in timers.items())
+        self._heap = []
+        for key, due in self.timers.items():
+            repo, number = key.rsplit(u'#', 1)
+            self._heap.append((due, repo, int(number)))
+        heapq.heapify(self._heap)
+
+    def save(self):
+        if not self.cachefile:
+            return
+
+        cachedir = os.path.dirname(self.cachefile)
+        if cachedir and not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+
+        tmpfile = self.cachefile + u'.tmp'
+        with io.open(tmpfile, 'w', encoding='utf-8') as f:
+            json_dump(self.timers, f)
+        os.rename(tmpfile, self.cachefile)
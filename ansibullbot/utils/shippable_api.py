@@ -10,14 +10,15 @@ import time
 import pytz
 import six
 
-import requests
 from tenacity import retry, stop_after_attempt, wait_fixed, RetryError, TryAgain
 
 import ansibullbot.constants as C
 from ansibullbot._text_compat import to_text
 from ansibullbot.ci.base import BaseCI
-from ansibullbot.utils.file_tools import compress_gzip_file, read_gzip_json_file, write_gzip_json_file
+from ansibullbot.utils.blob_store import BlobStore
+from ansibullbot.utils.file_tools import read_gzip_json_file
 from ansibullbot.utils.timetools import strip_time_safely
+import ansibullbot.utils.transport as transport
 
 
 ANSIBLE_PROJECT_ID = u'573f79d02a8192902e20e34b'
@@ -44,6 +45,17 @@ class ShippableCI(BaseCI):
 
     def __init__(self, cachedir):
         self.cachedir = os.path.join(cachedir, 'shippable.runs')
+        self._raw_cache = None
+
+    @property
+    def raw_cache(self):
+        '''The responses of the api, bounded by the shippable cache budget'''
+        if self._raw_cache is None:
+            self._raw_cache = BlobStore(
+                os.path.join(self.cachedir, u'.raw'),
+                max_bytes=C.DEFAULT_SHIPPABLE_CACHE_MAX_MB * 1024 * 1024
+            )
+        return self._raw_cache
 
     @property
     def required_file(self):
@@ -52,7 +64,7 @@ class ShippableCI(BaseCI):
     def update(self):
         success = False
         while not success:
-            resp = requests.get(ANSIBLE_RUNS_URL)
+            resp = transport.get(ANSIBLE_RUNS_URL)
             try:
                 self._rawdata = resp.json()
                 success = True
@@ -115,28 +127,39 @@ class ShippableCI(BaseCI):
         if nruns:
             return nruns[-1]
 
-    def _get_url(self, url, usecache=False, timeout=TIMEOUT):
-        cdir = os.path.join(self.cachedir, u'.raw')
-        if not os.path.isdir(cdir):
-            os.makedirs(cdir)
+    def _load_legacy_response(self, url):
+        '''Move a response cached in the old file per url layout to the store'''
         cfile = url.replace(SHIPPABLE_URL + '/', u'')
         cfile = cfile.replace(u'/', u'_')
-        cfile = os.path.join(cdir, cfile + u'.json')
-        gzfile = cfile + u'.gz'
+        cfile = os.path.join(self.cachedir, u'.raw', cfile + u'.json')
+        fdata = None
+        for path in (cfile + u'.gz', cfile):
+            if not os.path.isfile(path):
+                continue
+            if fdata is None:
+                try:
+                    if path.endswith(u'.gz'):
+                        fdata = read_gzip_json_file(path)
+                    else:
+                        with open(path, 'r') as f:
+                            fdata = json.loads(f.read())
+                except ValueError:
+                    pass
+            os.remove(path)
+        if fdata is not None:
+            self.raw_cache.set(url, fdata)
+        return fdata
 
-        # transparently compress old logs
-        if os.path.isfile(cfile) and not os.path.isfile(gzfile):
-            compress_gzip_file(cfile, gzfile)
+    def _get_url(self, url, usecache=False, timeout=TIMEOUT):
+        fdata = self.raw_cache.get(url)
+        if fdata is None:
+            fdata = self._load_legacy_response(url)
 
         rc = None
         jdata = None
-        if os.path.isfile(gzfile):
-            try:
-                fdata = read_gzip_json_file(gzfile)
-                rc = fdata[0]
-                jdata = fdata[1]
-            except ValueError:
-                pass
+        if fdata is not None:
+            rc = fdata[0]
+            jdata = fdata[1]
 
             if rc == 400:
                 return None
@@ -151,9 +174,9 @@ class ShippableCI(BaseCI):
             is_finished = True
 
         resp = None
-        if not os.path.isfile(gzfile) or not jdata or (not usecache and not is_finished):
-            if os.path.isfile(gzfile):
-                logging.error(gzfile)
+        if fdata is None or not jdata or (not usecache and not is_finished):
+            if fdata is not None:
+                logging.error(url)
 
             resp = _fetch(url, timeout=timeout)
             if not resp:
@@ -161,9 +184,9 @@ class ShippableCI(BaseCI):
 
             if resp.status_code != 400:
                 jdata = resp.json()
-                write_gzip_json_file(gzfile, [resp.status_code, jdata])
+                self.raw_cache.set(url, [resp.status_code, jdata])
             else:
-                write_gzip_json_file(gzfile, [resp.status_code, {}])
+                self.raw_cache.set(url, [resp.status_code, {}])
                 return None
 
         _check_response(resp)
@@ -434,8 +457,7 @@ def _fetch(url, verb='get', **kwargs):
         }
 
         logging.info(u'%s %s' % (verb, url))
-        http_method = getattr(requests, verb)
-        resp = http_method(url, headers=headers, **kwargs)
+        resp = transport.request(verb, url, headers=headers, **kwargs)
         logging.info(u'shippable status code: %s' % resp.status_code)
         logging.info(u'shippable reason: %s' % resp.reason)
 
@@ -3,12 +3,16 @@
 import json
 import logging
 import os
+import weakref
 
 from sqlalchemy import create_engine
+from sqlalchemy import Boolean
 from sqlalchemy import Column
+from sqlalchemy import Float
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm import sessionmaker
 
 import ansibullbot.constants as C
@@ -16,6 +20,9 @@ import ansibullbot.constants as C
 
 Base = declarative_base()
 
+# every open database, so forked workers can reconnect them
+_DATABASES = weakref.WeakSet()
+
 
 class Blame(Base):
     __tablename__ = u'blames'
@@ -56,6 +63,19 @@ class GithubApiRequest(Base):
     token = Column(String)
 
 
+class TriageIndex(Base):
+    '''The scheduling fields of each issue's meta.json'''
+    __tablename__ = u'triage_index'
+    id = Column(Integer(), primary_key=True)
+    repo = Column(String, index=True)
+    number = Column(Integer, index=True)
+    updated_at = Column(String)
+    time = Column(String)
+    next_check = Column(Float, index=True)
+    needs_rebuild = Column(Boolean)
+    admin_merge = Column(Boolean)
+
+
 class AnsibullbotDatabase(object):
 
     '''A sqlite backed database to help with data caching [NOT CONFIG]'''
@@ -82,10 +102,18 @@ class AnsibullbotDatabase(object):
 
         self.engine = create_engine(self.unc)
         self.session_maker = sessionmaker(bind=self.engine)
-        self.session = self.session_maker()
+        # one session per thread, the triager prefetches from a thread pool
+        self.session = scoped_session(self.session_maker)
 
         self.create_tables()
 
+        _DATABASES.add(self)
+
+    def reset(self):
+        '''Drop connections inherited from a parent process'''
+        self.session.remove()
+        self.engine.dispose()
+
     def delete_db_file(self):
         os.remove(self.dbfile)
 
@@ -98,6 +126,7 @@ class AnsibullbotDatabase(object):
                 Blame.metadata.create_all(self.engine)
                 RateLimit.metadata.create_all(self.engine)
                 GithubApiRequest.metadata.create_all(self.engine)
+                TriageIndex.metadata.create_all(self.engine)
                 break
             except Exception as e:
                 retries += 1
@@ -156,6 +185,60 @@ class AnsibullbotDatabase(object):
         except Exception as e:
             logging.error(e)
 
+    @staticmethod
+    def _triage_index_to_dict(ti):
+        return {
+            u'number': ti.number,
+            u'updated_at': ti.updated_at,
+            u'time': ti.time,
+            u'next_check': ti.next_check,
+            u'needs_rebuild': ti.needs_rebuild,
+            u'admin_merge': ti.admin_merge,
+        }
+
+    def get_triage_index(self, repo, number):
+
+        '''Get the scheduling fields for a single issue'''
+
+        try:
+            ti = self.session.query(TriageIndex).filter(TriageIndex.repo == repo).filter(TriageIndex.number == int(number)).first()
+        except Exception as e:
+            logging.error(e)
+            return {}
+
+        if ti is None:
+            return {}
+        return self._triage_index_to_dict(ti)
+
+    def get_triage_indexes(self, repo):
+
+        '''Get the scheduling fields for every known issue in a repo'''
+
+        try:
+            rows = self.session.query(TriageIndex).filter(TriageIndex.repo == repo).all()
+        except Exception as e:
+            logging.error(e)
+            return {}
+
+        return dict((x.number, self._triage_index_to_dict(x)) for x in rows)
+
+    def set_triage_index(self, repo, number, **kwargs):
+
+        '''Store the scheduling fields for an issue'''
+
+        try:
+            ti = self.session.query(TriageIndex).filter(TriageIndex.repo == repo).filter(TriageIndex.number == int(number)).first()
+            if ti is None:
+                ti = TriageIndex(repo=repo, number=int(number))
+            for k, v in kwargs.items():
+                setattr(ti, k, v)
+            self.session.add(ti)
+            self.session.flush()
+            self.session.commit()
+        except Exception as e:
+            logging.error(e)
+            self.session.rollback()
+
     def set_rate_limit(self, username=None, token=None, rawjson=None):
 
         '''Store the ratelimit json data by user/token'''
@@ -250,3 +333,9 @@ class AnsibullbotDatabase(object):
 
     def debug(self):
         import epdb; epdb.st()     
+
+
+def reset_database_connections():
+    '''Call in a forked child before touching any database'''
+    for adb in list(_DATABASES):
+        adb.reset()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+'''
+Shared http sessions for every outbound client.
+
+The github, graphql, shippable, galaxy, scraper and receiver clients all
+go through one requests session per process, which keeps a pool of
+alive connections to each host instead of doing a new TLS handshake on
+every call.
+
+GETs to the github api additionally go through the conditional request
+cache, bounded by http_cache_max_mb, once configure_cache() has been
+called. The rate limit headers of all api responses feed the budgets in
+ratelimit. With several tokens
+configured, api calls made with any of them are sent with the token the
+pool picks.
+'''
+
+import os
+import threading
+
+import requests
+import requests.adapters
+import requests.auth
+
+import ansibullbot.constants as C
+from ansibullbot.utils.http_cache import CachingAdapter, ConditionalCache
+import ansibullbot.utils.ratelimit as ratelimit
+
+
+# pid -> session, forked workers can not reuse the parent's sockets
+_sessions = {}
+_lock = threading.Lock()
+
+# the cache of the github api responses, None disables it
+_cache = None
+
+
+class TokenPoolAuth(requests.auth.AuthBase):
+    '''Send github api calls with the token the pool picks'''
+
+    def __call__(self, request):
+        if not request.url.startswith(C.DEFAULT_GITHUB_URL) or u'/rate_limit' in request.url:
+            return request
+
+        if u'Authorization' in request.headers:
+            resource = u'graphql' if request.url.rstrip(u'/').endswith(u'/graphql') else u'core'
+            request.headers[u'Authorization'] = ratelimit.pool_authorization(
+                request.headers[u'Authorization'], resource=resource)
+        return request
+
+
+def _observe_rate_limit(response, *args, **kwargs):
+    if response.url and response.url.startswith(C.DEFAULT_GITHUB_URL):
+        ratelimit.observe(response)
+    return response
+
+
+def new_session():
+    session = requests.Session()
+    session.hooks[u'response'].append(_observe_rate_limit)
+    session.auth = TokenPoolAuth()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=C.DEFAULT_HTTP_POOL_CONNECTIONS,
+        pool_maxsize=C.DEFAULT_HTTP_POOL_MAXSIZE,
+    )
+    session.mount(u'https://', adapter)
+    session.mount(u'http://', adapter)
+    if _cache is not None:
+        # the longest matching prefix wins
+        session.mount(C.DEFAULT_GITHUB_URL.rstrip(u'/') + u'/', CachingAdapter(
+            _cache,
+            pool_connections=C.DEFAULT_HTTP_POOL_CONNECTIONS,
+            pool_maxsize=C.DEFAULT_HTTP_POOL_MAXSIZE,
+        ))
+    session.headers[u'Accept-Encoding'] = u'gzip, deflate'
+    return session
+
+
+def configure_cache(cachedir):
+    '''Cache the github api GETs in cachedir, None to turn it off'''
+    global _cache
+    if cachedir:
+        _cache = ConditionalCache(cachedir, max_bytes=C.DEFAULT_HTTP_CACHE_MAX_MB * 1024 * 1024)
+    else:
+        _cache = None
+    reset()
+
+
+def get_cache():
+    '''The conditional request cache, None if it is off'''
+    return _cache
+
+
+def get_session():
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _lock:
+            session = _sessions.get(pid)
+            if session is None:
+                # anything else was inherited from a parent process
+                _sessions.clear()
+                session = new_session()
+                _sessions[pid] = session
+    return session
+
+
+def reset():
+    '''Drop the pooled connections'''
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def request(method, url, **kwargs):
+    return get_session().request(method.upper(), url, **kwargs)
+
+
+def get(url, **kwargs):
+    kwargs.setdefault(u'allow_redirects', True)
+    return request(u'get', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request(u'post', url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request(u'put', url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request(u'delete', url, **kwargs)
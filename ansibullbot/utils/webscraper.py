@@ -16,6 +16,7 @@ from bs4 import BeautifulSoup
 
 from ansibullbot._text_compat import to_text
 from ansibullbot.utils.receiver_client import post_to_receiver
+import ansibullbot.utils.transport as transport
 import ansibullbot.constants as C
 
 
@@ -273,7 +274,7 @@ class GithubWebScraper(object):
 
     def _get_issue_urls(self, namespace, repo, pages=0):
         url = os.path.join(self.baseurl, namespace, repo, u'issues')
-        rr = requests.get(url)
+        rr = transport.get(url)
         soup = BeautifulSoup(rr.text, u'html.parser')
         links = soup.find_all(u'a')
 
@@ -297,7 +298,7 @@ class GithubWebScraper(object):
                 np = self.baseurl + np
                 logging.debug(u'np: %s' % np)
 
-                rr = requests.get(np)
+                rr = transport.get(np)
                 soup = BeautifulSoup(rr.text, u'html.parser')
                 links = soup.find_all(u'a')
                 issue_urls += self._issue_urls_from_links(
@@ -398,7 +399,7 @@ class GithubWebScraper(object):
             repo, branch,
             filepath
         )
-        rr = requests.get(url)
+        rr = transport.get(url)
 
         if rr.status_code != 200:
             if C.DEFAULT_BREAKPOINTS:
@@ -614,7 +615,7 @@ class GithubWebScraper(object):
             logging.debug(url)
             rr = None
             try:
-                rr = requests.get(url, headers=headers)
+                rr = transport.get(url, headers=headers)
                 if rr.reason == u'Too Many Requests' or rr.status_code == 500:
                     logging.debug(
                         u'too many www requests, sleeping %ss' % sleep
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+'''
+Forked worker pool fed from a shared queue.
+
+The parent builds its expensive state (checkouts, indexers, etc) once and
+forks the workers, which inherit it copy-on-write. Items are handed out one
+at a time from a shared queue, so a worker that gets stuck on a large item
+does not hold back the rest of the work.
+'''
+
+import logging
+import multiprocessing
+import os
+import time
+
+from six.moves import queue
+
+from ansibullbot._text_compat import to_text
+
+
+def get_mp_context():
+    '''Workers rely on fork to share the parent's state'''
+    try:
+        return multiprocessing.get_context(u'fork')
+    except AttributeError:
+        # python2 always forks
+        return multiprocessing
+
+
+def _worker_main(handler, work_queue, result_queue, initializer=None):
+    pid = os.getpid()
+
+    if initializer is not None:
+        initializer()
+
+    while True:
+        item = work_queue.get()
+        if item is None:
+            break
+
+        ts1 = time.time()
+        result = None
+        error = None
+        try:
+            result = handler(item)
+            status = u'ok'
+        except Exception as e:
+            logging.exception(u'worker %s failed on %s' % (pid, item))
+            status = u'error'
+            error = to_text(e)
+
+        result_queue.put({
+            u'item': item,
+            u'pid': pid,
+            u'status': status,
+            u'result': result,
+            u'error': error,
+            u'elapsed': time.time() - ts1,
+        })
+
+    # tell the parent this worker has drained the queue
+    result_queue.put(None)
+
+
+def run_workers(items, handler, workers=2, initializer=None, poll=5):
+    '''Process items in forked workers and return a result per item
+
+    The initializer runs once in each child before it starts pulling items,
+    use it to replace resources that can not be shared across a fork such
+    as database connections and sockets.
+    '''
+    ctx = get_mp_context()
+    work_queue = ctx.Queue()
+    result_queue = ctx.Queue()
+
+    for item in items:
+        work_queue.put(item)
+    for x in range(workers):
+        work_queue.put(None)
+
+    procs = []
+    for x in range(workers):
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(handler, work_queue, result_queue),
+            kwargs={u'initializer': initializer}
+        )
+        proc.start()
+        procs.append(proc)
+
+    results = []
+    finished = 0
+    while finished < len(procs):
+        try:
+            result = result_queue.get(timeout=poll)
+        except queue.Empty:
+            if not [x for x in procs if x.is_alive()]:
+                logging.error(u'all workers exited before draining the queue')
+                break
+            continue
+
+        if result is None:
+            finished += 1
+            continue
+
+        logging.info(u'worker %s finished %s in %.2fs [%s]' % (
+            result[u'pid'], result[u'item'], result[u'elapsed'], result[u'status'])
+        )
+        results.append(result)
+
+    for proc in procs:
+        proc.join()
+
+    return results
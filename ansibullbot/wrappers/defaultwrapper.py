@@ -17,7 +17,6 @@ from __future__ import print_function
 
 import datetime
 import inspect
-import json
 import logging
 import os
 import re
@@ -26,17 +25,28 @@ import time
 
 import pytz
 import six
+from github.Commit import Commit
+from github.File import File
 
 import ansibullbot.constants as C
-from ansibullbot._pickle_compat import pickle_dump, pickle_load
 from ansibullbot._text_compat import to_text
-from ansibullbot.decorators.github import RateLimited
+from ansibullbot.decorators.github import RateLimited, RetryOnRateLimit
 from ansibullbot.errors import RateLimitError
+import ansibullbot.utils.instrumentation as instrumentation
+from ansibullbot.utils.cache_store import filepath_kind, get_store, property_kind
 from ansibullbot.utils.extractors import get_template_data
 from ansibullbot.utils.timetools import strip_time_safely
 from ansibullbot.wrappers.historywrapper import HistoryWrapper
 
 
+# github's default page size of the timeline
+TIMELINE_PER_PAGE = 30
+
+
+def _event_key(event):
+    return event.get(u'node_id') or event.get(u'sha') or event.get(u'id')
+
+
 class UnsetValue:
     def __str__(self):
         return "AnsibullbotUnsetValue()"
@@ -73,11 +83,20 @@ class DefaultWrapper(object):
         self.full_cachedir = os.path.join(self.cachedir, u'issues', to_text(self.number))
         self._raw_data_issue = None
         self._renamed_files = None
+        self._details = None
+        self._status_contexts = None
+        # where the events of the last incremental timeline fetch start
+        self._timeline_appended_from = None
+        self.prefetched = False
 
     @property
     def url(self):
         return self.instance.url
 
+    @property
+    def store(self):
+        return get_store(self.cachedir)
+
     @property
     def raw_data_issue(self):
         if self._raw_data_issue is None:
@@ -95,9 +114,22 @@ class DefaultWrapper(object):
 
         return self._events
 
-    def _parse_events(self, events):
+    def get_new_events(self, known_ids):
+        '''Parsed timeline events that are not in known_ids
+
+        Returns None unless the timeline was fetched incrementally, the
+        history has to be rebuilt from all events then.
+        '''
+        timeline = self._get_timeline()
+        start = self._timeline_appended_from
+        if start is None:
+            return None
+        events = self._parse_events(timeline[start:], offset=start)
+        return [x for x in events if x[u'id'] not in known_ids]
+
+    def _parse_events(self, events, offset=0):
         processed_events = []
-        for event_no, dd in enumerate(events):
+        for event_no, dd in enumerate(events, offset):
             if dd[u'event'] == u'committed':
                 # FIXME
                 # commits are added through HistoryWrapper.merge_commits()
@@ -168,54 +200,110 @@ class DefaultWrapper(object):
 
     def _get_timeline(self):
         '''Use python-requests instead of pygithub'''
+        meta = self.store.get(self.repo_full_name, self.number, u'timeline_meta') or {}
+        cached = self.store.get(self.repo_full_name, self.number, u'timeline_data')
+
+        # validate the data is not infected by ratelimit errors
+        if not isinstance(cached, list) or [x for x in cached if not isinstance(x, dict)]:
+            cached = None
+
+        if cached is not None and meta and meta.get('updated_at', 0) >= self.updated_at.isoformat():
+            instrumentation.count(u'cache_hit')
+            return cached
+
+        instrumentation.count(u'cache_miss')
+        self._timeline_appended_from = None
+
         data = None
+        if cached and meta.get('per_page'):
+            data = self._fetch_timeline_tail(cached, meta['per_page'])
+        if data is None:
+            data = self.github.get_request(self.url + '/timeline')
 
-        cache_data = os.path.join(self.full_cachedir, 'timeline_data.json')
-        cache_meta = os.path.join(self.full_cachedir, 'timeline_meta.json')
-        logging.debug(cache_data)
+        self._write_timeline_cache(data, per_page=TIMELINE_PER_PAGE)
+        return data
 
-        if not os.path.exists(self.full_cachedir):
-            os.makedirs(self.full_cachedir)
+    def _fetch_timeline_tail(self, cached, per_page):
+        '''Refetch the last cached page and anything after it'''
+        last_page = max(1, (len(cached) + per_page - 1) // per_page)
+        keep = cached[:(last_page - 1) * per_page]
 
-        meta = {}
-        fetch = False
-        if not os.path.exists(cache_data):
-            fetch = True
-        else:
-            with open(cache_meta, 'r') as f:
-                meta = json.loads(f.read())
+        tail = self.github.get_request(self.url + '/timeline?page=%s' % last_page)
+        if not isinstance(tail, list) or [x for x in tail if not isinstance(x, dict)]:
+            return None
 
-        if not fetch and (not meta or meta.get('updated_at', 0) < self.updated_at.isoformat()):
-            fetch = True
+        # deleted events shift the pages, then only a full fetch is right
+        known = [_event_key(x) for x in cached[len(keep):]]
+        if [_event_key(x) for x in tail[:len(known)]] != known:
+            logging.info(u'timeline of #%s changed, refetching all pages' % self.number)
+            return None
 
-        # validate the data is not infected by ratelimit errors
-        if not fetch:
-            with open(cache_data, 'r') as f:
-                data = json.loads(f.read())
-
-            if isinstance(data, list):
-                bad_events = [x for x in data if not isinstance(x, dict)]
-                if bad_events:
-                    fetch = True
-            else:
-                fetch = True
+        self._timeline_appended_from = len(cached)
+        return keep + tail
+
+    def _write_timeline_cache(self, data, per_page=None):
+        '''per_page is None when the data does not follow the REST pages'''
+        self.store.set_many(self.repo_full_name, self.number, {
+            u'timeline_meta': {
+                'updated_at': self.updated_at.isoformat(),
+                'url': self.url + '/timeline',
+                'per_page': per_page,
+            },
+            u'timeline_data': data,
+        })
+
+    def _github_object(self, cls, attributes):
+        '''Build a pygithub object from REST shaped data'''
+        requester = self.instance._requester
+        try:
+            # commits are left incomplete so raw_data can fetch the files
+            return cls(requester, {}, attributes, False)
+        except TypeError:
+            # newer pygithub dropped the argument for non completable objects
+            return cls(requester, {}, attributes)
 
-        if data is None:
-            fetch = True
+    def load_details(self, details):
+        '''Seed the lazy properties from GithubGraphQLClient.get_issue_details
 
-        if fetch:
-            url = self.url + '/timeline'
-            data = self.github.get_request(url)
+        Parts of the details that are None did not fit in the query and are
+        left to the REST calls. Returns False if the details are older than
+        the issue and were ignored.
+        '''
+        if strip_time_safely(details[u'updated_at']) < self.updated_at.replace(tzinfo=None):
+            logging.info(u'graphql details for #%s are stale' % self.number)
+            return False
 
-            with open(cache_meta, 'w') as f:
-                f.write(json.dumps({
-                    'updated_at': self.updated_at.isoformat(),
-                    'url': url
-                }))
-            with open(cache_data, 'w') as f:
-                f.write(json.dumps(data))
+        self._details = details
 
-        return data
+        if details[u'timeline'] is not None:
+            self._write_timeline_cache(details[u'timeline'])
+
+        if not details[u'is_pullrequest']:
+            return True
+
+        if details[u'reviews'] is not None:
+            self._pr_reviews = details[u'reviews']
+
+        if details[u'commits'] is not None:
+            self._commits = [self._github_object(Commit, x) for x in details[u'commits']]
+            self._merge_commits = [
+                commit for commit, x in zip(self._commits, details[u'commits'])
+                if len(x[u'parents']) > 1 or x[u'commit'][u'message'].startswith(u'Merge branch')
+            ]
+            self._committer_emails = [x[u'commit'][u'author'][u'email'] for x in details[u'commits']]
+            self._committer_logins = [
+                (x[u'author'] or {}).get(u'login') or u'' for x in details[u'commits']
+            ]
+
+        if details[u'files'] is not None:
+            self.pr_files = [self._github_object(File, x) for x in details[u'files']]
+            if not [x for x in details[u'files'] if x[u'status'] in (u'added', u'renamed')]:
+                # renames only show up in the per commit file lists
+                self._renamed_files = {}
+
+        self._status_contexts = details[u'status_contexts']
+
+        return True
 
     @RateLimited
     def load_update_fetch(self, property_name, obj=None, force=False):
@@ -228,10 +316,10 @@ class DefaultWrapper(object):
         # so we can't take advantage of the caching scheme used
         # for the issue it's self. Instead this function calls
         # those methods by their given name, and write the data
-        # to a pickle file with a timestamp for the fetch time.
-        # Upon later loading of the pickle, the timestamp is
+        # to the cache store with a timestamp for the fetch time.
+        # Upon later loading of the entry, the timestamp is
         # compared to the issue's update_at timestamp and if the
-        # pickle data is behind, the process will be repeated.
+        # cached data is behind, the process will be repeated.
 
         edata = None
         events = []
@@ -239,20 +327,10 @@ class DefaultWrapper(object):
         update = False
         write_cache = False
 
-        pfile = os.path.join(self.full_cachedir, u'%s.pickle' % property_name)
-        pdir = os.path.dirname(pfile)
-        logging.debug(pfile)
-
-        if not os.path.isdir(pdir):
-            os.makedirs(pdir)
-
-        if os.path.isfile(pfile):
-            try:
-                with open(pfile, 'rb') as f:
-                    edata = pickle_load(f)
-            except Exception as e:
-                update = True
-                write_cache = True
+        kind = property_kind(property_name)
+        edata = self.store.get(self.repo_full_name, self.number, kind)
+        if edata is None:
+            write_cache = True
 
         # check the timestamp on the cache
         if edata:
@@ -319,11 +397,9 @@ class DefaultWrapper(object):
                 events = [x for x in methodToCall()]
 
         if C.DEFAULT_PICKLE_ISSUES:
-            if write_cache or not os.path.isfile(pfile) or force:
-                # need to dump the pickle back to disk
+            if write_cache or force:
                 edata = [updated, events]
-                with open(pfile, 'wb') as f:
-                    pickle_dump(edata, f)
+                self.store.set(self.repo_full_name, self.number, kind, edata)
 
         return events
 
@@ -366,13 +442,20 @@ class DefaultWrapper(object):
     def remove_label(self, label=None):
         """Removes a label from the Issue using the GitHub API"""
         self.get_issue().remove_from_labels(label)
+        self._labels = [x for x in self.labels if x != label]
+
+    @RateLimited
+    def add_labels(self, labels):
+        """Adds several labels to the Issue in one API call"""
+        self.get_issue().add_to_labels(*labels)
+        self._labels = self.labels + [x for x in labels if x not in self.labels]
 
     @RateLimited
     def add_comment(self, comment=None):
         """Adds a comment to the Issue using the GitHub API"""
         self.get_issue().create_comment(comment)
 
-    @RateLimited
+    @RetryOnRateLimit
     def remove_comment_by_id(self, commentid):
         if not isinstance(commentid, int):
             raise Exception("commentIds must be integers!")
@@ -408,6 +491,11 @@ class DefaultWrapper(object):
             assignees.remove(user)
             self._edit_assignees(assignees)
 
+    def set_assignees(self, assignees):
+        if sorted(assignees) != sorted(self.assignees):
+            self._edit_assignees(assignees)
+            self._assignees = [x for x in assignees]
+
     @RateLimited
     def _edit_assignees(self, assignees):
         # https://github.com/PyGithub/PyGithub/pull/469/files
@@ -525,14 +613,50 @@ class DefaultWrapper(object):
             self._pr = self.repo.get_pullrequest(self.number)
         return self._pr
 
+    # names used by prefetch() and the attributes they load
+    PREFETCH = {
+        u'history': [u'history'],
+        u'pullrequest': [u'pullrequest_raw_data'],
+        u'pr_status': [u'pullrequest_status'],
+        u'reviews': [u'reviews'],
+        # merge_commits warms the cached commit requests
+        u'commits': [u'commits', u'merge_commits'],
+        u'files': [u'files', u'renamed_files'],
+    }
+
     def update_pullrequest(self):
         if self.is_pullrequest():
             # the underlying call is wrapper with ratelimited ...
             self._pr = self.repo.get_pullrequest(self.number)
-            self.get_pullrequest_status(force_fetch=True)
-            self._pr_reviews = False
-            self._merge_commits = False
-            self._committer_emails = False
+            self.get_pullrequest_status(force_fetch=self._details is None)
+            if self._details is None:
+                self._pr_reviews = False
+                self._merge_commits = False
+                self._committer_emails = False
+
+    def prefetch(self, needs=None):
+        '''Fetch the lazily loaded github data in one batch
+
+        needs is a set of names from PREFETCH, by default everything.
+        '''
+        if needs is None:
+            needs = set(self.PREFETCH.keys())
+        if not self.is_pullrequest():
+            needs = needs & set([u'history'])
+
+        # everything else hangs off the pullrequest object
+        if u'pullrequest' in needs:
+            self.pullrequest_raw_data
+
+        # one after the other, the prefetch pipeline already overlaps
+        # issues, and the history reuses the reviews and commits
+        for name in sorted(needs, key=lambda x: (x == u'history', x)):
+            if name == u'pullrequest':
+                continue
+            for attr in self.PREFETCH[name]:
+                getattr(self, attr)
+
+        self.prefetched = True
 
     @property
     @RateLimited
@@ -550,15 +674,15 @@ class DefaultWrapper(object):
         rd = self.pullrequest_raw_data
         surl = rd[u'statuses_url']
 
-        pfile = os.path.join(self.full_cachedir, u'pr_status.pickle')
-        pdir = os.path.dirname(pfile)
-        if not os.path.isdir(pdir):
-            os.makedirs(pdir)
+        pdata = self.store.get(self.repo_full_name, self.number, u'pr_status')
+        cached = pdata is not None
 
-        if os.path.isfile(pfile):
-            logging.info(u'pullrequest_status load pfile')
-            with open(pfile, 'rb') as f:
-                pdata = pickle_load(f)
+        if pdata and not force_fetch and self._status_contexts is not None:
+            # the graphql query already saw the current statuses
+            known = set([(x[u'context'], x[u'state'], x[u'target_url']) for x in pdata[1]])
+            current = set([(x[u'context'], x[u'state'], x[u'target_url']) for x in self._status_contexts])
+            if current <= known:
+                return pdata[1]
 
         if pdata:
             # is the data stale?
@@ -584,22 +708,16 @@ class DefaultWrapper(object):
             # FIXME? should we self.log_ci_status(jdata) here too?
             fetched = True
 
-        if fetched or not os.path.isfile(pfile):
-            logging.info(u'writing %s' % pfile)
+        if fetched or not cached:
+            logging.info(u'caching the pullrequest status of #%s' % self.number)
             pdata = (self.pullrequest.updated_at, jdata)
-            with open(pfile, 'wb') as f:
-                pickle_dump(pdata, f)
+            self.store.set(self.repo_full_name, self.number, u'pr_status', pdata)
 
         return jdata
 
     def log_ci_status(self, status_data):
         '''Keep track of historical CI statuses'''
-        logfile = os.path.join(self.full_cachedir, u'pr_status_log.json')
-
-        jdata = {}
-        if os.path.isfile(logfile):
-            with open(logfile, 'r') as f:
-                jdata = json.loads(f.read())
+        jdata = self.store.get(self.repo_full_name, self.number, u'pr_status_log') or {}
 
         # the "url" field is constant
         # the "target_url" field varies between CI providers
@@ -627,8 +745,7 @@ class DefaultWrapper(object):
             if ts not in jdata[turl][u'history']:
                 jdata[turl][u'history'][ts] = sd[u'state']
 
-        with open(logfile, 'w') as f:
-            f.write(json.dumps(jdata))
+        self.store.set(self.repo_full_name, self.number, u'pr_status_log', jdata)
 
     @property
     def pullrequest_status(self):
@@ -710,22 +827,14 @@ class DefaultWrapper(object):
         jdata = self.paginated_request(reviews_url, headers=headers)
         return jdata
 
-    @RateLimited
+    @RetryOnRateLimit
     def paginated_request(self, url, headers=None):
         if headers is None:
             headers = {}
 
         jdata = []
-        counter = 0
-        while True or counter <= 100:
-            counter += 1
-            status, hdrs, body = self.instance._requester.requestJson(
-                u'GET',
-                url,
-                headers=headers
-            )
-            _jdata = json.loads(body)
-
+        # pages after the first are fetched concurrently when possible
+        for status, hdrs, _jdata in self.github.iter_pages(url, headers=headers):
             if isinstance(_jdata, dict):
                 logging.error(
                     u'get_reviews | pr_reviews.keys=%s | pr_reviews.len=%s | '
@@ -753,16 +862,6 @@ class DefaultWrapper(object):
 
             jdata += _jdata
 
-            if not 'link' in hdrs:
-                break
-            link = hdrs['link']
-            links = link.split(',')
-            np = [x for x in links if 'next' in x]
-            if not np:
-                break
-            url =  re.search('\<.*\>', np[0]).group()
-            url = url.replace('<', '').replace('>', '')
-
         return jdata
 
     @property
@@ -854,27 +953,24 @@ class DefaultWrapper(object):
 
         return self.incoming_repo_slug != u'ansible/ansible'
 
-    @RateLimited
     def get_commit_parents(self, commit):
         # https://github.com/ansible/ansibullbot/issues/391
+        # get_cached_request is rate limited and memoized for the run
         cdata = self.github.get_cached_request(commit.url)
         parents = cdata['parents']
         return parents
 
-    @RateLimited
     def get_commit_message(self, commit):
         # https://github.com/ansible/ansibullbot/issues/391
         cdata = self.github.get_cached_request(commit.url)
         msg = cdata['commit']['message']
         return msg
 
-    @RateLimited
     def get_commit_files(self, commit):
         cdata = self.github.get_cached_request(commit.url)
         files = cdata.get('files', [])
         return files
 
-    @RateLimited
     def get_commit_login(self, commit):
         cdata = self.github.get_cached_request(commit.url)
 
@@ -1019,15 +1115,8 @@ class DefaultWrapper(object):
         sha = self.pullrequest.head.sha
         pdata = None
         resp = None
-        cache_file_name = filepath.replace('.', '_').replace('/', '_') + '.pickle'
-        cachefile = os.path.join(self.full_cachedir, cache_file_name)
-
-        try:
-            if os.path.isfile(cachefile):
-                with open(cachefile, 'rb') as f:
-                    pdata = pickle_load(f)
-        except Exception as e:
-            logging.error(u'failed to unpickle %s %s' % (cachefile, to_text(e)))
+        kind = filepath_kind(filepath)
+        pdata = self.store.get(self.repo_full_name, self.number, kind)
 
         if not pdata or pdata[0] != sha:
 
@@ -1044,8 +1133,7 @@ class DefaultWrapper(object):
                 resp = [None]
 
             pdata = [sha, resp]
-            with open(cachefile, 'wb') as f:
-                pickle_dump(pdata, f)
+            self.store.set(self.repo_full_name, self.number, kind, pdata)
 
         else:
             resp = pdata[1]
@@ -2,30 +2,112 @@
 
 from __future__ import print_function
 
-import glob
 import json
 import logging
 import os
 import re
-import requests
 import shutil
+import threading
 from datetime import datetime
 
 import ansibullbot.constants as C
 
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from requests.structures import CaseInsensitiveDict
+from six.moves.urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-from ansibullbot._pickle_compat import pickle_dump, pickle_load
+from ansibullbot._pickle_compat import pickle_dump
 from ansibullbot._text_compat import to_text
-from ansibullbot.decorators.github import RateLimited
+from ansibullbot.decorators.github import RateLimited, RetryOnRateLimit
 from ansibullbot.errors import RateLimitError
-from ansibullbot.utils.file_tools import read_gzip_json_file, write_gzip_json_file
+import ansibullbot.utils.instrumentation as instrumentation
+import ansibullbot.utils.ratelimit as ratelimit
+from ansibullbot.utils.blob_store import BlobStore
+from ansibullbot.utils.cache_store import get_store, property_kind
+from ansibullbot.utils.file_tools import read_gzip_json_file
+from ansibullbot.utils.memo import SingleFlightMemo
 from ansibullbot.utils.sqlite_utils import AnsibullbotDatabase
+import ansibullbot.utils.transport as transport
 
 
 ADB = AnsibullbotDatabase()
 
 
+def page_number(url):
+    '''The page a listing url asks for, 1 without a page parameter'''
+    query = dict(parse_qsl(urlsplit(url).query, keep_blank_values=True))
+    try:
+        return int(query.get(u'page', 1))
+    except ValueError:
+        return 1
+
+
+def page_urls(last_url, start=2):
+    '''The urls of page start up to the rel=last page'''
+    parts = urlsplit(last_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    last = int(dict(query)[u'page'])
+
+    urls = []
+    for page in range(start, last + 1):
+        _query = [(k, v) if k != u'page' else (k, to_text(page)) for k, v in query]
+        urls.append(urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(_query), parts.fragment)))
+    return urls
+
+
+def merge_page(data, page):
+    '''Add a page of a listing to the pages before it'''
+    if isinstance(data, list) and isinstance(page, list):
+        data.extend(page)
+        return data
+
+    if isinstance(data, dict) and isinstance(page, dict):
+        # search results and the like wrap the list in a dict
+        lists = [k for k, v in data.items() if isinstance(v, list)]
+        if lists and sorted(lists) == sorted([k for k, v in page.items() if isinstance(v, list)]):
+            for k in lists:
+                data[k].extend(page[k])
+            return data
+
+    raise TypeError(u'can not merge a %s page into a %s' % (type(page), type(data)))
+
+
+def wrap_requester(gh):
+    '''Serialize the requests of a Github connection and route its tokens
+
+    PyGithub keeps a single connection object per requester and stores
+    the request on it until the response is read, so threads sharing
+    the objects of one connection could read each other's responses.
+
+    PyGithub also always sends the token it was created with. Like the
+    transport, the requests are sent with the token of the pool that
+    @RateLimited took the budget from, and their rate limit headers
+    update the budget of the token that was sent.
+    '''
+    requester = getattr(gh, u'_Github__requester', None)
+    if requester is None or getattr(requester, u'_ansibullbot_lock', None):
+        return gh
+
+    # redirects and 202s re-enter the request
+    lock = threading.RLock()
+    request_raw = requester._Requester__requestRaw
+
+    def _request_raw(cnx, verb, url, request_headers, *args, **kwargs):
+        if request_headers.get(u'Authorization'):
+            resource = u'graphql' if url.rstrip(u'/').endswith(u'/graphql') else u'core'
+            request_headers[u'Authorization'] = ratelimit.pool_authorization(
+                request_headers[u'Authorization'], resource=resource)
+        with lock:
+            result = request_raw(cnx, verb, url, request_headers, *args, **kwargs)
+        ratelimit.observe_headers(request_headers, CaseInsensitiveDict(result[1]))
+        return result
+
+    requester._Requester__requestRaw = _request_raw
+    requester._ansibullbot_lock = lock
+    return gh
+
+
 class GithubWrapper(object):
     def __init__(self, gh, token=None, username=None, password=None, cachedir=u'~/.ansibullbot/cache'):
         self.gh = gh
@@ -35,6 +117,19 @@ class GithubWrapper(object):
         self.cachedir = os.path.expanduser(cachedir)
         self.cachefile = os.path.join(self.cachedir, u'github.pickle')
         self.cached_requests_dir = os.path.join(self.cachedir, 'cached_requests')
+        self._cached_requests = None
+        # the wrapper is created per run, so is the memo
+        self.request_memo = SingleFlightMemo(maxsize=C.DEFAULT_REQUEST_MEMO_SIZE)
+
+    @property
+    def cached_requests(self):
+        '''The responses of get_cached_request, bounded by its budget'''
+        if self._cached_requests is None:
+            self._cached_requests = BlobStore(
+                self.cached_requests_dir,
+                max_bytes=C.DEFAULT_CACHED_REQUESTS_MAX_MB * 1024 * 1024
+            )
+        return self._cached_requests
 
     @property
     def accepts_headers(self):
@@ -53,7 +148,7 @@ class GithubWrapper(object):
         org = self.gh.get_organization(org)
         return org
 
-    @RateLimited
+    @RetryOnRateLimit
     def get_repo(self, repo_path, verbose=True):
         repo = RepoWrapper(self.gh, repo_path, verbose=verbose, cachedir=self.cachedir)
         return repo
@@ -64,92 +159,72 @@ class GithubWrapper(object):
     def get_rate_limit(self):
         return self.gh.get_rate_limit().raw_data
 
-    @RateLimited
-    def get_cached_request(self, url):
-
-        '''Use a combination of sqlite and ondisk caching to GET an api resource'''
-
-        url_parts = url.split('/')
-
+    def _load_legacy_request(self, url):
+        '''Move a response cached under the url's path to the blob store'''
         cdf = os.path.join(self.cached_requests_dir, url.replace('https://', '') + '.json.gz')
-        cdd = os.path.dirname(cdf)
-        if not os.path.exists(cdd):
-            os.makedirs(cdd)
-
-        # FIXME - commits are static and can always be used from cache.
-        if url_parts[-2] == 'commits' and os.path.exists(cdf):
-            return read_gzip_json_file(cdf)
-
-        headers = {
-            u'Accept': u','.join(self.accepts_headers),
-            u'Authorization': u'Bearer %s' % self.token,
-        }
+        if not os.path.isfile(cdf):
+            return None
+        try:
+            data = read_gzip_json_file(cdf)
+        except ValueError:
+            data = None
+        os.remove(cdf)
+        if data is not None:
+            self.cached_requests.set(url, data, pinned=True)
+        return data
 
-        meta = ADB.get_github_api_request_meta(url, token=self.token)
-        if meta is None:
-            meta = {}
+    def get_cached_request(self, url):
+        '''GET an api resource once per run, the result must not be modified'''
+        return self.request_memo.get(url, lambda: self._get_cached_request(url))
 
-        # https://developer.github.com/v3/#conditional-requests        
-        etag = meta.get('etag')
-        if etag and os.path.exists(cdf):
-            headers['If-None-Match'] = etag
+    @RetryOnRateLimit
+    def _get_cached_request(self, url):
 
-        rr = requests.get(url, headers=headers)
+        '''GET an api resource, commits are never refetched once on disk'''
 
-        if rr.status_code == 304:
-            # not modified
-            with open(cdf, 'r') as f:
-                data = json.loads(f.read())
-        else:
-            data = rr.json()
+        url_parts = url.split('/')
+        is_commit = url_parts[-2] == 'commits'
 
-            # handle ratelimits ...
-            if isinstance(data, dict) and data.get(u'message'):
-                if data[u'message'].lower().startswith(u'api rate limit exceeded'):
-                    raise RateLimitError()
+        # conditional requests for anything else are handled by the
+        # transport's http cache
+        if not is_commit:
+            return self.merge_pages(self.iter_pages(url))
 
-            # cache data to disk
-            logging.debug('write %s' % cdf)
-            write_gzip_json_file(cdf, data)
+        # commits are static and can always be used from cache
+        data = self.cached_requests.get(url)
+        if data is None:
+            data = self._load_legacy_request(url)
+        if data is not None:
+            instrumentation.count(u'cache_hit')
+            return data
 
-        # save the meta
-        ADB.set_github_api_request_meta(url, rr.headers, cdf, token=self.token)
+        data = self.merge_pages(self.iter_pages(url))
 
-        # pagination
-        if hasattr(rr, u'links') and rr.links and rr.links.get(u'next'):
-            _data = self.get_request(rr.links[u'next'][u'url'])
-            if isinstance(data, list):
-                data += _data
-            else:
-                data.update(_data)
+        logging.debug('cache %s' % url)
+        self.cached_requests.set(url, data, pinned=True)
 
         return data
 
-    @RateLimited
+    @RetryOnRateLimit
     def get_request(self, url):
         '''Get an arbitrary API endpoint'''
+        return self.merge_pages(self.iter_pages(url))
 
-        headers = {
-            u'Accept': u','.join(self.accepts_headers),
-            u'Authorization': u'Bearer %s' % self.token,
-        }
-
-        rr = requests.get(url, headers=headers)
-        data = rr.json()
+    def merge_pages(self, pages):
+        '''The data of the pages from iter_pages as one listing'''
+        data = None
+        for status, headers, page in pages:
+            # handle ratelimits ...
+            if isinstance(page, dict) and page.get(u'message'):
+                if page[u'message'].lower().startswith(u'api rate limit exceeded'):
+                    raise RateLimitError()
 
-        # handle ratelimits ...
-        if isinstance(data, dict) and data.get(u'message'):
-            if data[u'message'].lower().startswith(u'api rate limit exceeded'):
-                raise RateLimitError()
+            if data is None:
+                data = page
+                continue
 
-        # pagination
-        if hasattr(rr, u'links') and rr.links and rr.links.get(u'next'):
-            _data = self.get_request(rr.links[u'next'][u'url'])
             try:
-                if isinstance(data, list):
-                    data += _data
-                elif isinstance(data, dict):
-                    data.update(_data)
+                data = merge_page(data, page)
             except TypeError as e:
                 if C.DEFAULT_BREAKPOINTS:
                     logging.error(u'breakpoint!')
@@ -159,6 +234,55 @@ class GithubWrapper(object):
 
         return data
 
+    def iter_pages(self, url, headers=None):
+        '''Yield the status, headers and data of each page in order
+
+        If the first page links to the last one, the urls in between are
+        known and fetched concurrently. Otherwise rel=next is followed.
+        '''
+        status, hdrs, data = self.get_request_page(url, headers=headers)
+        yield status, hdrs, data
+
+        links = self._links(hdrs)
+        if links.get(u'last') and u'page=' in links[u'last']:
+            # the listing may have been entered past its first page
+            urls = page_urls(links[u'last'], start=page_number(url) + 1)
+            if C.DEFAULT_PAGINATION_WORKERS > 1 and len(urls) > 1:
+                workers = min(C.DEFAULT_PAGINATION_WORKERS, len(urls))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(self.get_request_page, x, headers=headers) for x in urls]
+                    for future in futures:
+                        yield future.result()
+            else:
+                for _url in urls:
+                    yield self.get_request_page(_url, headers=headers)
+            return
+
+        while links.get(u'next'):
+            status, hdrs, data = self.get_request_page(links[u'next'], headers=headers)
+            yield status, hdrs, data
+            links = self._links(hdrs)
+
+    def _links(self, headers):
+        '''rel -> url of a Link header'''
+        links = {}
+        for m in re.finditer(r'<([^>]*)>;\s*rel="(\w+)"', (headers or {}).get(u'Link', u'')):
+            links[m.group(2)] = m.group(1)
+        return links
+
+    @RateLimited
+    def get_request_page(self, url, headers=None):
+        '''Get a single page, returns the status, headers and json data'''
+        _headers = {
+            u'Accept': u','.join(self.accepts_headers),
+            u'Authorization': u'Bearer %s' % self.token,
+        }
+        if headers:
+            _headers.update(headers)
+
+        rr = transport.get(url, headers=_headers)
+        return rr.status_code, rr.headers, rr.json()
+
     @RateLimited
     def delete_request(self, url):
         headers = {
@@ -166,7 +290,7 @@ class GithubWrapper(object):
             u'Authorization': u'Bearer %s' % self.token,
         }
 
-        rr = requests.delete(url, headers=headers)
+        rr = transport.delete(url, headers=headers)
         return rr.ok
 
 
@@ -221,7 +345,7 @@ class RepoWrapper(object):
         url += self.repo_path
         url += u'/issues?q='
 
-        rr = requests.get(url)
+        rr = transport.get(url)
         soup = BeautifulSoup(rr.text, u'html.parser')
         refs = soup.findAll(u'a')
         urls = []
@@ -326,27 +450,18 @@ class RepoWrapper(object):
         with open(mfile, 'wb') as f:
             f.write('\n')
 
+    @property
+    def store(self):
+        return get_store(self.cachedir)
+
     def load_issues(self, state=u'open', filter=None):
         issues = []
-        gfiles = glob.glob(u'%s/issues/*/issue.pickle' % self.cachedir)
-        for gf in gfiles:
-
-            if filter:
-                gf_parts = gf.split(u'/')
-                this_number = gf_parts[-2]
-                this_number = int(this_number)
-                if this_number not in filter:
-                    continue
-
-            logging.debug(u'load %s' % gf)
-            issue = None
-            try:
-                with open(gf, 'rb') as f:
-                    issue = pickle_load(f)
-            except EOFError as e:
-                # this is bad, get rid of it
-                logging.error(e)
-                os.remove(gf)
+        for number in self.store.numbers(self.repo_path, u'issue'):
+            if filter and number not in filter:
+                continue
+
+            logging.debug(u'load %s #%s' % (self.repo_path, number))
+            issue = self.store.get(self.repo_path, number, u'issue')
             if issue:
                 issues.append(issue)
         return issues
@@ -355,81 +470,40 @@ class RepoWrapper(object):
         if not C.DEFAULT_PICKLE_ISSUES:
             return False
 
-        pfile = os.path.join(
-            self.cachedir,
-            u'issues',
-            to_text(number),
-            u'issue.pickle'
-        )
-        if os.path.isfile(pfile):
-            with open(pfile, 'rb') as f:
-                try:
-                    issue = pickle_load(f)
-                except TypeError:
-                    return False
-            return issue
-        else:
+        issue = self.store.get(self.repo_path, number, u'issue')
+        if issue is None:
             return False
+        return issue
 
     def load_pullrequest(self, number):
 
         if not C.DEFAULT_PICKLE_ISSUES:
             return False
 
-        pfile = os.path.join(
-            self.cachedir,
-            u'issues',
-            to_text(number),
-            u'pullrequest.pickle'
-        )
-        pdir = os.path.dirname(pfile)
-        if not os.path.isdir(pdir):
-            os.makedirs(pdir)
-        if os.path.isfile(pfile):
-            with open(pfile, 'rb') as f:
-                issue = pickle_load(f)
-            return issue
-        else:
+        issue = self.store.get(self.repo_path, number, u'pullrequest')
+        if issue is None:
             return False
+        return issue
 
     def save_issues(self, issues):
-        for issue in issues:
-            self.save_issue(issue)
+        with self.store.transaction():
+            for issue in issues:
+                self.save_issue(issue)
 
     def save_issue(self, issue):
 
         if not C.DEFAULT_PICKLE_ISSUES:
             return
 
-        cfile = os.path.join(
-            self.cachedir,
-            u'issues',
-            to_text(issue.number),
-            u'issue.pickle'
-        )
-        cdir = os.path.dirname(cfile)
-        if not os.path.isdir(cdir):
-            os.makedirs(cdir)
-        logging.debug(u'dump %s' % cfile)
-        with open(cfile, 'wb') as f:
-            pickle_dump(issue, f)
+        logging.debug(u'dump %s #%s' % (self.repo_path, issue.number))
+        self.store.set(self.repo_path, issue.number, u'issue', issue)
 
     def save_pullrequest(self, issue):
 
         if not C.DEFAULT_PICKLE_ISSUES:
             return
 
-        cfile = os.path.join(
-            self.cachedir,
-            u'issues',
-            to_text(issue.number),
-            u'pullrequest.pickle'
-        )
-        cdir = os.path.dirname(cfile)
-        if not os.path.isdir(cdir):
-            os.makedirs(cdir)
-        with open(cfile, 'wb') as f:
-            pickle_dump(issue, f)
+        self.store.set(self.repo_path, issue.number, u'pullrequest', issue)
 
     @RateLimited
     def load_update_fetch(self, property_name):
@@ -442,28 +516,19 @@ class RepoWrapper(object):
         write_cache = False
         self.repo.update()
 
-        pfile = os.path.join(self.cachedir, u'%s.pickle' % property_name)
-        pdir = os.path.dirname(pfile)
-
-        if not os.path.isdir(pdir):
-            os.makedirs(pdir)
+        kind = property_kind(property_name)
+        edata = self.store.get(self.repo_path, 0, kind)
+        if edata is None:
+            write_cache = True
 
-        if os.path.isfile(pfile):
-            try:
-                with open(pfile, 'rb') as f:
-                    edata = pickle_load(f)
-            except Exception as e:
+        # check the timestamp on the cache
+        if edata:
+            updated = edata[0]
+            events = edata[1]
+            if updated < self.repo.updated_at:
                 update = True
                 write_cache = True
 
-            # check the timestamp on the cache
-            if edata:
-                updated = edata[0]
-                events = edata[1]
-                if updated < self.repo.updated_at:
-                    update = True
-                    write_cache = True
-
         # pull all events if timestamp is behind or no events cached
         if update or not events:
             write_cache = True
@@ -480,11 +545,9 @@ class RepoWrapper(object):
             events = [x for x in methodToCall()]
 
         if C.DEFAULT_PICKLE_ISSUES:
-            if write_cache or not os.path.isfile(pfile):
-                # need to dump the pickle back to disk
+            if write_cache:
                 edata = [updated, events]
-                with open(pfile, 'wb') as f:
-                    pickle_dump(edata, f)
+                self.store.set(self.repo_path, 0, kind, edata)
 
         return events
 
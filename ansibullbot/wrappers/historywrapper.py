@@ -6,8 +6,9 @@ from operator import itemgetter
 import pytz
 
 import ansibullbot.constants as C
-from ansibullbot._pickle_compat import pickle_dump, pickle_load
 from ansibullbot._text_compat import to_text
+import ansibullbot.utils.instrumentation as instrumentation
+from ansibullbot.utils.cache_store import get_store
 from ansibullbot.utils.timetools import strip_time_safely
 
 
@@ -77,19 +78,41 @@ class HistoryWrapper(object):
         if usecache:
             cache = self._load_cache()
 
-            if not self.validate_cache(cache):
+            if self.validate_cache(cache):
+                logging.info(u'use cached history')
+                instrumentation.count(u'cache_hit')
+                self.history = cache[u'history']
+            elif self._append_new_events(cache):
+                logging.info(u'appended new events to the cached history')
+                instrumentation.count(u'cache_append')
+                self._dump_cache()
+            else:
                 logging.info(u'history cache invalidated, rebuilding')
+                instrumentation.count(u'cache_miss')
                 self.history = self.issue.events
                 self._dump_cache()
-            else:
-                logging.info(u'use cached history')
-                self.history = cache[u'history']
         else:
             self.history = self.issue.events
 
         self.history = sorted(self.history, key=itemgetter(u'created_at'))
 
-    def validate_cache(self, cache):
+    def _append_new_events(self, cache):
+        '''Extend a cache that is only behind the issue with the new events'''
+        if not self.validate_cache(cache, check_updated=False):
+            return False
+
+        get_new_events = getattr(self.issue, u'get_new_events', None)
+        if get_new_events is None:
+            return False
+
+        new_events = get_new_events(set(x.get(u'id') for x in cache[u'history']))
+        if new_events is None:
+            return False
+
+        self.history = cache[u'history'] + new_events
+        return True
+
+    def validate_cache(self, cache, check_updated=True):
         if cache is None:
             return False
 
@@ -107,7 +130,7 @@ class HistoryWrapper(object):
             logging.info('history cache schema version behind')
             return False
 
-        if cache[u'updated_at'] < self.issue.instance.updated_at:
+        if check_updated and cache[u'updated_at'] < self.issue.instance.updated_at:
             logging.info('history cache behind issue')
             return False
 
@@ -124,19 +147,16 @@ class HistoryWrapper(object):
 
         return True
 
+    @property
+    def store(self):
+        # the cachefile is <repo cachedir>/issues/<number>/history.pickle
+        return get_store(os.path.dirname(os.path.dirname(self.cachedir)))
+
     def _load_cache(self):
-        if not os.path.isdir(self.cachedir):
-            os.makedirs(self.cachedir)
-        if not os.path.isfile(self.cachefile):
+        cachedata = self.store.get(self.issue.repo.repo_path, self.issue.instance.number, u'history')
+        if not isinstance(cachedata, dict) or u'history' not in cachedata:
             logging.info(u'!%s' % self.cachefile)
             return None
-        try:
-            with open(self.cachefile, 'rb') as f:
-                cachedata = pickle_load(f)
-        except Exception as e:
-            logging.debug(e)
-            logging.info(u'%s failed to load' % self.cachefile)
-            cachedata = None
 
         cachedata[u'history'] = self._fix_event_bytes(cachedata[u'history'])
 
@@ -147,9 +167,6 @@ class HistoryWrapper(object):
             logging.error(self.history)
             raise AssertionError(u'found a non-datetime created_at in events data')
 
-        if not os.path.isdir(self.cachedir):
-            os.makedirs(self.cachedir)
-
         # keep the timestamp
         cachedata = {
             u'version': self.SCHEMA_VERSION,
@@ -158,8 +175,7 @@ class HistoryWrapper(object):
         }
 
         try:
-            with open(self.cachefile, 'wb') as f:
-                pickle_dump(cachedata, f)
+            self.store.set(self.issue.repo.repo_path, self.issue.instance.number, u'history', cachedata)
         except Exception as e:
             logging.error(e)
             if C.DEFAULT_BREAKPOINTS:
@@ -236,6 +252,26 @@ class HistoryWrapper(object):
             self.history.append(event)
         self.history = sorted(self.history, key=itemgetter(u'created_at'))
 
+    def record_event(self, event, actor, **kwargs):
+        '''Add an event the bot just caused instead of refetching the timeline'''
+        created_at = kwargs.pop(u'created_at', None)
+        if created_at is None:
+            created_at = pytz.utc.localize(datetime.datetime.utcnow())
+        kwargs.update({
+            u'id': kwargs.get(u'id'),
+            u'actor': actor,
+            u'event': event,
+            u'created_at': created_at,
+        })
+        self.history.append(kwargs)
+        self.history = sorted(self.history, key=itemgetter(u'created_at'))
+
+    def remove_comment(self, commentid):
+        self.history = [
+            x for x in self.history
+            if not (x[u'event'] == u'commented' and x.get(u'id') == commentid)
+        ]
+
     def merge_history(self, oldhistory):
         '''Combine history from another issue [migration]'''
         self.history += oldhistory
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+'''
+Compare the size and speed of the cache codec with protocol 0 pickles.
+
+Benchmark the pickles of an existing cache:
+
+    benchmark_cache_codec.py --cachedir ~/.ansibullbot/cache/ansible/ansible
+
+or, without a cache, a set of generated issue histories:
+
+    benchmark_cache_codec.py --issues 200
+'''
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import glob
+import os
+import pickle
+import random
+import time
+
+from ansibullbot._pickle_compat import pickle_dumps, pickle_load, pickle_loads
+
+
+EVENTS = [u'labeled', u'unlabeled', u'commented', u'assigned', u'committed', u'reviewed']
+
+
+def generate_histories(count, seed=0):
+    '''Issue history caches shaped like the ones HistoryWrapper writes'''
+    rnd = random.Random(seed)
+    start = datetime.datetime(2017, 1, 1)
+    histories = []
+    for _ in range(count):
+        events = []
+        for idx in range(rnd.randint(10, 200)):
+            event = {
+                u'id': rnd.randint(1, 10 ** 9),
+                u'actor': u'user%s' % rnd.randint(1, 500),
+                u'event': rnd.choice(EVENTS),
+                u'created_at': start + datetime.timedelta(minutes=idx * rnd.randint(1, 600)),
+            }
+            if event[u'event'] in (u'labeled', u'unlabeled'):
+                event[u'label'] = u'label%s' % rnd.randint(1, 80)
+            if event[u'event'] == u'commented':
+                event[u'body'] = u' '.join(u'word%s' % rnd.randint(1, 2000) for _ in range(rnd.randint(5, 80)))
+            events.append(event)
+        histories.append({u'version': 1.0, u'updated_at': events[-1][u'created_at'], u'history': events})
+    return histories
+
+
+def load_cachedir(cachedir):
+    objs = []
+    for fn in glob.glob(os.path.join(cachedir, u'**', u'*.pickle'), recursive=True):
+        try:
+            with open(fn, 'rb') as f:
+                objs.append(pickle_load(f))
+        except Exception as e:
+            print(u'skipping %s: %s' % (fn, e))
+    return objs
+
+
+def measure(objs, dumps, loads, rounds):
+    dump_time = load_time = 0.0
+    size = 0
+    for _ in range(rounds):
+        ts = time.time()
+        blobs = [dumps(x) for x in objs]
+        dump_time += time.time() - ts
+        ts = time.time()
+        for blob in blobs:
+            loads(blob)
+        load_time += time.time() - ts
+        size = sum(len(x) for x in blobs)
+    return size, dump_time / rounds, load_time / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(u'--cachedir', help=u'benchmark the pickles of this cache')
+    parser.add_argument(u'--issues', type=int, default=200, help=u'number of generated histories')
+    parser.add_argument(u'--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.cachedir:
+        objs = load_cachedir(os.path.expanduser(args.cachedir))
+    else:
+        objs = generate_histories(args.issues)
+    print(u'%s objects' % len(objs))
+
+    formats = [
+        (u'protocol 0', lambda x: pickle.dumps(x, protocol=0), lambda x: pickle.loads(x, encoding='bytes')),
+        (u'cache codec', pickle_dumps, pickle_loads),
+    ]
+    results = []
+    for name, dumps, loads in formats:
+        size, dump_time, load_time = measure(objs, dumps, loads, args.rounds)
+        results.append((name, size, dump_time, load_time))
+
+    print(u'%-12s %12s %10s %10s' % (u'format', u'bytes', u'dump s', u'load s'))
+    for name, size, dump_time, load_time in results:
+        print(u'%-12s %12d %10.3f %10.3f' % (name, size, dump_time, load_time))
+
+    base = results[0]
+    for name, size, dump_time, load_time in results[1:]:
+        print(u'%s: %.1fx smaller, %.1fx faster dumps, %.1fx faster loads' % (
+            name,
+            float(base[1]) / size,
+            base[2] / max(dump_time, 1e-9),
+            base[3] / max(load_time, 1e-9),
+        ))
+
+
+if __name__ == u'__main__':
+    main()
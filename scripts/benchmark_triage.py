@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+'''
+Measure end to end triage throughput without talking to GitHub.
+
+Record the http traffic of a dry run for a set of issues once:
+
+    benchmark_triage.py record /tmp/bench -- --id 1234,5678
+
+and replay it as often as needed, offline and deterministically:
+
+    benchmark_triage.py replay /tmp/bench
+
+Both start from an empty cache so the replay makes the same requests
+the recording did. The checkout is copied into the archive and pinned
+to the recorded commit on replay.
+'''
+
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from ansibullbot._json_compat import json_dump
+from ansibullbot.triagers.ansible import AnsibleTriage
+from ansibullbot.utils import replay
+
+
+def peak_rss():
+    '''Peak resident memory in MB of this process and any forked workers'''
+    usage = [
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    ]
+    # linux reports kilobytes, macos bytes
+    divisor = 1024.0 * 1024.0 if sys.platform == u'darwin' else 1024.0
+    return max(usage) / divisor
+
+
+def run_triager(args, cachedir):
+    args = args + [u'--dry-run', u'--cachedir', cachedir]
+
+    ts1 = time.time()
+    triager = AnsibleTriage(args=args)
+    ts2 = time.time()
+    triager.start()
+    ts3 = time.time()
+
+    issues = sum([len(x[u'processed']) for x in triager.repos.values()])
+    elapsed = ts3 - ts2
+
+    stages = {}
+    rfile = os.path.join(cachedir, u'instrumentation.json')
+    if os.path.isfile(rfile):
+        with io.open(rfile, 'r', encoding='utf-8') as f:
+            stages = json.load(f)
+
+    results = {
+        u'setup_seconds': ts2 - ts1,
+        u'triage_seconds': elapsed,
+        u'issues': issues,
+        u'issues_per_second': issues / elapsed if elapsed else None,
+        u'peak_rss_mb': peak_rss(),
+        u'stages': stages,
+    }
+    return triager, results
+
+
+def record(archive_path, args):
+    cachedir = tempfile.mkdtemp(prefix=u'ansibullbot-bench-')
+    archive = replay.record(replay.HTTPArchive(archive_path))
+    try:
+        triager, results = run_triager(args, cachedir)
+    finally:
+        replay.uninstall()
+
+    checkoutdir = triager.gitrepo.checkoutdir
+    archive.manifest = {
+        u'args': args,
+        u'commit': triager.gitrepo.get_head(),
+        u'checkout': os.path.relpath(checkoutdir, cachedir),
+        u'exchanges': len(archive.exchanges),
+    }
+    archive.save()
+
+    dest = os.path.join(archive_path, u'checkout')
+    if os.path.isdir(dest):
+        shutil.rmtree(dest)
+    shutil.copytree(checkoutdir, dest, symlinks=True)
+
+    shutil.rmtree(cachedir)
+    return results
+
+
+def replay_archive(archive_path, args):
+    archive = replay.HTTPArchive(archive_path).load()
+    manifest = archive.manifest
+
+    cachedir = tempfile.mkdtemp(prefix=u'ansibullbot-bench-')
+    shutil.copytree(
+        os.path.join(archive_path, u'checkout'),
+        os.path.join(cachedir, manifest[u'checkout']),
+        symlinks=True
+    )
+
+    # extra args are appended so they can override the recorded ones
+    args = manifest[u'args'] + args
+    if manifest.get(u'commit'):
+        # never pull during a replay
+        args += [u'--commit', manifest[u'commit']]
+
+    stand_in = replay.replay(archive)
+    try:
+        triager, results = run_triager(args, cachedir)
+    finally:
+        replay.uninstall()
+
+    results[u'replay_misses'] = stand_in.misses
+    if stand_in.misses:
+        logging.warning(u'%s requests were not in the archive' % len(stand_in.misses))
+
+    shutil.rmtree(cachedir)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(u'mode', choices=[u'record', u'replay'])
+    parser.add_argument(u'archive', help=u'directory holding the recorded traffic')
+    parser.add_argument(u'--output', help=u'also write the results to this file')
+    parser.add_argument(u'triager_args', nargs=argparse.REMAINDER,
+                        help=u'passed to the triager after --')
+    args = parser.parse_args()
+
+    triager_args = args.triager_args
+    if triager_args and triager_args[0] == u'--':
+        triager_args = triager_args[1:]
+
+    if args.mode == u'record':
+        results = record(args.archive, triager_args)
+    else:
+        results = replay_archive(args.archive, triager_args)
+
+    if args.output:
+        with io.open(args.output, 'w', encoding='utf-8') as f:
+            json_dump(results, f)
+
+    summary = dict((k, v) for k, v in results.items() if k not in (u'stages', u'replay_misses'))
+    print(json.dumps(summary, indent=2, sort_keys=True))
+
+
+if __name__ == u'__main__':
+    main()
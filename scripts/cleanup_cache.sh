@@ -1,5 +1,7 @@
 #!/bin/bash
 
+# The responses are kept in a size bounded blob store now, this only
+# removes the stale files of the old one file per url layout.
 CACHEDIR=~/.ansibullbot/cache/shippable.runs/.raw
 
-find $CACHEDIR -type f -atime +2 | xargs rm -f
+find $CACHEDIR -maxdepth 1 -type f -name '*.json*' -atime +2 | xargs rm -f
@@ -8,6 +8,7 @@ import time
 from pprint import pprint
 
 from ansibullbot.utils.gh_gql_client import GithubGraphQLClient
+from ansibullbot.utils.summary_table import SummaryTable
 from ansibullbot.wrappers.ghapiwrapper import GithubWrapper
 
 import ansibullbot.constants as C
@@ -35,11 +36,7 @@ def main():
         with open(gq_cache_file, 'r') as f:
             summaries = json.loads(f.read())
 
-    numbers = set()
-    for k,v in summaries.items():
-        if v['state'] != 'open':
-            continue
-        numbers.add(v['number'])
+    numbers = SummaryTable(summaries).select(state='open')
     numbers = sorted(numbers, reverse=True)
 
     gh = GithubWrapper(None, token=C.DEFAULT_GITHUB_TOKEN)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+'''
+Archive or delete the caches of closed issues.
+
+    gc_cache.py ~/.ansibullbot/cache --retention 90 [--max_mb 4096] [--delete] [--dry-run]
+
+Which issues are closed comes from the graphql summary store of each
+<org>/<repo>, repos without one are skipped. Archived issues are put
+back with:
+
+    gc_cache.py ~/.ansibullbot/cache --restore ansible/ansible 1234
+'''
+
+from __future__ import print_function
+
+import argparse
+import glob
+import logging
+import os
+
+import ansibullbot.constants as C
+from ansibullbot.utils.cache_gc import CacheCollector
+from ansibullbot.utils.file_tools import read_gzip_json_file
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(u'cachedir', nargs=u'?', default=u'~/.ansibullbot/cache')
+    parser.add_argument(u'--retention', type=int, default=C.DEFAULT_CACHE_GC_RETENTION or 90,
+                        help=u'keep issues closed within this many days')
+    parser.add_argument(u'--max_mb', type=int, default=C.DEFAULT_CACHE_GC_MAX_MB,
+                        help=u'collect closed issues until each repo cache fits')
+    parser.add_argument(u'--delete', action=u'store_true', help=u'delete instead of archiving')
+    parser.add_argument(u'--dry-run', action=u'store_true', dest=u'dry_run')
+    parser.add_argument(u'--restore', nargs=2, metavar=(u'REPO', u'NUMBER'),
+                        help=u'put an archived issue back')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cachedir = os.path.expanduser(args.cachedir)
+
+    if args.restore:
+        repo, number = args.restore
+        collector = CacheCollector(os.path.join(cachedir, repo), repo)
+        if not collector.restore(int(number)):
+            raise SystemExit(u'%s#%s is not archived' % (repo, number))
+        return
+
+    for summaryfile in sorted(glob.glob(os.path.join(cachedir, u'*', u'*', u'graphql_summaries.json.gz'))):
+        repodir = os.path.dirname(summaryfile)
+        repo = os.path.relpath(repodir, cachedir)
+        summaries = read_gzip_json_file(summaryfile).get(u'nodes', {})
+
+        report = CacheCollector(repodir, repo).collect(
+            summaries,
+            args.retention,
+            max_bytes=args.max_mb * 1024 * 1024,
+            archive=not args.delete,
+            dry_run=args.dry_run,
+        )
+        print(u'%s: collected %s of %s issues, %s of %s bytes%s' % (
+            repo,
+            report[u'collected'],
+            report[u'issues'],
+            report[u'freed'],
+            report[u'bytes'],
+            u', archived to %s' % report[u'archive'] if report[u'archive'] else u'',
+        ))
+
+
+if __name__ == u'__main__':
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+'''
+Import the pickle and json files of existing cachedirs into the sqlite
+issue cache store.
+
+    migrate_issue_cache.py ~/.ansibullbot/cache [--delete]
+
+Every <org>/<repo> with an issues directory gets its issue_cache.sqlite.
+'''
+
+from __future__ import print_function
+
+import argparse
+import glob
+import logging
+import os
+
+from ansibullbot.utils.cache_store import get_store, migrate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(u'cachedir', nargs=u'?', default=u'~/.ansibullbot/cache')
+    parser.add_argument(u'--delete', action=u'store_true', help=u'remove the files once imported')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    cachedir = os.path.expanduser(args.cachedir)
+    for issuesdir in sorted(glob.glob(os.path.join(cachedir, u'*', u'*', u'issues'))):
+        repodir = os.path.dirname(issuesdir)
+        repo = os.path.relpath(repodir, cachedir)
+        count = migrate(repodir, repo, store=get_store(repodir, backend=u'sqlite'), delete=args.delete)
+        print(u'%s: %s entries' % (repo, count))
+
+
+if __name__ == u'__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+'''
+Serve synthetic GitHub and Shippable APIs for load and scale tests.
+
+    tests/bin/github_sim.py generate --issues 100000 --latency 0.05
+
+and point the bot at it in ansibullbot.cfg:
+
+    [defaults]
+    github_url=http://localhost:5000
+    shippable_url=http://localhost:5000
+
+Recorded responses can be layered on top of the generated data:
+
+    tests/bin/github_sim.py load --fixtures tests/fixtures/issues/2018-12-18
+'''
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), u'..', u'..'))
+
+from tests.utils.github_sim import Simulator, SimulatorServer, SyntheticRepo
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(u'mode', nargs=u'?', choices=[u'generate', u'load'], default=u'generate')
+    # older runners pass the mode as a flag
+    parser.add_argument(u'--generate', action=u'store_true', help=argparse.SUPPRESS)
+    parser.add_argument(u'--fixtures', help=u'directory of json responses served instead of generated ones')
+    parser.add_argument(u'--host', default=u'0.0.0.0')
+    parser.add_argument(u'--port', type=int, default=5000)
+    parser.add_argument(u'--base_url', help=u'url the bot reaches the simulator at, for the links')
+    parser.add_argument(u'--repo', action=u'append', help=u'owner/name, repeatable')
+    parser.add_argument(u'--issues', type=int, default=1000, help=u'issues and pullrequests per repo')
+    parser.add_argument(u'--pullrequest_ratio', type=float, default=0.4)
+    parser.add_argument(u'--open_ratio', type=float, default=0.2)
+    parser.add_argument(u'--events', type=int, default=20, help=u'mean timeline events per issue')
+    parser.add_argument(u'--files', type=int, default=5, help=u'maximum files per pullrequest')
+    parser.add_argument(u'--seed', type=int, default=0)
+    parser.add_argument(u'--latency', type=float, default=0.0, help=u'seconds added to each response')
+    parser.add_argument(u'--jitter', type=float, default=0.5, help=u'relative spread of the latency')
+    parser.add_argument(u'--ratelimit', type=int, default=5000, help=u'points per token and hour')
+    parser.add_argument(u'--no_conditional', action=u'store_true', help=u'never answer with a 304')
+    parser.add_argument(u'--debug', action=u'store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    fixtures = None
+    if args.mode == u'load':
+        if not args.fixtures:
+            parser.error(u'load needs --fixtures')
+        # docker run passes the argument without a shell
+        fixtures = args.fixtures.strip(u'"\'')
+
+    repos = [
+        SyntheticRepo(
+            x,
+            issues=args.issues,
+            pullrequest_ratio=args.pullrequest_ratio,
+            open_ratio=args.open_ratio,
+            events=args.events,
+            files=args.files,
+            seed=args.seed,
+        )
+        for x in (args.repo or [u'ansible/ansible'])
+    ]
+    sim = Simulator(
+        repos,
+        fixtures=fixtures,
+        latency=args.latency,
+        jitter=args.jitter,
+        ratelimit=args.ratelimit,
+        conditional=not args.no_conditional,
+        base_url=args.base_url,
+    )
+
+    server = SimulatorServer((args.host, args.port), sim)
+    logging.info(u'serving %s on %s' % (u', '.join([x.full_name for x in repos]), sim.base_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    logging.info(u'requests: %s' % dict(sim.counts))
+
+
+if __name__ == u'__main__':
+    main()
@@ -29,7 +29,7 @@ def SleepMock(duration):
 @mock.patch('ansibullbot.decorators.github.C.DEFAULT_GITHUB_TOKEN', 'abcde12345')
 @mock.patch('ansibullbot.decorators.github.C.DEFAULT_GITHUB_URL', None)
 @mock.patch('ansibullbot.decorators.github.time.sleep', SleepMock)
-@mock.patch('ansibullbot.decorators.github.requests.get')
+@mock.patch('ansibullbot.decorators.github.transport.get')
 def test_get_rate_limit(mock_requests_get):
 
     '''Basic check of get_rate_limit api'''
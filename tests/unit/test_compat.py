@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 import io
 import json
+import pickle
+
+import pytest
 
 from ansibullbot._json_compat import json_dump, json_dumps
+from ansibullbot._pickle_compat import CACHE_HEADER, pickle_dump, pickle_dumps, pickle_load, pickle_loads
 
 
 TEST_DATA = {u'їдло': u'jídlo'}
@@ -41,3 +45,38 @@ def test_json_dump_to_stringio():
 def test_json_dumps():
     dumped_data = json_dumps(TEST_DATA)
     assert dumped_data == STRING_DATA
+
+
+PICKLE_DATA = {u'history': [{u'event': u'labeled', u'label': u'bug'}], u'version': 1.0}
+
+
+def test_pickle_roundtrip(tmpdir):
+    p = str(tmpdir.join('test_cache.pickle'))
+
+    with open(p, 'wb') as f:
+        pickle_dump(PICKLE_DATA, f)
+
+    with open(p, 'rb') as f:
+        assert f.read(len(CACHE_HEADER)) == CACHE_HEADER
+
+    with open(p, 'rb') as f:
+        assert pickle_load(f) == PICKLE_DATA
+
+    assert pickle_loads(pickle_dumps(PICKLE_DATA)) == PICKLE_DATA
+
+
+def test_pickle_load_legacy(tmpdir):
+    p = str(tmpdir.join('test_legacy.pickle'))
+
+    with open(p, 'wb') as f:
+        pickle.dump([1, 2, 3], f, protocol=0)
+
+    with open(p, 'rb') as f:
+        assert pickle_load(f) == [1, 2, 3]
+
+    assert pickle_loads(pickle.dumps([1, 2, 3], protocol=2)) == [1, 2, 3]
+
+
+def test_pickle_load_unknown_version():
+    with pytest.raises(ValueError):
+        pickle_loads(CACHE_HEADER[:-1] + b'\xff' + pickle.dumps(None))
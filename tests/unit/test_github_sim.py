@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import requests
+
+from ansibullbot.utils.gh_gql_client import GithubGraphQLClient
+from tests.utils.github_sim import Simulator, SyntheticRepo, start
+
+
+def get_simulator(**kwargs):
+    repo = SyntheticRepo(u'ansible/ansible', issues=200, seed=1)
+    sim = Simulator([repo], **kwargs)
+    server = start(sim, host=u'127.0.0.1')
+    return repo, sim, server
+
+
+def test_synthetic_repo_is_deterministic():
+    repo1 = SyntheticRepo(u'ansible/ansible', issues=50, seed=3, now=1600000000)
+    repo2 = SyntheticRepo(u'ansible/ansible', issues=50, seed=3, now=1600000000)
+    assert repo1.updated == repo2.updated
+    assert repo1.timeline(u'http://sim', 7) == repo2.timeline(u'http://sim', 7)
+    assert repo1.issue(u'http://sim', 7) == repo2.issue(u'http://sim', 7)
+
+
+def test_conditional_requests_and_ratelimit():
+    repo, sim, server = get_simulator(ratelimit=3)
+    try:
+        url = sim.base_url + u'/repos/ansible/ansible/issues/1'
+        headers = {u'Authorization': u'token AAA'}
+
+        rr = requests.get(url, headers=headers)
+        assert rr.status_code == 200
+        assert rr.headers[u'X-RateLimit-Remaining'] == u'2'
+
+        headers[u'If-None-Match'] = rr.headers[u'ETag']
+        rr = requests.get(url, headers=headers)
+        assert rr.status_code == 304
+        assert rr.headers[u'X-RateLimit-Remaining'] == u'2'
+
+        # a write changes the issue and spends budget
+        rr = requests.post(url + u'/comments', json={u'body': u'hello'}, headers=headers)
+        assert rr.status_code == 201
+        rr = requests.get(url, headers=headers)
+        assert rr.status_code == 200
+        assert rr.json()[u'comments'] == len(repo.comments(sim.base_url, 1))
+        assert sim.writes == [(u'ansible/ansible', 1, u'comment', {u'body': u'hello'})]
+
+        rr = requests.get(url, headers={u'Authorization': u'token AAA'})
+        assert rr.status_code == 403
+        assert rr.headers[u'X-RateLimit-Remaining'] == u'0'
+
+        # each token has its own budget
+        rr = requests.get(url, headers={u'Authorization': u'token BBB'})
+        assert rr.status_code == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pagination_links():
+    repo, sim, server = get_simulator()
+    try:
+        rr = requests.get(sim.base_url + u'/repos/ansible/ansible/issues?state=all&per_page=50')
+        assert len(rr.json()) == 50
+        assert rr.links[u'last'][u'url'].endswith(u'page=4&per_page=50&state=all')
+        rr = requests.get(rr.links[u'last'][u'url'])
+        assert len(rr.json()) == 50
+        assert u'next' not in rr.links
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_graphql_client():
+    repo, sim, server = get_simulator()
+    try:
+        client = GithubGraphQLClient(u'AAA', server=sim.base_url)
+
+        summaries = client.get_summaries(u'ansible', u'ansible', otype=u'pullRequests', states=None)
+        assert [x[u'number'] for x in summaries] == \
+            [x + 1 for x in range(len(repo)) if repo.is_pullrequest[x]]
+
+        number = summaries[0][u'number']
+        details = client.get_issue_details(u'ansible', u'ansible', [number, 1000])
+        assert list(details.keys()) == [number]
+        detail = details[number]
+        assert detail[u'is_pullrequest']
+        assert [x[u'filename'] for x in detail[u'files']] == \
+            [x[u'filename'] for x in repo.pull_files(sim.base_url, number)]
+        # commits come from pullCommits in graphql
+        timeline = [x for x in repo.timeline(sim.base_url, number) if x[u'event'] != u'committed']
+        assert [x[u'event'] for x in detail[u'timeline']] == [x[u'event'] for x in timeline]
+    finally:
+        server.shutdown()
+        server.server_close()
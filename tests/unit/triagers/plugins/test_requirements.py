@@ -0,0 +1,30 @@
+from ansibullbot.triagers.plugins import ALL, COMMITS, FILES, HISTORY, PR_STATUS, PULLREQUEST, REVIEWS
+from ansibullbot.triagers.plugins import get_requirements, requires
+from ansibullbot.triagers.plugins.needs_revision import get_needs_revision_facts
+from ansibullbot.triagers.plugins.small_patch import get_small_patch_facts
+from ansibullbot.triagers.plugins.traceback import get_traceback_facts
+
+
+def test_requires_sets_attribute():
+    @requires(HISTORY, FILES)
+    def plugin(iw):
+        pass
+    assert plugin.requires == frozenset([HISTORY, FILES])
+
+
+def test_undeclared_plugin_needs_everything():
+    def plugin(iw):
+        pass
+    assert get_requirements([plugin]) == set(ALL)
+
+
+def test_union_of_plugin_requirements():
+    needs = get_requirements([get_small_patch_facts, get_traceback_facts])
+    assert needs == set([COMMITS])
+
+
+def test_issues_skip_pullrequest_data():
+    needs = get_requirements([get_needs_revision_facts], is_pullrequest=False)
+    assert needs == set([HISTORY])
+    needs = get_requirements([get_needs_revision_facts], is_pullrequest=True)
+    assert set([PULLREQUEST, PR_STATUS, REVIEWS, COMMITS, FILES]) <= needs
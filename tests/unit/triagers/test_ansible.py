@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+import datetime
+import os
+
+import six
+six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+from backports import tempfile
+
+from ansibullbot.triagers.ansible import AnsibleTriage
+from ansibullbot.utils.cache_store import get_store
+from ansibullbot.utils.factmemo import FactMemo
+from ansibullbot.utils.scheduler import TriageTimers
+from ansibullbot.wrappers.defaultwrapper import DefaultWrapper
+
+
+class GithubIssueMock:
+    number = 1
+    url = u'https://github.com/ansible/ansible/issues/1'
+    updated_at = datetime.datetime.now()
+
+
+class GithubWrapperMock:
+    def get_request(self, url):
+        return [{u'event': u'labeled', u'created_at': u'2020-05-31T10:02:20Z'}]
+
+
+class GithubRepoMock:
+    full_name = u'ansible/ansible'
+
+
+class GithubRepoWrapperMock:
+    def __init__(self):
+        self.repo = GithubRepoMock()
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+@mock.patch('ansibullbot.utils.cache_store.C.DEFAULT_CACHE_BACKEND', u'sqlite')
+def test_dump_meta_on_empty_cachedir():
+    '''The sqlite backend does not create the issue directory for meta.json'''
+    with tempfile.TemporaryDirectory() as cachedir:
+        repo = GithubRepoWrapperMock()
+        iw = DefaultWrapper(
+            github=GithubWrapperMock(),
+            repo=repo,
+            issue=GithubIssueMock(),
+            cachedir=cachedir,
+            gitrepo=repo,
+        )
+        assert len(iw.events) == 1
+        assert not os.path.isdir(iw.full_cachedir)
+
+        triager = AnsibleTriage.__new__(AnsibleTriage)
+        triager.dump_meta(iw, {u'number': 1})
+        assert triager.load_meta(iw)[u'number'] == 1
+
+
+def _make_triager(cachedir, *args):
+    '''An AnsibleTriage with its checkout, indexers and connections mocked out'''
+    gitrepo = mock.Mock()
+    gitrepo.get_head.return_value = u'abc123'
+    patches = [
+        mock.patch.multiple(
+            u'ansibullbot.triagers.ansible',
+            GitRepoWrapper=mock.Mock(return_value=gitrepo),
+            AnsibleVersionIndexer=mock.DEFAULT,
+            ModuleIndexer=mock.DEFAULT,
+            AnsibleComponentMatcher=mock.DEFAULT,
+            ShippableCI=mock.DEFAULT,
+            GithubWebScraper=mock.DEFAULT,
+            GithubGraphQLClient=mock.DEFAULT,
+            AnsibullbotDatabase=mock.DEFAULT,
+        ),
+        mock.patch.multiple(
+            AnsibleTriage,
+            _connect=mock.DEFAULT,
+            set_logger=mock.DEFAULT,
+            get_valid_labels=mock.DEFAULT,
+            get_resume=mock.Mock(return_value=None),
+        ),
+        mock.patch(u'ansibullbot.triagers.ansible.BotMetadataParser.parse_yaml',
+                   return_value={u'files': {}}),
+        mock.patch(u'ansibullbot.triagers.ansible.ratelimit.configure'),
+        mock.patch(u'ansibullbot.triagers.ansible.instrumentation.install'),
+    ]
+    for patch in patches:
+        patch.start()
+    try:
+        return AnsibleTriage(args=[u'--cachedir', cachedir, u'--no_http_cache'] + list(args))
+    finally:
+        for patch in reversed(patches):
+            patch.stop()
+
+
+def test_fact_memo_hits_on_first_pass():
+    '''A one shot run reuses the facts memoized by the run before it'''
+    with tempfile.TemporaryDirectory() as cachedir:
+        iw = mock.Mock(repo_full_name=u'ansible/ansible', number=1, updated_at=u'2020-01-01')
+        iw.is_pullrequest.return_value = False
+        store = get_store(cachedir)
+        plugin = mock.Mock(__name__=u'get_plugin_facts', return_value={u'fact': True})
+
+        for run in range(2):
+            triager = _make_triager(cachedir)
+            assert triager.index_fingerprint is not None
+            triager.fact_memo = FactMemo(store=store, repo=iw.repo_full_name, number=iw.number)
+            assert triager.run_memoized_plugin(iw, None, plugin, iw) == {u'fact': True}
+            triager.fact_memo.save()
+
+        assert plugin.call_count == 1
+
+
+def test_prefetch_is_ignored_with_workers():
+    with tempfile.TemporaryDirectory() as cachedir:
+        with mock.patch(u'ansibullbot.triagers.ansible.logging') as m_logging:
+            _make_triager(cachedir, u'--workers', u'2', u'--prefetch', u'4')
+        m_logging.warning.assert_called_once_with(u'--prefetch is ignored with --workers')
+
+
+def test_idle_time_wakes_for_the_next_timer():
+    triager = AnsibleTriage.__new__(AnsibleTriage)
+    triager.daemonize_poll = 30
+    triager.timers = TriageTimers()
+    assert triager.get_idle_time(1000, 1010) == 20
+
+    triager.timers.set(u'ansible/ansible', 1, 1015)
+    assert triager.get_idle_time(1000, 1010) == 5
+
+    # overdue timers are picked up right away
+    assert triager.get_idle_time(1000, 1020) == 1
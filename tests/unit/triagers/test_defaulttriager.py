@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import six
+six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+from ansibullbot.triagers.defaulttriager import DefaultActions, DefaultTriager
+
+
+def test_compile_labels_skips_noop():
+    actions = DefaultActions()
+    actions.newlabel = [u'bug']
+    actions.unlabel = [u'feature']
+    assert DefaultTriager.compile_labels([u'bug'], actions) is None
+
+
+def test_compile_labels():
+    actions = DefaultActions()
+    actions.newlabel = [u'bug', u'needs_triage', u'needs_triage']
+    actions.unlabel = [u'feature']
+    labels = DefaultTriager.compile_labels([u'feature', u'bug', u'module'], actions)
+    assert labels == [u'bug', u'module', u'needs_triage']
+
+
+def test_compile_assignees():
+    actions = DefaultActions()
+    actions.assign = [u'bob', u'jane']
+    actions.unassign = [u'joe']
+    assert DefaultTriager.compile_assignees([u'joe', u'bob'], actions) == [u'bob', u'jane']
+    assert DefaultTriager.compile_assignees([u'bob', u'jane'], actions) is None
+
+
+def test_execute_actions_batches_writes():
+    iw = mock.Mock()
+    iw.labels = [u'feature', u'bug']
+    iw.assignees = [u'bob']
+
+    actions = DefaultActions()
+    actions.newlabel = [u'needs_triage', u'module']
+    actions.assign = [u'bob']
+
+    DefaultTriager().execute_actions(iw, actions)
+
+    # only additions, so one POST and no deletes
+    iw.add_labels.assert_called_once_with([u'needs_triage', u'module'])
+    assert not iw.remove_label.called
+    assert not iw.set_assignees.called
+
+    recorded = [x[0][0] for x in iw.history.record_event.call_args_list]
+    assert recorded == [u'labeled', u'labeled']
+
+
+def test_execute_actions_deletes_removed_labels():
+    iw = mock.Mock()
+    iw.labels = [u'feature', u'bug']
+    iw.assignees = []
+
+    actions = DefaultActions()
+    actions.newlabel = [u'module']
+    actions.unlabel = [u'feature']
+    actions.assign = [u'jane']
+
+    DefaultTriager().execute_actions(iw, actions)
+
+    # labels added by someone else meanwhile are left alone
+    iw.add_labels.assert_called_once_with([u'module'])
+    iw.remove_label.assert_called_once_with(label=u'feature')
+    assert not iw.set_labels.called
+    iw.set_assignees.assert_called_once_with([u'jane'])
+
+
+@mock.patch('ansibullbot.triagers.defaulttriager.logging')
+def test_execute_actions_only_logs_label_changes(m_logging):
+    iw = mock.Mock()
+    iw.labels = [u'feature', u'bug']
+    iw.assignees = []
+
+    actions = DefaultActions()
+    actions.unlabel = [u'feature']
+
+    DefaultTriager().execute_actions(iw, actions)
+
+    assert not iw.add_labels.called
+    logged = [x[0][0] for x in m_logging.info.call_args_list]
+    assert logged == [u'action: unlabel - feature']
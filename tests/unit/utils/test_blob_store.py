@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import binascii
+import os
+
+from backports import tempfile
+
+from ansibullbot.utils.blob_store import BlobStore
+
+
+def _blobfiles(cachedir):
+    return [
+        fn for root, dirs, files in os.walk(cachedir)
+        for fn in files if fn.endswith(u'.json.gz')
+    ]
+
+
+def test_set_get_dedup():
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = BlobStore(cachedir)
+        assert store.get(u'https://api/a') is None
+
+        store.set(u'https://api/a', {u'sha': u'abc', u'files': [1, 2]})
+        store.set(u'https://api/b', {u'files': [1, 2], u'sha': u'abc'})
+        assert store.get(u'https://api/a') == {u'sha': u'abc', u'files': [1, 2]}
+        assert store.get(u'https://api/b') == {u'sha': u'abc', u'files': [1, 2]}
+
+        stats = store.stats()
+        assert stats[u'keys'] == 2
+        assert stats[u'blobs'] == 1
+        assert len(_blobfiles(cachedir)) == 1
+
+        # replacing and deleting drop the blob once nothing refers to it
+        store.set(u'https://api/a', [u'other'])
+        assert store.stats()[u'blobs'] == 2
+        store.delete(u'https://api/b')
+        assert store.stats()[u'blobs'] == 1
+        assert len(_blobfiles(cachedir)) == 1
+
+
+def test_missing_blob_is_a_miss():
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = BlobStore(cachedir)
+        store.set(u'https://api/a', [1])
+        for fn in _blobfiles(cachedir):
+            os.remove(os.path.join(cachedir, fn[:2], fn))
+        assert store.get(u'https://api/a') is None
+        assert store.stats()[u'keys'] == 0
+
+
+def test_evict_lru_keeps_pinned():
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = BlobStore(cachedir)
+        store.set(u'commit', [u'c' * 1000], pinned=True)
+        for idx in range(10):
+            store.set(u'url%s' % idx, [idx, u'x' * 1000])
+        # url0 was used last
+        store.get(u'url0')
+
+        budget = store.size() // 2
+        stats = store.evict(max_bytes=budget)
+        assert stats[u'bytes'] <= budget
+        assert stats[u'evicted_keys'] > 0
+        assert stats[u'evicted_bytes'] > 0
+        assert store.get(u'commit') == [u'c' * 1000]
+        assert store.get(u'url0') is not None
+        assert store.get(u'url1') is None
+
+        # pinned keys stay even over budget
+        store.evict(max_bytes=1)
+        assert store.stats()[u'keys'] == 1
+        assert store.get(u'commit') is not None
+
+
+def test_set_evicts_past_budget():
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = BlobStore(cachedir, max_bytes=4096)
+        for idx in range(50):
+            store.set(u'url%s' % idx, [idx, binascii.hexlify(os.urandom(200)).decode('ascii')])
+        assert store.size() <= 4096
+        assert store.get(u'url49') is not None
+        assert store.stats()[u'evicted_keys'] > 0
+
+
+def test_size_is_a_running_total():
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = BlobStore(cachedir)
+        store.set(u'https://api/a', [1])
+        store.set(u'https://api/b', [2, 3])
+        store.set(u'https://api/c', [2, 3])
+        total = store.connection.execute(u'SELECT SUM(size) FROM blobs').fetchone()[0]
+        assert store.size() == total
+
+        store.delete(u'https://api/b')
+        assert store.size() == total
+        store.delete(u'https://api/a')
+        assert store.size() == store.connection.execute(u'SELECT SUM(size) FROM blobs').fetchone()[0]
+
+        # an index without the total sums the blobs once when it is opened
+        store.connection.execute(u'DELETE FROM totals')
+        assert BlobStore(cachedir).size() == store.connection.execute(u'SELECT SUM(size) FROM blobs').fetchone()[0]
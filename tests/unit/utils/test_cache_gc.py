@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import os
+import time
+
+from backports import tempfile
+
+from ansibullbot.utils.cache_gc import CacheCollector
+from ansibullbot.utils.cache_store import SqliteStore
+
+
+NOW = time.mktime((2020, 6, 1, 0, 0, 0, 0, 0, -1))
+OLD = u'2019-01-01T00:00:00Z'
+RECENT = u'2020-05-20T00:00:00Z'
+
+SUMMARIES = [
+    {u'number': 1, u'state': u'open', u'updated_at': OLD},
+    {u'number': 2, u'state': u'closed', u'updated_at': OLD},
+    {u'number': 3, u'state': u'closed', u'updated_at': RECENT},
+    {u'number': 5, u'state': u'merged', u'updated_at': OLD},
+]
+
+
+def _populate(repodir, store):
+    for number in range(1, 6):
+        issuedir = os.path.join(repodir, u'issues', str(number))
+        os.makedirs(issuedir)
+        metafile = os.path.join(issuedir, u'meta.json')
+        with open(metafile, 'w') as f:
+            f.write(u'{"number": %s}' % number)
+        # the cache of the issue missing from the summaries is old
+        os.utime(metafile, (NOW - 400 * 86400, NOW - 400 * 86400))
+        store.set(u'ansible/ansible', number, u'history', {u'history': [u'x' * 1000]})
+    with store.transaction():
+        store.connection.execute(u'UPDATE entries SET updated=?', (NOW - 400 * 86400,))
+
+
+def test_collect_archives_long_closed():
+    with tempfile.TemporaryDirectory() as repodir:
+        store = SqliteStore(repodir)
+        _populate(repodir, store)
+        collector = CacheCollector(repodir, u'ansible/ansible', store=store)
+
+        report = collector.collect(SUMMARIES, 90, now=NOW, keep=lambda x: x == 5)
+        assert report[u'issues'] == 5
+        assert report[u'collected'] == 2
+        assert report[u'freed'] > 0
+        assert os.path.isfile(report[u'archive'])
+
+        assert sorted(os.listdir(os.path.join(repodir, u'issues'))) == [u'1', u'3', u'5']
+        assert sorted(store.sizes(u'ansible/ansible')) == [1, 3, 5]
+
+        assert collector.restore(2)
+        assert store.get(u'ansible/ansible', 2, u'history') == {u'history': [u'x' * 1000]}
+        with open(os.path.join(repodir, u'issues', u'2', u'meta.json')) as f:
+            assert f.read() == u'{"number": 2}'
+        assert not collector.restore(1)
+
+
+def test_collect_budget_and_dry_run():
+    with tempfile.TemporaryDirectory() as repodir:
+        store = SqliteStore(repodir)
+        _populate(repodir, store)
+        collector = CacheCollector(repodir, u'ansible/ansible', store=store)
+        sizes = collector.cached_sizes()
+
+        # the budget pulls in the recently closed issue, never the open one
+        assert collector.candidates(sizes, SUMMARIES, 90, max_bytes=1, now=NOW) == [2, 5, 4, 3]
+        assert collector.candidates(sizes, SUMMARIES, 90, max_bytes=10 ** 9, now=NOW) == [2, 5, 4]
+        assert collector.candidates(sizes, [], 90, now=NOW) == []
+
+        report = collector.collect(SUMMARIES, 90, archive=False, dry_run=True, now=NOW)
+        assert report[u'collected'] == 3
+        assert report[u'archive'] is None
+        assert len(os.listdir(os.path.join(repodir, u'issues'))) == 5
+
+        collector.collect(SUMMARIES, 90, archive=False, now=NOW)
+        assert not os.path.isdir(os.path.join(repodir, u'archive'))
+        assert sorted(store.sizes(u'ansible/ansible')) == [1, 3]
+
+
+def test_closed_without_updated_at_uses_the_cache():
+    '''Issues filled in as closed by a full sync were closed at an unknown time'''
+    with tempfile.TemporaryDirectory() as repodir:
+        store = SqliteStore(repodir)
+        _populate(repodir, store)
+        # issue 4 was triaged minutes ago, issue 2 only has old store entries
+        os.utime(os.path.join(repodir, u'issues', u'4', u'meta.json'), (NOW - 60, NOW - 60))
+        os.remove(os.path.join(repodir, u'issues', u'2', u'meta.json'))
+
+        summaries = [
+            {u'number': 2, u'state': u'closed', u'updated_at': None},
+            {u'number': 4, u'state': u'closed', u'updated_at': None},
+        ]
+        collector = CacheCollector(repodir, u'ansible/ansible', store=store)
+        candidates = collector.candidates(collector.cached_sizes(), summaries, 90, now=NOW)
+        assert candidates == [1, 2, 3, 5]
+
+        # once its store entries are fresh issue 2 is kept as well
+        store.set(u'ansible/ansible', 2, u'history', {u'history': []})
+        candidates = collector.candidates(collector.cached_sizes(), summaries, 90, now=time.time())
+        assert 2 not in candidates
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import datetime
+import json
+import os
+
+import pytest
+
+from backports import tempfile
+
+from ansibullbot._pickle_compat import pickle_dump
+from ansibullbot.utils.cache_store import FileStore, SqliteStore, get_store, migrate, property_kind
+
+
+@pytest.mark.parametrize(u'backend', [FileStore, SqliteStore])
+def test_get_set(backend):
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = backend(cachedir)
+        assert store.get(u'ansible/ansible', 1, u'history') is None
+        assert store.get(u'ansible/ansible', 1, u'history', default=False) is False
+
+        store.set(u'ansible/ansible', 1, u'history', {u'history': [1, 2]})
+        store.set_many(u'ansible/ansible', 2, {
+            u'timeline_meta': {u'updated_at': u'2020-01-01T00:00:00'},
+            u'timeline_data': [{u'event': u'labeled'}],
+            u'issue': {u'number': 2},
+        })
+        assert store.get(u'ansible/ansible', 1, u'history') == {u'history': [1, 2]}
+        assert store.get(u'ansible/ansible', 2, u'timeline_data') == [{u'event': u'labeled'}]
+        assert store.numbers(u'ansible/ansible', u'issue') == [2]
+
+        store.delete(u'ansible/ansible', 2, u'issue')
+        assert store.get(u'ansible/ansible', 2, u'issue') is None
+
+
+def test_sqlite_transaction_rolls_back():
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = SqliteStore(cachedir)
+        store.set(u'ansible/ansible', 1, u'issue', u'old')
+
+        with pytest.raises(ValueError):
+            with store.transaction():
+                store.set(u'ansible/ansible', 1, u'issue', u'new')
+                store.set(u'ansible/ansible', 1, u'pullrequest', u'new')
+                raise ValueError(u'boom')
+
+        assert store.get(u'ansible/ansible', 1, u'issue') == u'old'
+        assert store.get(u'ansible/ansible', 1, u'pullrequest') is None
+
+        # a second store on the same file sees the committed writes
+        with store.transaction():
+            store.set(u'ansible/ansible', 1, u'issue', u'new')
+        assert SqliteStore(cachedir).get(u'ansible/ansible', 1, u'issue') == u'new'
+
+
+def test_get_store_is_shared():
+    with tempfile.TemporaryDirectory() as cachedir:
+        assert get_store(cachedir, backend=u'sqlite') is get_store(cachedir, backend=u'sqlite')
+        assert isinstance(get_store(cachedir, backend=u'files'), FileStore)
+
+
+def test_migrate():
+    with tempfile.TemporaryDirectory() as cachedir:
+        issuedir = os.path.join(cachedir, u'issues', u'1')
+        os.makedirs(issuedir)
+        fetched = datetime.datetime(2020, 1, 1)
+        for fn, data in ((u'issue.pickle', u'issue'),
+                         (u'history.pickle', {u'history': []}),
+                         (u'comments.pickle', [fetched, [u'a comment']]),
+                         (u'lib_ansible_modules_ping_py.pickle', [u'abc', [None]]),
+                         (u'fact_memo.pickle', {u'version': 1, u'facts': {}})):
+            with open(os.path.join(issuedir, fn), 'wb') as f:
+                pickle_dump(data, f)
+        with open(os.path.join(issuedir, u'timeline_data.json'), 'w') as f:
+            f.write(json.dumps([{u'event': u'labeled'}]))
+        with open(os.path.join(cachedir, u'labels.pickle'), 'wb') as f:
+            pickle_dump([fetched, [u'bug']], f)
+
+        store = SqliteStore(cachedir)
+        assert migrate(cachedir, u'ansible/ansible', store=store, delete=True) == 6
+
+        assert store.get(u'ansible/ansible', 1, u'issue') == u'issue'
+        assert store.get(u'ansible/ansible', 1, u'timeline_data') == [{u'event': u'labeled'}]
+        assert store.get(u'ansible/ansible', 1, property_kind(u'comments')) == [fetched, [u'a comment']]
+        assert store.get(u'ansible/ansible', 0, property_kind(u'labels')) == [fetched, [u'bug']]
+        assert store.get(u'ansible/ansible', 1, u'fact_memo') == {u'version': 1, u'facts': {}}
+        assert sorted(os.listdir(issuedir)) == [u'lib_ansible_modules_ping_py.pickle']
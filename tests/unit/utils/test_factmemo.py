@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+import os
+
+from backports import tempfile
+
+from ansibullbot.utils.cache_store import FileStore, SqliteStore
+from ansibullbot.utils.factmemo import FactMemo, fingerprint
+
+
+def test_fingerprint_is_stable():
+    assert fingerprint({u'a': 1, u'b': [1, 2]}) == fingerprint({u'b': [1, 2], u'a': 1})
+    assert fingerprint(set([u'x', u'y'])) == fingerprint(set([u'y', u'x']))
+    assert fingerprint({u'a': 1}) != fingerprint({u'a': 2})
+
+
+def test_memo_roundtrip():
+    with tempfile.TemporaryDirectory() as cachedir:
+        for store in (SqliteStore(cachedir), FileStore(cachedir)):
+            memo = FactMemo(store=store, repo=u'ansible/ansible', number=1)
+            assert memo.get(u'plugin', u'abc') is None
+            memo.set(u'plugin', u'abc', {u'labels': [u'module']})
+            memo.save()
+
+            memo = FactMemo(store=store, repo=u'ansible/ansible', number=1)
+            assert memo.get(u'plugin', u'abc') == {u'labels': [u'module']}
+            # changed inputs
+            assert memo.get(u'plugin', u'def') is None
+            # another issue
+            assert FactMemo(store=store, repo=u'ansible/ansible', number=2).get(u'plugin', u'abc') is None
+
+
+def test_memo_is_purged_with_the_issue():
+    with tempfile.TemporaryDirectory() as cachedir:
+        store = SqliteStore(cachedir)
+        memo = FactMemo(store=store, repo=u'ansible/ansible', number=1)
+        memo.set(u'plugin', u'abc', {u'labels': [u'module']})
+        memo.save()
+        assert u'fact_memo' in store.entries(u'ansible/ansible', 1)
+
+        store.purge(u'ansible/ansible', 1)
+        assert FactMemo(store=store, repo=u'ansible/ansible', number=1).get(u'plugin', u'abc') is None
+        assert not os.path.exists(os.path.join(cachedir, u'issues'))
+
+
+def test_memo_returns_copies():
+    memo = FactMemo()
+    memo.set(u'plugin', u'abc', {u'labels': [u'module']})
+    memo.get(u'plugin', u'abc')[u'labels'].append(u'bug')
+    assert memo.get(u'plugin', u'abc') == {u'labels': [u'module']}
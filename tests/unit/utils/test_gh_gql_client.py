@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+import json
+import os
+
+import six
+six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+from backports import tempfile
+
+from ansibullbot._text_compat import to_text
+from ansibullbot.utils.gh_gql_client import GithubGraphQLClient
+
+
+def _connection(nodes, more=False):
+    return {u'pageInfo': {u'hasNextPage': more}, u'nodes': nodes}
+
+
+def _actor(date):
+    return {u'name': u'Jane', u'email': u'jane@example.com', u'date': date, u'user': {u'login': u'jane'}}
+
+
+PULLREQUEST = {
+    u'number': 2,
+    u'updatedAt': u'2020-06-01T10:00:00Z',
+    u'mergeable': u'MERGEABLE',
+    u'labels': _connection([{u'name': u'bug'}]),
+    u'assignees': _connection([]),
+    u'pullTimeline': _connection([
+        {
+            u'__typename': u'LabeledEvent', u'id': u'LE_1',
+            u'actor': {u'login': u'bot'}, u'createdAt': u'2020-06-01T09:00:00Z',
+            u'label': {u'name': u'bug'},
+        },
+        {
+            u'__typename': u'IssueComment', u'id': u'IC_1', u'databaseId': 11,
+            u'author': {u'login': u'jane'}, u'body': u'shipit',
+            u'createdAt': u'2020-06-01T09:30:00Z', u'updatedAt': u'2020-06-01T09:30:00Z',
+            u'url': u'https://github.com/ansible/ansible/pull/2#issuecomment-11',
+        },
+        {
+            u'__typename': u'PullRequestReview', u'id': u'PRR_1', u'databaseId': 12,
+            u'author': {u'login': u'joe'}, u'state': u'APPROVED', u'body': u'',
+            u'submittedAt': u'2020-06-01T09:45:00Z', u'commit': {u'oid': u'abc'},
+        },
+    ]),
+    u'reviews': _connection([
+        {
+            u'id': u'PRR_1', u'databaseId': 12, u'author': {u'login': u'joe'}, u'state': u'APPROVED',
+            u'body': u'', u'submittedAt': u'2020-06-01T09:45:00Z', u'commit': {u'oid': u'abc'},
+        },
+    ]),
+    u'pullCommits': _connection([
+        {u'commit': {
+            u'oid': u'abc', u'message': u'fix it',
+            u'author': _actor(u'2020-06-01T08:00:00Z'),
+            u'committer': _actor(u'2020-06-01T08:00:00Z'),
+            u'parents': {u'totalCount': 1, u'nodes': [{u'oid': u'def'}]},
+        }},
+    ]),
+    u'files': _connection([
+        {u'path': u'lib/ansible/foo.py', u'additions': 3, u'deletions': 1, u'changeType': u'MODIFIED'},
+    ], more=True),
+    u'headCommit': {u'nodes': [{u'commit': {u'oid': u'abc', u'status': {u'contexts': [
+        {
+            u'context': u'Shippable', u'state': u'SUCCESS', u'targetUrl': u'https://app.shippable.com/1',
+            u'description': u'', u'createdAt': u'2020-06-01T08:30:00Z', u'creator': {u'login': u'ci'},
+        },
+    ]}}}]},
+}
+
+
+def test_parse_issue_details_pullrequest():
+    gqlc = GithubGraphQLClient(u'token')
+    details = gqlc.parse_issue_details(PULLREQUEST, u'ansible', u'ansible')
+
+    assert details[u'is_pullrequest']
+    assert details[u'labels'] == [u'bug']
+
+    events = [x[u'event'] for x in details[u'timeline']]
+    assert events == [u'labeled', u'commented', u'reviewed']
+    assert details[u'timeline'][0][u'label'] == {u'name': u'bug'}
+    assert details[u'timeline'][1][u'id'] == 11
+    assert details[u'timeline'][2][u'state'] == u'approved'
+    assert u'created_at' not in details[u'timeline'][2]
+
+    assert details[u'reviews'][0][u'user'] == {u'login': u'joe'}
+    assert details[u'reviews'][0][u'commit_id'] == u'abc'
+
+    commit = details[u'commits'][0]
+    assert commit[u'sha'] == u'abc'
+    assert commit[u'url'].endswith(u'/repos/ansible/ansible/commits/abc')
+    assert commit[u'parents'] == [{u'sha': u'def'}]
+    assert commit[u'commit'][u'author'][u'email'] == u'jane@example.com'
+
+    assert details[u'status_contexts'][0][u'state'] == u'success'
+    assert details[u'status_contexts'][0][u'target_url'] == u'https://app.shippable.com/1'
+
+
+def test_parse_issue_details_incomplete_connection():
+    '''A connection with more pages is left to the REST calls'''
+    gqlc = GithubGraphQLClient(u'token')
+    details = gqlc.parse_issue_details(PULLREQUEST, u'ansible', u'ansible')
+    assert details[u'files'] is None
+
+
+def test_parse_issue_details_issue():
+    gqlc = GithubGraphQLClient(u'token')
+    node = {
+        u'number': 1,
+        u'updatedAt': u'2020-06-01T10:00:00Z',
+        u'labels': _connection([]),
+        u'assignees': _connection([{u'login': u'jane'}]),
+        u'issueTimeline': _connection([
+            {
+                u'__typename': u'RenamedTitleEvent', u'id': u'RTE_1', u'actor': {u'login': u'jane'},
+                u'createdAt': u'2020-06-01T09:00:00Z', u'previousTitle': u'a', u'currentTitle': u'b',
+            },
+        ]),
+    }
+    details = gqlc.parse_issue_details(node, u'ansible', u'ansible')
+
+    assert not details[u'is_pullrequest']
+    assert details[u'assignees'] == [u'jane']
+    assert details[u'timeline'][0][u'rename'] == {u'from': u'a', u'to': u'b'}
+    assert u'commits' not in details
+
+
+class FakeGraphQL(object):
+    '''Answers summary queries from a list of nodes, newest activity first'''
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.queries = []
+
+    def post(self, url, headers=None, data=None):
+        query = json.loads(data)[u'query']
+        self.queries.append(query)
+        otype = u'pullRequests' if u'pullRequests(' in query else u'issues'
+        nodes = [x for x in self.nodes if x[u'type'] == otype]
+        if u'states: OPEN' in query:
+            nodes = [x for x in nodes if x[u'state'] == u'OPEN']
+        nodes = sorted(nodes, key=lambda x: x[u'updatedAt'], reverse=True)
+
+        page = 0
+        if u'after: "' in query:
+            page = int(query.split(u'after: "', 1)[1].split(u'"', 1)[0])
+        edges = [{u'node': dict(x)} for x in nodes[page * 2:page * 2 + 2]]
+
+        response = mock.Mock()
+        response.ok = True
+        response.json.return_value = {u'data': {u'repository': {otype: {
+            u'pageInfo': {u'hasNextPage': len(nodes) > page * 2 + 2, u'endCursor': to_text(page + 1)},
+            u'edges': edges,
+        }}}}
+        return response
+
+
+def _summary(number, otype, state, updated):
+    return {
+        u'id': u'N_%s' % number, u'url': u'', u'number': number, u'state': state, u'type': otype,
+        u'createdAt': updated, u'updatedAt': updated,
+    }
+
+
+def test_sync_summaries_incremental():
+    fake = FakeGraphQL([
+        _summary(1, u'issues', u'OPEN', u'2020-01-01T00:00:00Z'),
+        _summary(3, u'pullRequests', u'OPEN', u'2020-01-02T00:00:00Z'),
+        _summary(4, u'issues', u'OPEN', u'2020-01-03T00:00:00Z'),
+        _summary(6, u'issues', u'OPEN', u'2020-01-04T00:00:00Z'),
+    ])
+
+    with tempfile.TemporaryDirectory() as cachedir:
+        cachefile = os.path.join(cachedir, u'summaries.json.gz')
+        gqlc = GithubGraphQLClient(u'token')
+
+        with mock.patch(u'ansibullbot.utils.gh_gql_client.transport', fake):
+            summaries = gqlc.get_issue_summaries(u'ansible/ansible', cachefile=cachefile)
+            assert sorted(summaries.keys(), key=int) == [u'1', u'2', u'3', u'4', u'5', u'6']
+            assert summaries[u'2'][u'state'] == u'closed'
+            assert summaries[u'3'][u'type'] == u'pullrequest'
+
+            # one issue closed, one opened
+            fake.nodes[2] = _summary(4, u'issues', u'CLOSED', u'2020-01-05T00:00:00Z')
+            fake.nodes.append(_summary(7, u'pullRequests', u'OPEN', u'2020-01-06T00:00:00Z'))
+            fake.queries = []
+
+            summaries = gqlc.get_issue_summaries(u'ansible/ansible', cachefile=cachefile)
+
+    # issue pages stop at the first node older than the watermark
+    assert len(fake.queries) == 3
+    assert u'states:' not in fake.queries[0]
+    assert u'UPDATED_AT' in fake.queries[0]
+    assert summaries[u'4'][u'state'] == u'closed'
+    assert summaries[u'6'][u'state'] == u'open'
+    assert summaries[u'7'][u'state'] == u'open'
+    assert summaries[u'5'][u'type'] is None
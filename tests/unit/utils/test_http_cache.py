@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+import os
+
+import requests
+import requests.adapters
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+import six
+six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+from backports import tempfile
+
+from ansibullbot.utils.http_cache import CachingAdapter, ConditionalCache
+
+
+class FakeServer(object):
+    '''Answers with a 304 when the etag matches'''
+
+    def __init__(self):
+        self.body = b'[1, 2]'
+        self.etag = u'"v1"'
+        self.sent = []
+
+    def send(self, adapter, request, *args, **kwargs):
+        self.sent.append(dict(request.headers))
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.connection = adapter
+        if request.headers.get(u'If-None-Match') == self.etag:
+            response.status_code = 304
+            response.headers = CaseInsensitiveDict({u'X-RateLimit-Remaining': u'4999'})
+            response._content = b''
+        else:
+            response.status_code = 200
+            response.headers = CaseInsensitiveDict({
+                u'ETag': self.etag,
+                u'Link': u'<https://api.github.com/x?page=2>; rel="next"',
+                u'X-RateLimit-Remaining': u'4998',
+            })
+            response._content = self.body
+        return response
+
+
+def _patched(server):
+    def send(self, request, *args, **kwargs):
+        return server.send(self, request, *args, **kwargs)
+    return mock.patch.object(requests.adapters.HTTPAdapter, 'send', send)
+
+
+def _session(cachedir):
+    session = requests.Session()
+    session.mount(u'https://api.github.com/', CachingAdapter(ConditionalCache(cachedir)))
+    return session
+
+
+def test_not_modified_is_served_from_cache():
+    server = FakeServer()
+    with tempfile.TemporaryDirectory() as cachedir:
+        with _patched(server):
+            session = _session(cachedir)
+            first = session.get(u'https://api.github.com/x')
+            second = session.get(u'https://api.github.com/x')
+
+    assert u'If-None-Match' not in server.sent[0]
+    assert server.sent[1][u'If-None-Match'] == u'"v1"'
+    assert first.json() == second.json() == [1, 2]
+    assert second.status_code == 200
+    assert second.from_cache
+    # pagination and the fresh ratelimit headers survive
+    assert second.links[u'next'][u'url'] == u'https://api.github.com/x?page=2'
+    assert second.headers[u'X-RateLimit-Remaining'] == u'4999'
+
+
+def test_changed_body_replaces_cache():
+    server = FakeServer()
+    with tempfile.TemporaryDirectory() as cachedir:
+        with _patched(server):
+            session = _session(cachedir)
+            session.get(u'https://api.github.com/x')
+            server.body = b'[3]'
+            server.etag = u'"v2"'
+            assert session.get(u'https://api.github.com/x').json() == [3]
+            assert session.get(u'https://api.github.com/x').json() == [3]
+
+    assert server.sent[2][u'If-None-Match'] == u'"v2"'
+
+
+def test_accept_header_is_part_of_the_key():
+    server = FakeServer()
+    with tempfile.TemporaryDirectory() as cachedir:
+        with _patched(server):
+            session = _session(cachedir)
+            session.get(u'https://api.github.com/x')
+            session.get(u'https://api.github.com/x', headers={u'Accept': u'application/vnd.github.v3.diff'})
+
+    assert u'If-None-Match' not in server.sent[1]
+
+
+def test_cache_is_bounded():
+    server = FakeServer()
+    server.body = b'[' + b', '.join(str(x).encode() for x in range(2000)) + b']'
+    with tempfile.TemporaryDirectory() as cachedir:
+        cache = ConditionalCache(cachedir, max_bytes=8 * 1024)
+        session = requests.Session()
+        session.mount(u'https://api.github.com/', CachingAdapter(cache))
+        with _patched(server):
+            for page in range(10):
+                server.etag = u'"v%s"' % page
+                session.get(u'https://api.github.com/x?page=%s' % page)
+                server.body = server.body.replace(b'[', b'[%d, ' % page, 1)
+
+        stats = cache.stats()
+        assert stats[u'bytes'] <= 8 * 1024
+        assert stats[u'evicted_keys'] > 0
+        # the most recently used page is still there
+        assert cache.get(u'https://api.github.com/x?page=9', u'*/*')
+
+
+def test_legacy_entries_are_removed():
+    with tempfile.TemporaryDirectory() as cachedir:
+        legacy = os.path.join(cachedir, u'ab', u'ab' + u'0' * 38 + u'.json.gz')
+        os.makedirs(os.path.dirname(legacy))
+        with open(legacy, 'wb') as f:
+            f.write(b'')
+        ConditionalCache(cachedir)
+        assert not os.path.exists(legacy)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+from ansibullbot.utils import instrumentation
+from ansibullbot.utils.instrumentation import StageRecorder, percentile
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 100) == 100
+    assert percentile([7], 95) == 7
+    assert percentile([], 50) is None
+
+
+def test_classify_url():
+    assert instrumentation.classify_url(u'https://api.github.com/graphql') == u'graphql'
+    assert instrumentation.classify_url(u'https://api.github.com/repos/ansible/ansible') == u'rest'
+    assert instrumentation.classify_url(u'https://api.shippable.com/runs') == u'other_http'
+
+
+def test_stage_attribution():
+    sr = StageRecorder()
+
+    # outside of any stage nothing is recorded
+    instrumentation.count(u'rest')
+
+    for x in range(3):
+        with sr.stage(u'process'):
+            instrumentation.count(u'rest')
+            with sr.stage(u'get_foo_facts'):
+                instrumentation.count(u'graphql', 2)
+                instrumentation.count(u'cache_hit')
+
+    report = sr.report()
+    assert report[u'get_foo_facts'][u'calls'] == 3
+    assert report[u'get_foo_facts'][u'graphql'][u'total'] == 6
+    assert report[u'get_foo_facts'][u'rest'][u'total'] == 0
+    # the outer stage includes what the nested stage did
+    assert report[u'process'][u'rest'][u'max'] == 1
+    assert report[u'process'][u'graphql'][u'p50'] == 2
+    assert report[u'process'][u'cache_hit'][u'total'] == 3
+
+
+def test_run_and_merge_samples():
+    sr = StageRecorder()
+    assert sr.run(u'add', lambda a, b: a + b, 1, 2) == 3
+
+    other = StageRecorder()
+    other.merge_samples(sr.pop_samples())
+    assert sr.samples == {}
+    assert other.report()[u'add'][u'calls'] == 1
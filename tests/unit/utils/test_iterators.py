@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+from ansibullbot.utils.iterators import IssuePrefetcher, RepoIssuesIterator
+
+
+class FakeRepo(object):
+    def get_issue(self, number):
+        return u'issue-%s' % number
+
+
+def test_repo_issues_iterator_uses_cache():
+    rii = RepoIssuesIterator(FakeRepo(), [1, 2, 3], issuecache={2: u'cached'})
+    assert list(rii) == [u'issue-1', u'cached', u'issue-3']
+
+
+def test_prefetcher_keeps_order():
+    def fetch(number):
+        # later numbers finish first
+        time.sleep((10 - number) * 0.005)
+        return number * 2
+
+    numbers = list(range(10))
+    assert list(IssuePrefetcher(numbers, fetch, depth=4)) == [x * 2 for x in numbers]
+
+
+def test_prefetcher_runs_ahead():
+    seen = []
+    lock = threading.Lock()
+
+    def fetch(number):
+        with lock:
+            seen.append(number)
+        return number
+
+    pf = IssuePrefetcher([1, 2, 3, 4, 5], fetch, depth=3)
+    assert next(pf) == 1
+    # the next items were queued before the first one was handed out
+    for future in pf.pending:
+        future.result()
+    assert sorted(seen) == [1, 2, 3, 4]
+
+
+def test_prefetcher_empty():
+    assert list(IssuePrefetcher([], lambda x: x)) == []
+
+
+def test_prefetcher_stops_when_the_consumer_does():
+    seen = []
+    lock = threading.Lock()
+
+    def fetch(number):
+        with lock:
+            seen.append(number)
+        return number
+
+    with IssuePrefetcher(list(range(10)), fetch, depth=2) as pf:
+        for number in pf:
+            if number == 1:
+                break
+
+    assert not pf.pending
+    assert list(pf) == []
+    time.sleep(0.05)
+    # nothing was queued past what was in flight when the loop stopped
+    assert max(seen) <= 3
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+import pytest
+
+from ansibullbot.utils.memo import SingleFlightMemo
+
+
+def test_memo_lru():
+    memo = SingleFlightMemo(maxsize=2)
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        return {u'key': key}
+
+    assert memo.get(u'a', lambda: fetch(u'a')) == {u'key': u'a'}
+    assert memo.get(u'a', lambda: fetch(u'a')) == {u'key': u'a'}
+    memo.get(u'b', lambda: fetch(u'b'))
+    # a was used last, so b is evicted
+    memo.get(u'a', lambda: fetch(u'a'))
+    memo.get(u'c', lambda: fetch(u'c'))
+    assert u'a' in memo and u'c' in memo and u'b' not in memo
+    assert calls == [u'a', u'b', u'c']
+    assert (memo.hits, memo.misses) == (2, 3)
+
+    memo.clear()
+    assert len(memo) == 0
+
+
+def test_memo_failures_are_not_kept():
+    memo = SingleFlightMemo()
+
+    def fail():
+        raise ValueError(u'boom')
+
+    with pytest.raises(ValueError):
+        memo.get(u'a', fail)
+    assert memo.get(u'a', lambda: 1) == 1
+
+
+def test_memo_single_flight():
+    memo = SingleFlightMemo()
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return [1, 2]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(memo.get(u'a', fetch)))
+    leader.start()
+    started.wait()
+    followers = [
+        threading.Thread(target=lambda: results.append(memo.get(u'a', fetch)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [[1, 2]] * 5
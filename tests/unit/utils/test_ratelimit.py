@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+import time
+
+import six
+six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+from backports import tempfile
+
+from ansibullbot.utils import ratelimit
+
+
+def _headers(remaining, reset, limit=5000):
+    return {
+        u'X-RateLimit-Limit': u'%s' % limit,
+        u'X-RateLimit-Remaining': u'%s' % remaining,
+        u'X-RateLimit-Reset': u'%s' % int(reset),
+        u'X-RateLimit-Resource': u'core',
+    }
+
+
+def test_budget_follows_headers_and_decrements():
+    budget = ratelimit.RateBudget()
+    assert not budget.known()
+    assert budget.update_from_headers(_headers(4000, time.time() + 3600))
+    assert budget.known()
+
+    assert budget.acquire() == 0
+    assert budget.resources[u'core'][u'remaining'] == 3999
+
+    # a fresh response corrects the local count
+    budget.update_from_headers(_headers(3990, time.time() + 3600))
+    assert budget.resources[u'core'][u'remaining'] == 3990
+
+
+def test_budget_without_headers_is_ignored():
+    budget = ratelimit.RateBudget()
+    assert not budget.update_from_headers({u'Content-Type': u'application/json'})
+    assert budget.delay() == 0
+
+
+def test_low_budget_is_paced_over_the_window():
+    budget = ratelimit.RateBudget()
+    now = time.time()
+    budget.update(u'core', 5000, 2000, now + 1000)
+    assert budget.delay(now=now) == 0
+
+    # 500 points above the reserve for 1000 seconds
+    budget.update(u'core', 5000, 600, now + 1000)
+    assert budget.delay(now=now) == 2
+
+    budget.update(u'core', 5000, 50, now + 1000)
+    assert budget.delay(now=now) == 1005
+
+    # an expired window is no reason to wait
+    assert budget.delay(now=now + 2000) == 0
+
+
+def test_acquire_waits_until_reset():
+    budget = ratelimit.RateBudget()
+    budget.update(u'core', 5000, 0, time.time() + 120)
+
+    waits = []
+
+    def wait(timeout):
+        waits.append(timeout)
+        # a response from the next window arrives
+        budget.resources[u'core'] = {u'limit': 5000, u'remaining': 5000, u'reset': time.time() + 3600}
+
+    with mock.patch.object(budget._cond, 'wait', side_effect=wait):
+        budget.acquire()
+
+    assert waits == [60]
+    assert budget.resources[u'core'][u'remaining'] == 4999
+
+
+def test_budgets_are_persisted_by_token_hash():
+    ratelimit.reset()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        statefile = tmpdir + u'/ratelimit.json'
+        ratelimit.configure(statefile)
+        try:
+            response = mock.Mock()
+            response.request.headers = {u'Authorization': u'Bearer sekrit'}
+            response.headers = _headers(1234, time.time() + 3600)
+            ratelimit.observe(response)
+
+            with open(statefile) as f:
+                assert u'sekrit' not in f.read()
+
+            ratelimit.reset()
+            ratelimit.configure(statefile)
+            assert ratelimit.get_budget(u'sekrit').resources[u'core'][u'remaining'] == 1234
+        finally:
+            ratelimit.configure(None)
+            ratelimit.reset()
+
+
+def test_pool_sticks_to_a_token_until_it_runs_low():
+    ratelimit.reset()
+    try:
+        pool = ratelimit.TokenPool([u'a', u'b', u'a', u''])
+        assert pool.tokens == [u'a', u'b']
+
+        with mock.patch('ansibullbot.utils.ratelimit.os.getpid', return_value=2):
+            assert pool.acquire() == u'a'
+            assert pool.current() == u'a'
+
+            reset = time.time() + 3600
+            ratelimit.get_budget(u'a').update(u'core', 5000, 50, reset)
+            ratelimit.get_budget(u'b').update(u'core', 5000, 4000, reset)
+            assert pool.pick() == u'b'
+
+            # graphql points are a separate budget
+            assert pool.pick(resource=u'graphql') == u'a'
+    finally:
+        ratelimit.reset()
+
+
+def test_transport_sends_the_pool_token():
+    from ansibullbot.utils import transport
+
+    ratelimit.reset()
+    pool = ratelimit.TokenPool([u'a', u'b'])
+    try:
+        with mock.patch('ansibullbot.utils.ratelimit._pool', pool):
+            pool.acquire(token=u'b')
+
+            request = mock.Mock()
+            request.url = transport.C.DEFAULT_GITHUB_URL + u'/repos/ansible/ansible'
+            request.headers = {u'Authorization': u'Bearer a'}
+            transport.TokenPoolAuth()(request)
+            assert request.headers[u'Authorization'] == u'Bearer b'
+
+            # credentials outside of the pool are left alone
+            request.headers = {u'Authorization': u'Bearer c'}
+            transport.TokenPoolAuth()(request)
+            assert request.headers[u'Authorization'] == u'Bearer c'
+    finally:
+        ratelimit.reset()
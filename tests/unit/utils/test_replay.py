@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import pytest
+import requests
+from backports import tempfile
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from ansibullbot.utils import replay
+
+
+def _exchange(archive, url, body, status=200, method=u'GET'):
+    request = requests.Request(method, url).prepare()
+    response = Response()
+    response.status_code = status
+    response.reason = u'OK'
+    response.headers = CaseInsensitiveDict({
+        u'Content-Type': u'application/json',
+        u'Content-Encoding': u'gzip',
+    })
+    response._content = body
+    archive.add(request, response)
+
+
+def test_request_key_ignores_query_order():
+    assert replay.request_key(u'get', u'https://x/y?b=2&a=1') == \
+        replay.request_key(u'GET', u'https://x/y?a=1&b=2')
+    assert replay.request_key(u'POST', u'https://x/graphql', u'{"q": 1}') != \
+        replay.request_key(u'POST', u'https://x/graphql', u'{"q": 2}')
+
+
+def test_replay_serves_recorded_responses_in_order():
+    with tempfile.TemporaryDirectory() as archivedir:
+        archive = replay.HTTPArchive(archivedir)
+        _exchange(archive, u'https://api.github.com/repos/a/b/issues/1', b'{"n": 1}')
+        _exchange(archive, u'https://api.github.com/repos/a/b/issues/1', b'{"n": 2}')
+        archive.manifest = {u'commit': u'abc'}
+        archive.save()
+
+        archive = replay.HTTPArchive(archivedir).load()
+        assert archive.manifest == {u'commit': u'abc'}
+
+        stand_in = replay.replay(archive)
+        try:
+            url = u'https://api.github.com/repos/a/b/issues/1'
+            rr = requests.get(url)
+            assert rr.json() == {u'n': 1}
+            # the decoded body is stored so the encoding header is dropped
+            assert u'Content-Encoding' not in rr.headers
+            assert requests.get(url).json() == {u'n': 2}
+            # the last response keeps being served
+            assert requests.get(url).json() == {u'n': 2}
+
+            with pytest.raises(requests.exceptions.ConnectionError):
+                requests.get(u'https://api.github.com/repos/a/b/issues/2')
+            assert stand_in.misses == [u'GET https://api.github.com/repos/a/b/issues/2']
+        finally:
+            replay.uninstall()
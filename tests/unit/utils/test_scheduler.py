@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+import os
+
+from backports import tempfile
+
+from ansibullbot.utils.scheduler import PRIORITY_ACTIVITY, PRIORITY_CI, PRIORITY_STALE
+from ansibullbot.utils.scheduler import TriageScheduler, TriageTimers
+
+
+def test_scheduler_priority_order():
+    ts = TriageScheduler()
+    ts.push(u'ansible/ansible', 3, PRIORITY_STALE)
+    ts.push(u'ansible/ansible', 1, PRIORITY_CI)
+    ts.push(u'ansible/ansible', 2, PRIORITY_ACTIVITY)
+    ts.push(u'ansible/ansible', 4, PRIORITY_ACTIVITY)
+
+    assert [ts.pop()[1] for x in range(4)] == [2, 4, 1, 3]
+    assert ts.pop() is None
+
+
+def test_scheduler_keeps_best_priority():
+    ts = TriageScheduler()
+    assert ts.push(u'ansible/ansible', 1, PRIORITY_STALE, reason=u'stale')
+    assert ts.push(u'ansible/ansible', 1, PRIORITY_ACTIVITY, reason=u'updated')
+    assert not ts.push(u'ansible/ansible', 1, PRIORITY_CI, reason=u'ci')
+
+    assert len(ts) == 1
+    assert (u'ansible/ansible', 1) in ts
+    assert ts.pop() == (u'ansible/ansible', 1, PRIORITY_ACTIVITY, u'updated')
+    assert ts.pop() is None
+
+
+def test_scheduler_persists():
+    with tempfile.TemporaryDirectory() as cachedir:
+        cachefile = os.path.join(cachedir, u'schedule.json')
+
+        ts = TriageScheduler(cachefile=cachefile)
+        ts.push(u'ansible/ansible', 10, PRIORITY_STALE)
+        ts.push(u'ansible/ansible', 11, PRIORITY_ACTIVITY)
+        ts.mark_processed(u'ansible/ansible', 9, updated_at=u'2019-01-01T00:00:00')
+        ts.save()
+
+        ts = TriageScheduler(cachefile=cachefile)
+        assert ts.last_processed(u'ansible/ansible', 9)[u'updated_at'] == u'2019-01-01T00:00:00'
+        assert ts.last_processed(u'ansible/ansible', 10) == {}
+        assert ts.pop()[1] == 11
+        assert ts.pop()[1] == 10
+
+
+def test_scheduler_prune():
+    ts = TriageScheduler()
+    for number in (1, 2, 3):
+        ts.mark_processed(u'ansible/ansible', number, updated_at=u'2019-01-01T00:00:00')
+    ts.mark_processed(u'ansible/other', 2, updated_at=u'2019-01-01T00:00:00')
+
+    ts.prune(u'ansible/ansible', [2, 4])
+    assert sorted(ts.processed) == [u'ansible/ansible#2', u'ansible/other#2']
+
+
+def test_timers_pop_due():
+    timers = TriageTimers()
+    timers.set(u'ansible/ansible', 1, 300)
+    timers.set(u'ansible/ansible', 2, 100)
+    timers.set(u'ansible/ansible', 3, 200)
+    # moving a timer replaces the old one
+    timers.set(u'ansible/ansible', 2, 400)
+    timers.remove(u'ansible/ansible', 3)
+
+    assert timers.next_due() == 300
+    assert timers.pop_due(50) == []
+    assert timers.pop_due(350) == [(u'ansible/ansible', 1)]
+    assert timers.get(u'ansible/ansible', 1) is None
+    assert len(timers) == 1
+
+
+def test_timers_persist():
+    with tempfile.TemporaryDirectory() as cachedir:
+        cachefile = os.path.join(cachedir, u'timers.json')
+
+        timers = TriageTimers(cachefile=cachefile)
+        timers.set(u'ansible/ansible', 1, 300)
+        timers.set(u'ansible/ansible', 2, 100)
+        timers.save()
+
+        timers = TriageTimers(cachefile=cachefile)
+        assert timers.get(u'ansible/ansible', 1) == 300
+        assert timers.pop_due(1000) == [(u'ansible/ansible', 2), (u'ansible/ansible', 1)]
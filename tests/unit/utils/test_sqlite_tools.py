@@ -72,3 +72,35 @@ def test_set_and_get_rate_limit():
             assert remaining == 5000
             assert rl == rl2
             assert counter == 2
+
+
+def test_set_and_get_triage_index():
+
+    with tempfile.TemporaryDirectory() as cachedir:
+        unc = 'sqlite:///' + cachedir + '/test.db'
+
+        with mock.patch('ansibullbot.utils.sqlite_utils.C.DEFAULT_DATABASE_UNC', unc):
+
+            ADB = AnsibullbotDatabase(cachedir=cachedir)
+
+            assert ADB.get_triage_index('ansible/ansible', 1) == {}
+
+            ADB.set_triage_index(
+                'ansible/ansible', 1,
+                updated_at='2019-01-01T00:00:00',
+                time='2019-01-02T00:00:00',
+                next_check=100.0,
+                needs_rebuild=False,
+                admin_merge=False
+            )
+            ADB.set_triage_index('ansible/ansible', 2, next_check=200.0, needs_rebuild=True)
+            ADB.set_triage_index('ansible/ansible', 1, next_check=300.0)
+            ADB.set_triage_index('ansible/other', 1, next_check=50.0)
+
+            ti = ADB.get_triage_index('ansible/ansible', 1)
+            assert ti['updated_at'] == '2019-01-01T00:00:00'
+            assert ti['next_check'] == 300.0
+
+            indexes = ADB.get_triage_indexes('ansible/ansible')
+            assert sorted(indexes.keys()) == [1, 2]
+            assert indexes[2]['needs_rebuild'] is True
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+from ansibullbot.utils.summary_table import SummaryTable, to_epoch, to_timestamp
+
+
+SUMMARIES = {
+    u'1': {u'number': 1, u'state': u'open', u'type': u'issue',
+           u'created_at': u'2020-01-01T00:00:00Z', u'updated_at': u'2020-03-01T00:00:00Z',
+           u'labels': [u'bug', u'module']},
+    u'2': {u'number': 2, u'state': u'closed', u'type': None,
+           u'created_at': None, u'updated_at': None},
+    u'3': {u'number': 3, u'state': u'open', u'type': u'pullrequest',
+           u'created_at': u'2020-02-01T00:00:00Z', u'updated_at': u'2020-02-02T00:00:00Z',
+           u'labels': [u'module']},
+    u'4': {u'number': 4, u'state': u'merged', u'type': u'pullrequest',
+           u'created_at': u'2020-04-01T00:00:00Z', u'updated_at': u'2020-04-02T00:00:00Z'},
+}
+
+
+def test_epoch_roundtrip():
+    assert to_epoch(None) == 0
+    assert to_timestamp(to_epoch(u'2020-02-01T10:11:12Z')) == u'2020-02-01T10:11:12Z'
+    assert to_epoch(u'2020-02-01T10:11:12.123Z') == to_epoch(u'2020-02-01T10:11:12Z')
+
+
+def test_select():
+    table = SummaryTable(SUMMARIES)
+    assert len(table) == 4
+    assert 3 in table and u'3' in table and 5 not in table
+
+    assert table.select(state=u'open') == [1, 3]
+    assert table.select(itype=u'pullrequest') == [3, 4]
+    assert table.select([4, u'3', 3, 99], state=u'open') == [3]
+    assert table.select(max_number=2) == [1, 2]
+    assert table.select(created_after=u'2020-01-15T00:00:00Z') == [3, 4]
+    assert table.select(label=u'module', itype=u'issue') == [1]
+    assert table.select(label=u'nope') == []
+
+    assert table.get_state(4) == u'merged'
+    assert table.get_type(2) is None
+
+
+def test_latest_timestamp_and_update():
+    table = SummaryTable(SUMMARIES)
+    assert table.latest_timestamp() == u'2020-04-02T00:00:00Z'
+
+    table.add({u'number': 1, u'state': u'closed', u'type': u'issue',
+               u'created_at': u'2020-01-01T00:00:00Z', u'updated_at': u'2020-05-01T00:00:00Z'})
+    assert len(table) == 4
+    assert table.select(state=u'open') == [3]
+    assert table.latest_timestamp() == u'2020-05-01T00:00:00Z'
+    assert SummaryTable().latest_timestamp() is None
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+import six
+six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
+from six.moves import mock
+
+from backports import tempfile
+
+from ansibullbot.utils import transport
+
+
+def test_session_is_shared():
+    transport.reset()
+    session = transport.get_session()
+    assert transport.get_session() is session
+    assert session.headers[u'Accept-Encoding'] == u'gzip, deflate'
+
+    adapter = session.get_adapter(u'https://api.github.com')
+    assert adapter._pool_maxsize == transport.C.DEFAULT_HTTP_POOL_MAXSIZE
+    transport.reset()
+
+
+def test_forked_process_gets_its_own_session():
+    transport.reset()
+    session = transport.get_session()
+    with mock.patch('ansibullbot.utils.transport.os.getpid', return_value=-1):
+        assert transport.get_session() is not session
+    transport.reset()
+
+
+def test_configure_cache_mounts_caching_adapter():
+    from ansibullbot.utils.http_cache import CachingAdapter
+    with tempfile.TemporaryDirectory() as cachedir:
+        transport.configure_cache(cachedir)
+        try:
+            session = transport.get_session()
+            adapter = session.get_adapter(transport.C.DEFAULT_GITHUB_URL + u'/repos')
+            assert isinstance(adapter, CachingAdapter)
+            assert adapter.cache is transport.get_cache()
+            assert adapter.cache.stats()[u'max_bytes'] == transport.C.DEFAULT_HTTP_CACHE_MAX_MB * 1024 * 1024
+            assert not isinstance(session.get_adapter(u'https://app.shippable.com/'), CachingAdapter)
+        finally:
+            transport.configure_cache(None)
+    assert transport.get_cache() is None
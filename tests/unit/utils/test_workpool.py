@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+import os
+
+from ansibullbot.utils.workpool import run_workers
+
+
+STATE = {u'index': None}
+
+
+def test_run_workers_processes_every_item():
+    # set after import but before the fork, the children see it copy-on-write
+    STATE[u'index'] = dict((x, x * 2) for x in range(20))
+
+    def handler(item):
+        assert STATE[u'index'][item] == item * 2
+        if item == 13:
+            raise Exception(u'unlucky')
+
+    results = run_workers(list(range(20)), handler, workers=3, poll=1)
+
+    assert sorted([x[u'item'] for x in results]) == list(range(20))
+    assert [x[u'item'] for x in results if x[u'status'] == u'error'] == [13]
+    assert os.getpid() not in [x[u'pid'] for x in results]
+
+
+def test_run_workers_initializer_runs_in_children():
+    def initializer():
+        STATE[u'child'] = os.getpid()
+
+    def handler(item):
+        assert STATE[u'child'] == os.getpid()
+
+    results = run_workers([1, 2, 3], handler, workers=2, initializer=initializer, poll=1)
+    assert set([x[u'status'] for x in results]) == set([u'ok'])
+    assert u'child' not in STATE
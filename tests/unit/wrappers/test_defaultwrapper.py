@@ -1,8 +1,6 @@
 #!/usr/bin/env python
 
 import datetime
-import json
-import os
 
 import six
 six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
@@ -10,7 +8,9 @@ from six.moves import mock
 
 from backports import tempfile
 
+from ansibullbot.utils.cache_store import get_store
 from ansibullbot.wrappers.defaultwrapper import DefaultWrapper
+from ansibullbot.wrappers.ghapiwrapper import GithubWrapper
 
 
 class GithubIssueMock:
@@ -66,8 +66,9 @@ def test_get_events():
         events = dw.events
 
         assert len(events) == 3
-        assert os.path.exists(os.path.join(cachedir, 'issues', '1', 'timeline_meta.json'))
-        assert os.path.exists(os.path.join(cachedir, 'issues', '1', 'timeline_data.json'))
+        store = get_store(cachedir)
+        assert store.get(u'ansible/ansible', 1, u'timeline_meta')
+        assert len(store.get(u'ansible/ansible', 1, u'timeline_data')) == 3
 
 
 @mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
@@ -85,24 +86,17 @@ def test_get_events_bad_cache_invalidate():
             {'event': 'comment', 'created_at': '2020-05-31T10:02:20Z'}
         ]
 
-        events_meta_cache = os.path.join(cachedir, 'issues', '1', 'timeline_meta.json')
-        events_data_cache = os.path.join(cachedir, 'issues', '1', 'timeline_data.json')
-
-        os.makedirs(os.path.dirname(events_meta_cache))
-
-
-        # set a meta file that matches the timestamp for the issue so the cache is used
-        with open(events_meta_cache, 'w') as f:
-            f.write(json.dumps({
-                u'updated_at': '2020-05-31T10:02:20Z',
-                u'url': u'https://github.com/ansible/ansible/issues/1/timeline',
-            }))
-
-        # create a bad event to make sure the cache is invalidated and refetched
+        # set a meta entry that matches the timestamp for the issue so the cache is used
+        # and a bad event to make sure the cache is invalidated and refetched
         bad_events = github.cache[u'https://github.com/ansible/ansible/issues/1/timeline'][:]
         bad_events[0] = u'documentation_url'
-        with open(events_data_cache, 'w') as f:
-            f.write(json.dumps(bad_events))
+        get_store(cachedir).set_many(u'ansible/ansible', 1, {
+            u'timeline_meta': {
+                u'updated_at': '2020-05-31T10:02:20Z',
+                u'url': u'https://github.com/ansible/ansible/issues/1/timeline',
+            },
+            u'timeline_data': bad_events,
+        })
 
         dw = DefaultWrapper(
             github=github,
@@ -115,3 +109,173 @@ def test_get_events_bad_cache_invalidate():
         events = dw.events
 
         assert len(events) == 3
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_load_details_seeds_timeline():
+    '''Graphql details replace the timeline request'''
+    with tempfile.TemporaryDirectory() as cachedir:
+        github = GithubWrapperMock()
+        github.get_request = mock.Mock(side_effect=AssertionError('no request expected'))
+        repo = GithubRepoWrapperMock()
+        issue = GithubIssueMock()
+        issue.html_url = u'https://github.com/ansible/ansible/issues/1'
+        issue.updated_at = datetime.datetime(2020, 6, 1, 10, 0, 0)
+
+        dw = DefaultWrapper(
+            github=github,
+            repo=repo,
+            issue=issue,
+            cachedir=cachedir,
+            gitrepo=repo,
+        )
+
+        details = {
+            u'number': 1,
+            u'updated_at': u'2020-06-01T10:00:00Z',
+            u'is_pullrequest': False,
+            u'labels': [],
+            u'assignees': [],
+            u'timeline': [
+                {u'event': u'labeled', u'node_id': u'LE_1', u'actor': {u'login': u'bot'},
+                 u'created_at': u'2020-05-31T10:02:20Z', u'label': {u'name': u'bug'}},
+            ],
+        }
+        assert dw.load_details(details)
+
+        events = dw.events
+        assert len(events) == 1
+        assert events[0][u'label'] == u'bug'
+
+
+def test_load_details_stale():
+    '''Details older than the issue are ignored'''
+    with tempfile.TemporaryDirectory() as cachedir:
+        repo = GithubRepoWrapperMock()
+        issue = GithubIssueMock()
+        issue.updated_at = datetime.datetime(2020, 6, 2, 10, 0, 0)
+
+        dw = DefaultWrapper(
+            github=GithubWrapperMock(),
+            repo=repo,
+            issue=issue,
+            cachedir=cachedir,
+            gitrepo=repo,
+        )
+
+        assert not dw.load_details({u'updated_at': u'2020-06-01T10:00:00Z', u'timeline': []})
+        assert dw._details is None
+
+
+def _timeline_event(idx):
+    return {
+        u'event': u'labeled',
+        u'node_id': u'LE_%s' % idx,
+        u'created_at': u'2020-05-31T%02d:%02d:00Z' % (10 + idx // 60, idx % 60),
+    }
+
+
+def _stale_timeline_cache(cachedir, events):
+    get_store(cachedir).set_many(u'ansible/ansible', 1, {
+        u'timeline_meta': {
+            u'updated_at': '2020-05-31T10:02:20',
+            u'url': u'https://github.com/ansible/ansible/issues/1/timeline',
+            u'per_page': 30,
+        },
+        u'timeline_data': events,
+    })
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_events_incremental():
+    '''A stale cache only refetches its last page'''
+    with tempfile.TemporaryDirectory() as cachedir:
+        github = GithubWrapperMock()
+        github.cache = {
+            u'https://github.com/ansible/ansible/issues/1/timeline?page=2':
+                [_timeline_event(x) for x in range(30, 37)],
+        }
+        github.get_request = mock.Mock(side_effect=github._get_request)
+        repo = GithubRepoWrapperMock()
+        issue = GithubIssueMock()
+        _stale_timeline_cache(cachedir, [_timeline_event(x) for x in range(35)])
+
+        dw = DefaultWrapper(
+            github=github,
+            repo=repo,
+            issue=issue,
+            cachedir=cachedir,
+            gitrepo=repo,
+        )
+
+        assert len(dw.events) == 37
+        github.get_request.assert_called_once_with(
+            u'https://github.com/ansible/ansible/issues/1/timeline?page=2'
+        )
+
+        known = set([u'LE_%s' % x for x in range(35)])
+        new_events = dw.get_new_events(known)
+        assert [x[u'id'] for x in new_events] == [u'LE_35', u'LE_36']
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_events_incremental_paginated():
+    '''The tail fetch goes through get_request and only asks for the last pages'''
+    with tempfile.TemporaryDirectory() as cachedir:
+        url = u'https://github.com/ansible/ansible/issues/1/timeline?page=%s'
+        events = [_timeline_event(x) for x in range(155)]
+        link = u'<%s>; rel="next", <%s>; rel="last"' % (url % 6, url % 6)
+
+        def get_request_page(_url, headers=None):
+            page = int(_url.rsplit(u'=', 1)[1])
+            headers = {u'Link': link} if page < 6 else {}
+            return 200, headers, events[(page - 1) * 30:page * 30]
+
+        github = GithubWrapper(None, token=12345, cachedir=cachedir)
+        github.get_request_page = mock.Mock(side_effect=get_request_page)
+        repo = GithubRepoWrapperMock()
+        issue = GithubIssueMock()
+        _stale_timeline_cache(cachedir, events[:125])
+
+        dw = DefaultWrapper(
+            github=github,
+            repo=repo,
+            issue=issue,
+            cachedir=cachedir,
+            gitrepo=repo,
+        )
+
+        assert [x[u'id'] for x in dw.events] == [x[u'node_id'] for x in events]
+        assert [x[0][0] for x in github.get_request_page.call_args_list] == [url % 5, url % 6]
+        assert len(get_store(cachedir).get(u'ansible/ansible', 1, u'timeline_data')) == 155
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_events_incremental_mismatch():
+    '''Deleted events shift the pages and force a full fetch'''
+    with tempfile.TemporaryDirectory() as cachedir:
+        github = GithubWrapperMock()
+        github.cache = {
+            u'https://github.com/ansible/ansible/issues/1/timeline?page=2':
+                [_timeline_event(x) for x in range(31, 37)],
+            u'https://github.com/ansible/ansible/issues/1/timeline':
+                [_timeline_event(x) for x in range(37) if x != 3],
+        }
+        repo = GithubRepoWrapperMock()
+        issue = GithubIssueMock()
+        _stale_timeline_cache(cachedir, [_timeline_event(x) for x in range(35)])
+
+        dw = DefaultWrapper(
+            github=github,
+            repo=repo,
+            issue=issue,
+            cachedir=cachedir,
+            gitrepo=repo,
+        )
+
+        assert len(dw.events) == 36
+        assert dw.get_new_events(set()) is None
@@ -3,6 +3,7 @@
 
 import pytest
 import tempfile
+import time
 
 import six
 six.add_move(six.MovedModule('mock', 'mock', 'unittest.mock'))
@@ -10,7 +11,7 @@ from six.moves import mock
 import tempfile
 
 from ansibullbot.errors import RateLimitError
-from ansibullbot.wrappers.ghapiwrapper import GithubWrapper
+from ansibullbot.wrappers.ghapiwrapper import GithubWrapper, merge_page, page_urls
 
 
 class GithubMock(object):
@@ -19,6 +20,9 @@ class GithubMock(object):
 
 
 class RequestsResponseMock(object):
+    status_code = 403
+    headers = {}
+
     def json(self):
         data = {
             u'documentation_url': u'https://developer.github.com/v3/#rate-limiting',
@@ -35,7 +39,7 @@ class RequestsMockRateLimited(object):
 
 @mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
 @mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
-@mock.patch('ansibullbot.wrappers.ghapiwrapper.requests', RequestsMockRateLimited())
+@mock.patch('ansibullbot.wrappers.ghapiwrapper.transport', RequestsMockRateLimited())
 def test_get_request_rate_limited():
 
     cachedir = tempfile.mkdtemp()    
@@ -45,3 +49,231 @@ def test_get_request_rate_limited():
 
     with pytest.raises(RateLimitError):
         rdata = gw.get_request(u'https://foo.bar.com/test')
+
+
+def test_page_urls():
+    urls = page_urls(u'https://api.github.com/repos/a/b/issues/1/timeline?per_page=100&page=4')
+    assert urls == [
+        u'https://api.github.com/repos/a/b/issues/1/timeline?per_page=100&page=2',
+        u'https://api.github.com/repos/a/b/issues/1/timeline?per_page=100&page=3',
+        u'https://api.github.com/repos/a/b/issues/1/timeline?per_page=100&page=4',
+    ]
+
+
+def test_merge_page():
+    assert merge_page([1], [2]) == [1, 2]
+    assert merge_page({u'total_count': 2, u'items': [1]}, {u'total_count': 2, u'items': [2]}) == \
+        {u'total_count': 2, u'items': [1, 2]}
+    with pytest.raises(TypeError):
+        merge_page({u'message': u'x'}, {u'other': u'y'})
+    with pytest.raises(TypeError):
+        merge_page([1], {u'message': u'x'})
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_request_fetches_pages_in_order():
+    url = u'https://api.github.com/x'
+    last = u'<https://api.github.com/x?page=5>; rel="last", <https://api.github.com/x?page=2>; rel="next"'
+
+    def get_request_page(_url, headers=None):
+        if _url == url:
+            return 200, {u'Link': last}, [1]
+        page = int(_url.rsplit(u'=', 1)[1])
+        # later pages answer first
+        time.sleep(0.01 * (5 - page))
+        return 200, {}, [page]
+
+    gw = GithubWrapper(GithubMock(), token=12345, cachedir=tempfile.mkdtemp())
+    with mock.patch.object(gw, 'get_request_page', side_effect=get_request_page) as m:
+        assert gw.get_request(url) == [1, 2, 3, 4, 5]
+    assert m.call_count == 5
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_iter_pages_follows_next_without_last():
+    pages = {
+        u'https://api.github.com/x': (200, {u'Link': u'<https://api.github.com/x?cursor=b>; rel="next"'}, [1]),
+        u'https://api.github.com/x?cursor=b': (200, {}, [2]),
+    }
+    gw = GithubWrapper(GithubMock(), token=12345, cachedir=tempfile.mkdtemp())
+    with mock.patch.object(gw, 'get_request_page', side_effect=lambda x, headers=None: pages[x]):
+        assert [x[2] for x in gw.iter_pages(u'https://api.github.com/x')] == [[1], [2]]
+
+
+class RequestsMockCommit(object):
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, headers=None):
+        self.urls.append(url)
+        rr = mock.Mock(status_code=200, headers={})
+        rr.json.return_value = {u'sha': url.rsplit(u'/', 1)[1], u'files': []}
+        return rr
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_cached_request_keeps_commits():
+    transport = RequestsMockCommit()
+    url = u'https://api.github.com/repos/a/b/commits/abc'
+
+    gw = GithubWrapper(GithubMock(), token=12345, cachedir=tempfile.mkdtemp())
+    with mock.patch('ansibullbot.wrappers.ghapiwrapper.transport', transport):
+        assert gw.get_cached_request(url) == {u'sha': u'abc', u'files': []}
+        assert gw.get_cached_request(url) == {u'sha': u'abc', u'files': []}
+        gw.cached_requests.evict(max_bytes=1)
+        assert gw.get_cached_request(url) == {u'sha': u'abc', u'files': []}
+
+    assert transport.urls == [url]
+    assert gw.cached_requests.stats()[u'pinned'] == 1
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_cached_request_memoized():
+    url = u'https://api.github.com/repos/a/b/commits/abc'
+    gw = GithubWrapper(GithubMock(), token=12345, cachedir=tempfile.mkdtemp())
+    gw._cached_requests = store = mock.Mock()
+    store.get.return_value = {u'sha': u'abc'}
+    assert gw.get_cached_request(url) == {u'sha': u'abc'}
+    assert gw.get_cached_request(url) is gw.get_cached_request(url)
+    store.get.assert_called_once_with(url)
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_request_from_a_later_page():
+    url = u'https://api.github.com/x?page=5'
+    last = u'<https://api.github.com/x?page=6>; rel="last", <https://api.github.com/x?page=6>; rel="next"'
+
+    def get_request_page(_url, headers=None):
+        page = int(_url.rsplit(u'=', 1)[1])
+        return 200, {u'Link': last} if page == 5 else {}, [page]
+
+    gw = GithubWrapper(GithubMock(), token=12345, cachedir=tempfile.mkdtemp())
+    with mock.patch.object(gw, 'get_request_page', side_effect=get_request_page) as m:
+        assert gw.get_request(url) == [5, 6]
+    assert m.call_count == 2
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_cached_request_caches_all_pages():
+    url = u'https://api.github.com/repos/a/b/commits/abc?page=1'
+    last = u'<https://api.github.com/repos/a/b/commits/abc?page=3>; rel="last"'
+
+    def get_request_page(_url, headers=None):
+        page = int(_url.rsplit(u'=', 1)[1])
+        return 200, {u'Link': last} if page == 1 else {}, [page]
+
+    gw = GithubWrapper(GithubMock(), token=12345, cachedir=tempfile.mkdtemp())
+    with mock.patch.object(gw, 'get_request_page', side_effect=get_request_page):
+        assert gw.get_cached_request(url) == [1, 2, 3]
+    assert gw.cached_requests.get(url) == [1, 2, 3]
+
+
+class RequestsMockSearch(object):
+    def get(self, url, headers=None):
+        page = int(url.rsplit(u'=', 1)[1])
+        link = u'<https://api.github.com/search/issues?q=x&page=2>; rel="next"'
+        rr = mock.Mock(status_code=200, headers={u'Link': link} if page == 1 else {})
+        rr.links = {u'next': {u'url': link[1:].split(u'>')[0]}} if page == 1 else {}
+        rr.json.return_value = {u'total_count': 2, u'items': [{u'number': page}]}
+        return rr
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', False)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+@mock.patch('ansibullbot.wrappers.ghapiwrapper.transport', RequestsMockSearch())
+def test_get_cached_request_merges_wrapped_pages():
+    url = u'https://api.github.com/search/issues?q=x&page=1'
+    gw = GithubWrapper(GithubMock(), token=12345, cachedir=tempfile.mkdtemp())
+    expected = {u'total_count': 2, u'items': [{u'number': 1}, {u'number': 2}]}
+    assert gw.get_cached_request(url) == expected
+    # only commits are stored, the http cache revalidates the rest
+    assert gw.cached_requests.get(url) is None
+
+
+def test_wrap_requester_serializes_requests():
+    from github import Github
+    from ansibullbot.wrappers.ghapiwrapper import wrap_requester
+
+    gh = Github(base_url=u'https://api.github.com', login_or_token=u'12345')
+    requester = gh._Github__requester
+    held = []
+
+    def request_raw(*args, **kwargs):
+        held.append(requester._ansibullbot_lock._is_owned())
+        return 200, {}, u'{}'
+
+    requester._Requester__requestRaw = request_raw
+
+    assert wrap_requester(gh) is gh
+    wrapped = requester._Requester__requestRaw
+    assert wrap_requester(gh) is gh
+    assert requester._Requester__requestRaw is wrapped
+
+    requester._Requester__requestRaw(None, u'GET', u'/repos/a/b', {}, None)
+    assert held == [True]
+
+
+def test_wrap_requester_routes_tokens():
+    from github import Github
+    from ansibullbot.utils import ratelimit
+    from ansibullbot.wrappers.ghapiwrapper import wrap_requester
+
+    gh = Github(base_url=u'https://api.github.com', login_or_token=u'a')
+    requester = gh._Github__requester
+    sent = []
+
+    def request_raw(cnx, verb, url, headers, input):
+        sent.append(headers[u'Authorization'])
+        return 200, {u'x-ratelimit-limit': u'5000', u'x-ratelimit-remaining': u'4321',
+                     u'x-ratelimit-reset': u'%d' % (time.time() + 3600)}, u'{}'
+
+    requester._Requester__requestRaw = request_raw
+    wrap_requester(gh)
+
+    ratelimit.reset()
+    pool = ratelimit.TokenPool([u'a', u'b'])
+    try:
+        with mock.patch('ansibullbot.utils.ratelimit._pool', pool):
+            # the token @RateLimited took the budget from sends the call
+            pool.acquire(token=u'b')
+            requester._Requester__requestRaw(None, u'GET', u'/repos/a/b', {u'Authorization': u'token a'}, None)
+            assert sent == [u'token b']
+            assert ratelimit.get_budget(u'b').resources[u'core'][u'remaining'] == 4321
+            assert not ratelimit.get_budget(u'a').known()
+    finally:
+        ratelimit.reset()
+
+
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_RATELIMIT', True)
+@mock.patch('ansibullbot.decorators.github.C.DEFAULT_BREAKPOINTS', False)
+def test_get_request_takes_budget_once_per_page():
+    from ansibullbot.utils import ratelimit
+
+    url = u'https://api.github.com/x?page=1'
+    last = u'<https://api.github.com/x?page=3>; rel="last"'
+    rr = mock.Mock(status_code=200)
+    rr.json.side_effect = lambda: [len(rr.mock_calls)]
+
+    def get(_url, headers=None):
+        rr.headers = {u'Link': last} if _url.endswith(u'page=1') else {}
+        return rr
+
+    ratelimit.reset()
+    pool = ratelimit.TokenPool([u'a'])
+    ratelimit.get_budget(u'a').update(u'core', 5000, 4000, time.time() + 3600)
+    try:
+        gw = GithubWrapper(GithubMock(), token=u'a', cachedir=tempfile.mkdtemp())
+        with mock.patch('ansibullbot.utils.ratelimit._pool', pool), \
+                mock.patch('ansibullbot.wrappers.ghapiwrapper.transport') as m_transport, \
+                mock.patch('ansibullbot.wrappers.ghapiwrapper.C.DEFAULT_PAGINATION_WORKERS', 1):
+            m_transport.get.side_effect = get
+            assert len(gw.get_request(url)) == 3
+        assert ratelimit.get_budget(u'a').resources[u'core'][u'remaining'] == 4000 - 3
+    finally:
+        ratelimit.reset()
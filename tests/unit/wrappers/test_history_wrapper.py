@@ -169,3 +169,44 @@ def test_ignore_events_without_dates_on_last_methods():
     res.append(hw.was_unlabeled(u'needs_info'))
 
     assert not [x for x in res if x is None]
+
+
+def test_append_new_events_to_stale_cache():
+    '''A cache that is only behind the issue gets the new events appended'''
+    old = {
+        u'id': u'LE_1',
+        u'actor': u'jimi-c',
+        u'event': u'labeled',
+        u'label': u'bug',
+        u'created_at': datetime.datetime(2020, 5, 31, 10, 0, 0),
+    }
+    new = {
+        u'id': u'IC_2',
+        u'actor': u'jimi-c',
+        u'body': u'shipit',
+        u'event': u'commented',
+        u'created_at': datetime.datetime(2020, 6, 1, 10, 0, 0),
+    }
+
+    iw = IssueWrapperMock()
+    iw.labels = []
+    iw.instance = IssueMock()
+    iw.instance.updated_at = datetime.datetime(2020, 5, 31, 10, 0, 0)
+    iw._events = [old]
+
+    cachedir = tempfile.mkdtemp()
+    HistoryWrapper(iw, cachedir=cachedir)
+
+    known_ids = []
+    def get_new_events(known):
+        known_ids.append(known)
+        return [new]
+
+    iw.instance.updated_at = datetime.datetime(2020, 6, 1, 10, 0, 0)
+    iw._events = []
+    iw.get_new_events = get_new_events
+    hw = HistoryWrapper(iw, cachedir=cachedir)
+
+    assert known_ids == [set([u'LE_1'])]
+    assert [x[u'id'] for x in hw.history] == [u'LE_1', u'IC_2']
+    assert hw._load_cache()[u'updated_at'] == iw.instance.updated_at
@@ -1308,6 +1308,9 @@ class MockRequests:
     def post(self, url, headers=None, data=None):
         return MockRequestsResponse(url, inheaders=headers, indata=data, method='POST', issuedb=self.issuedb)
 
+    def request(self, method, url, headers=None, data=None, **kwargs):
+        return MockRequestsResponse(url, inheaders=headers, indata=data, method=method.upper(), issuedb=self.issuedb)
+
     def Session(self):
         return MockRequestsSession(self.issuedb)
 
@@ -1474,10 +1477,10 @@ class BotMockManager:
         self.mocks.append(mock.patch('ansibullbot.decorators.github.C.DEFAULT_GITHUB_USERNAME', 'ansibot'))
         self.mocks.append(mock.patch('ansibullbot.decorators.github.C.DEFAULT_GITHUB_TOKEN', 'abc1234'))
         self.mocks.append(mock.patch('github.Requester.requests', self.mr))
-        self.mocks.append(mock.patch('ansibullbot.decorators.github.requests', self.mr))
+        self.mocks.append(mock.patch('ansibullbot.decorators.github.transport', self.mr))
         self.mocks.append(mock.patch('ansibullbot.parsers.botmetadata.logging', MockLogger))
         self.mocks.append(mock.patch('ansibullbot.triagers.ansible.logging', MockLogger))
-        self.mocks.append(mock.patch('ansibullbot.triagers.ansible.requests', self.mr))
+        self.mocks.append(mock.patch('ansibullbot.triagers.ansible.transport', self.mr))
         self.mocks.append(mock.patch('ansibullbot.triagers.plugins.contributors.logging', MockLogger))
         self.mocks.append(mock.patch('ansibullbot.triagers.plugins.needs_revision.logging', MockLogger))
         self.mocks.append(mock.patch('ansibullbot.triagers.plugins.shipit.logging', MockLogger))
@@ -1495,9 +1498,9 @@ class BotMockManager:
         self.mocks.append(mock.patch('ansibullbot.wrappers.defaultwrapper.logging', MockLogger))
         self.mocks.append(mock.patch('ansibullbot.wrappers.historywrapper.logging', MockLogger))
         self.mocks.append(mock.patch('ansibullbot.wrappers.ghapiwrapper.logging', MockLogger))
-        self.mocks.append(mock.patch('ansibullbot.utils.gh_gql_client.requests', self.mr))
-        self.mocks.append(mock.patch('ansibullbot.utils.shippable_api.requests', self.mr))
-        self.mocks.append(mock.patch('ansibullbot.wrappers.ghapiwrapper.requests', self.mr))
+        self.mocks.append(mock.patch('ansibullbot.utils.gh_gql_client.transport', self.mr))
+        self.mocks.append(mock.patch('ansibullbot.utils.shippable_api.transport', self.mr))
+        self.mocks.append(mock.patch('ansibullbot.wrappers.ghapiwrapper.transport', self.mr))
 
         for _m in self.mocks:
             _m.start()
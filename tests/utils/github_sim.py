@@ -0,0 +1,1386 @@
+#!/usr/bin/env python
+
+'''
+Local stand-in for the GitHub REST, GraphQL and Shippable APIs.
+
+The repositories are synthetic: every issue is generated on demand from
+a seed and its number, so a 100k issue repo costs a few small arrays
+until its issues are requested. Writes made by the bot (comments,
+labels, assignees, state changes, merges) are kept on top of the
+generated data and bump the issue's updated_at like GitHub does.
+
+Responses carry ETags and answer If-None-Match with a 304, count
+against X-RateLimit-* headers per token and can be delayed to emulate
+network latency. Files under a fixtures directory override generated
+responses, <fixtures>/repos/ansible/ansible/issues/1.json is served for
+/repos/ansible/ansible/issues/1.
+
+Point the bot at it with github_url and shippable_url in the config.
+'''
+
+import base64
+import collections
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+
+
+LABELS = [
+    u'bug', u'feature', u'docs', u'module', u'plugins', u'support:core',
+    u'support:community', u'needs_info', u'needs_triage', u'needs_revision',
+    u'needs_rebase', u'shipit', u'affects_2.9', u'affects_2.10', u'python3',
+    u'networking', u'cloud', u'windows', u'easyfix', u'waiting_on_contributor',
+]
+
+FILES = [
+    u'lib/ansible/cli/galaxy.py',
+    u'lib/ansible/executor/task_executor.py',
+    u'lib/ansible/module_utils/basic.py',
+    u'lib/ansible/module_utils/urls.py',
+    u'lib/ansible/modules/command.py',
+    u'lib/ansible/modules/copy.py',
+    u'lib/ansible/modules/file.py',
+    u'lib/ansible/modules/git.py',
+    u'lib/ansible/modules/lineinfile.py',
+    u'lib/ansible/modules/service.py',
+    u'lib/ansible/plugins/action/copy.py',
+    u'lib/ansible/plugins/connection/ssh.py',
+    u'lib/ansible/plugins/lookup/file.py',
+    u'lib/ansible/vars/manager.py',
+    u'docs/docsite/rst/user_guide/playbooks.rst',
+    u'test/integration/targets/copy/tasks/main.yml',
+    u'test/units/module_utils/test_basic.py',
+    u'changelogs/fragments/fix.yml',
+]
+
+ISSUE_TYPES = [u'Bug Report', u'Feature Idea', u'Documentation Report']
+
+DOCUMENTATION_URL = u'https://developer.github.com/v3'
+
+# shippable run status codes
+SHIPPABLE_SUCCESS = 30
+SHIPPABLE_FAILED = 80
+
+
+def to_iso(epoch):
+    return time.strftime(u'%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+def user(login):
+    return {u'login': login, u'id': int(hashlib.sha1(login.encode('utf-8')).hexdigest()[:8], 16),
+            u'type': u'User'}
+
+
+def sha(*parts):
+    return hashlib.sha1(u'/'.join([u'%s' % x for x in parts]).encode('utf-8')).hexdigest()
+
+
+class SyntheticRepo(object):
+    '''A repository whose issues are generated from a seed'''
+
+    def __init__(self, full_name, issues=1000, pullrequest_ratio=0.4, open_ratio=0.2,
+                 events=20, files=5, seed=0, now=None, years=5):
+        self.full_name = full_name
+        self.owner, self.name = full_name.split(u'/', 1)
+        self.seed = seed
+        self.events = events
+        self.files = files
+        self.now = int(now or time.time())
+
+        # number - 1 -> created, updated, is_pullrequest, state
+        self.created = []
+        self.updated = []
+        self.is_pullrequest = []
+        self.state = []
+
+        rng = self._rng(u'index')
+        start = self.now - years * 365 * 86400
+        step = float(self.now - 86400 - start) / max(issues, 1)
+        for idx in range(issues):
+            created = int(start + idx * step + rng.random() * step)
+            is_pr = rng.random() < pullrequest_ratio
+            if rng.random() < open_ratio:
+                state = u'open'
+            elif is_pr and rng.random() < 0.5:
+                state = u'merged'
+            else:
+                state = u'closed'
+            self.created.append(created)
+            self.updated.append(created + int(rng.random() * (self.now - created)))
+            self.is_pullrequest.append(is_pr)
+            self.state.append(state)
+
+        # number -> the writes made to it
+        self.changes = {}
+        self._next_id = 10 ** 9
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.created)
+
+    def __contains__(self, number):
+        return 0 < number <= len(self.created)
+
+    def _rng(self, *parts):
+        return random.Random(sha(self.seed, self.full_name, *parts))
+
+    def new_id(self):
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def touch(self, number, **kwargs):
+        '''Record a write to an issue'''
+        with self._lock:
+            change = self.changes.setdefault(number, {
+                u'events': [],
+                u'generated_until': self.updated[number - 1],
+            })
+            change.update(kwargs)
+            self.updated[number - 1] = max(int(time.time()), self.updated[number - 1] + 1)
+            return change
+
+    def get_state(self, number):
+        change = self.changes.get(number, {})
+        return change.get(u'state') or self.state[number - 1]
+
+    def api_url(self, base, *parts):
+        return u'/'.join([base, u'repos', self.full_name] + [u'%s' % x for x in parts])
+
+    def html_url(self, number):
+        kind = u'pull' if self.is_pullrequest[number - 1] else u'issues'
+        return u'https://github.com/%s/%s/%s' % (self.full_name, kind, number)
+
+    # generated parts
+
+    def _author(self, number):
+        return u'user%s' % self._rng(number, u'author').randint(1, 500)
+
+    def _labels(self, number):
+        change = self.changes.get(number, {})
+        if u'labels' in change:
+            return change[u'labels']
+        rng = self._rng(number, u'labels')
+        return sorted(rng.sample(LABELS, rng.randint(0, 4)))
+
+    def _assignees(self, number):
+        change = self.changes.get(number, {})
+        if u'assignees' in change:
+            return change[u'assignees']
+        rng = self._rng(number, u'assignees')
+        return [u'user%s' % rng.randint(1, 50) for x in range(rng.randint(0, 1))]
+
+    def _body(self, number):
+        rng = self._rng(number, u'body')
+        component = rng.choice(FILES)
+        return u'\n'.join([
+            u'##### SUMMARY',
+            u'Synthetic issue %s' % number,
+            u'',
+            u'##### ISSUE TYPE',
+            u'- %s' % rng.choice(ISSUE_TYPES),
+            u'',
+            u'##### COMPONENT NAME',
+            os.path.basename(component).replace(u'.py', u''),
+            u'',
+            u'##### ANSIBLE VERSION',
+            u'```',
+            u'ansible 2.%s.0' % rng.randint(7, 10),
+            u'```',
+        ])
+
+    def head_sha(self, number):
+        return sha(self.full_name, number, u'commit', 0)
+
+    def issue(self, base, number):
+        idx = number - 1
+        change = self.changes.get(number, {})
+        state = self.get_state(number)
+        login = self._author(number)
+        data = {
+            u'id': number,
+            u'node_id': u'MDU6SXNzdWU%s' % number,
+            u'number': number,
+            u'title': change.get(u'title') or u'synthetic issue %s' % number,
+            u'body': change.get(u'body') or self._body(number),
+            u'user': user(login),
+            u'state': u'open' if state == u'open' else u'closed',
+            u'locked': False,
+            u'labels': [self.label(base, x) for x in self._labels(number)],
+            u'assignees': [user(x) for x in self._assignees(number)],
+            u'assignee': None,
+            u'milestone': None,
+            u'comments': len([x for x in self.timeline(base, number) if x[u'event'] == u'commented']),
+            u'created_at': to_iso(self.created[idx]),
+            u'updated_at': to_iso(self.updated[idx]),
+            u'closed_at': None if state == u'open' else to_iso(self.updated[idx]),
+            u'url': self.api_url(base, u'issues', number),
+            u'html_url': self.html_url(number),
+            u'comments_url': self.api_url(base, u'issues', number, u'comments'),
+            u'events_url': self.api_url(base, u'issues', number, u'events'),
+            u'labels_url': self.api_url(base, u'issues', number, u'labels{/name}'),
+            u'repository_url': self.api_url(base),
+        }
+        if data[u'assignees']:
+            data[u'assignee'] = data[u'assignees'][0]
+        if self.is_pullrequest[idx]:
+            data[u'pull_request'] = {
+                u'url': self.api_url(base, u'pulls', number),
+                u'html_url': self.html_url(number),
+                u'diff_url': self.html_url(number) + u'.diff',
+                u'patch_url': self.html_url(number) + u'.patch',
+            }
+        return data
+
+    def label(self, base, name):
+        return {
+            u'name': name,
+            u'color': sha(name)[:6],
+            u'url': self.api_url(base, u'labels', quote(name)),
+            u'default': False,
+        }
+
+    def pull(self, base, number):
+        data = self.issue(base, number)
+        state = self.get_state(number)
+        files = self.pull_files(base, number)
+        repo = self.repository(base)
+        data.update({
+            u'url': self.api_url(base, u'pulls', number),
+            u'issue_url': self.api_url(base, u'issues', number),
+            u'commits_url': self.api_url(base, u'pulls', number, u'commits'),
+            u'statuses_url': self.api_url(base, u'statuses', self.head_sha(number)),
+            u'merged': state == u'merged',
+            u'merged_at': to_iso(self.updated[number - 1]) if state == u'merged' else None,
+            u'mergeable': True if state == u'open' else None,
+            u'mergeable_state': u'clean' if state == u'open' else u'unknown',
+            u'rebaseable': True,
+            u'draft': False,
+            u'head': {
+                u'label': u'%s:branch%s' % (self._author(number), number),
+                u'ref': u'branch%s' % number,
+                u'sha': self.head_sha(number),
+                u'user': user(self._author(number)),
+                u'repo': repo,
+            },
+            u'base': {
+                u'label': u'%s:devel' % self.owner,
+                u'ref': u'devel',
+                u'sha': sha(self.full_name, u'devel'),
+                u'user': user(self.owner),
+                u'repo': repo,
+            },
+            u'commits': len(self.pull_commits(base, number)),
+            u'additions': sum([x[u'additions'] for x in files]),
+            u'deletions': sum([x[u'deletions'] for x in files]),
+            u'changed_files': len(files),
+            u'review_comments': 0,
+            u'maintainer_can_modify': True,
+        })
+        return data
+
+    def repository(self, base):
+        return {
+            u'id': int(sha(self.full_name)[:8], 16),
+            u'name': self.name,
+            u'full_name': self.full_name,
+            u'owner': user(self.owner),
+            u'private': False,
+            u'url': self.api_url(base),
+            u'html_url': u'https://github.com/%s' % self.full_name,
+            u'clone_url': u'https://github.com/%s.git' % self.full_name,
+            u'default_branch': u'devel',
+            u'open_issues_count': self.state.count(u'open'),
+        }
+
+    def timeline(self, base, number):
+        '''REST timeline events, generated ones first and then the writes'''
+        idx = number - 1
+        rng = self._rng(number, u'timeline')
+        created = self.created[idx]
+        count = rng.randint(0, 2 * self.events)
+        change = self.changes.get(number, {})
+        # the generated history ends before the first write
+        span = max(change.get(u'generated_until', self.updated[idx]) - created, count + 1)
+
+        events = []
+        labels = self._rng(number, u'labels')
+        labels = sorted(labels.sample(LABELS, labels.randint(0, 4)))
+        kinds = [u'labeled'] * len(labels) + \
+            [rng.choice([u'commented', u'commented', u'commented', u'subscribed',
+                         u'mentioned', u'assigned', u'cross-referenced'])
+             for x in range(count)]
+        for eidx, kind in enumerate(kinds):
+            ts = to_iso(created + int(span * (eidx + 1) / float(len(kinds) + 1)))
+            actor = user(u'user%s' % rng.randint(1, 500))
+            event_id = number * 100000 + eidx
+            event = {
+                u'id': event_id,
+                u'node_id': u'EV_%s' % event_id,
+                u'event': kind,
+                u'actor': actor,
+                u'created_at': ts,
+            }
+            if kind == u'labeled':
+                event[u'label'] = {u'name': labels[eidx], u'color': sha(labels[eidx])[:6]}
+            elif kind == u'commented':
+                event[u'node_id'] = u'IC_%s' % event_id
+                event[u'user'] = actor
+                event[u'body'] = u'comment %s on %s' % (eidx, number)
+                event[u'updated_at'] = ts
+                event[u'html_url'] = u'%s#issuecomment-%s' % (self.html_url(number), event_id)
+                event[u'url'] = self.api_url(base, u'issues', u'comments', event_id)
+                event[u'author_association'] = u'CONTRIBUTOR'
+            elif kind == u'assigned':
+                event[u'assignee'] = user(u'user%s' % rng.randint(1, 50))
+            elif kind == u'cross-referenced':
+                other = rng.randint(1, len(self))
+                event[u'source'] = {u'type': u'issue', u'issue': {
+                    u'number': other,
+                    u'title': u'synthetic issue %s' % other,
+                    u'html_url': self.html_url(other),
+                    u'state': u'open' if self.state[other - 1] == u'open' else u'closed',
+                    u'repository': {u'full_name': self.full_name},
+                }}
+            events.append(event)
+
+        if self.is_pullrequest[idx]:
+            for commit in self.pull_commits(base, number):
+                events.append({
+                    u'event': u'committed',
+                    u'sha': commit[u'sha'],
+                    u'node_id': u'C_%s' % commit[u'sha'],
+                    u'author': commit[u'commit'][u'author'],
+                    u'committer': commit[u'commit'][u'committer'],
+                    u'message': commit[u'commit'][u'message'],
+                })
+            for review in self.reviews(base, number):
+                event = dict(review)
+                event[u'event'] = u'reviewed'
+                event[u'state'] = review[u'state'].lower()
+                events.append(event)
+
+        events += change.get(u'events', [])
+        deleted = change.get(u'deleted_comments')
+        if deleted:
+            events = [x for x in events if x.get(u'id') not in deleted]
+        return events
+
+    def comments(self, base, number):
+        comments = []
+        for event in self.timeline(base, number):
+            if event[u'event'] != u'commented':
+                continue
+            comment = dict((k, v) for k, v in event.items() if k not in (u'event', u'actor'))
+            comment[u'issue_url'] = self.api_url(base, u'issues', number)
+            comments.append(comment)
+        return comments
+
+    def events_list(self, base, number):
+        '''The legacy issue events endpoint, the timeline without comments'''
+        return [x for x in self.timeline(base, number)
+                if x[u'event'] not in (u'commented', u'committed', u'reviewed')]
+
+    def pull_files(self, base, number):
+        rng = self._rng(number, u'files')
+        paths = rng.sample(FILES, min(len(FILES), rng.randint(1, max(1, self.files))))
+        files = []
+        for path in sorted(paths):
+            additions = rng.randint(0, 200)
+            deletions = rng.randint(0, 100)
+            files.append({
+                u'sha': sha(path, number),
+                u'filename': path,
+                u'status': u'modified',
+                u'additions': additions,
+                u'deletions': deletions,
+                u'changes': additions + deletions,
+                u'patch': u'',
+            })
+        return files
+
+    def pull_commits(self, base, number):
+        rng = self._rng(number, u'commits')
+        count = rng.randint(1, 3)
+        author = self._author(number)
+        created = self.created[number - 1]
+        commits = []
+        parent = sha(self.full_name, u'devel')
+        for cidx in reversed(range(count)):
+            commit_sha = sha(self.full_name, number, u'commit', cidx)
+            date = to_iso(created + (count - cidx) * 60)
+            actor = {u'name': author, u'email': u'%s@example.com' % author, u'date': date}
+            commits.append({
+                u'sha': commit_sha,
+                u'node_id': u'C_%s' % commit_sha,
+                u'url': self.api_url(base, u'commits', commit_sha),
+                u'commit': {
+                    u'message': u'commit %s of #%s' % (count - cidx, number),
+                    u'author': actor,
+                    u'committer': actor,
+                },
+                u'author': user(author),
+                u'committer': user(author),
+                u'parents': [{u'sha': parent}],
+            })
+            parent = commit_sha
+        return commits
+
+    def reviews(self, base, number):
+        rng = self._rng(number, u'reviews')
+        reviews = []
+        for ridx in range(rng.randint(0, 2)):
+            review_id = number * 100000 + 90000 + ridx
+            reviews.append({
+                u'id': review_id,
+                u'node_id': u'PRR_%s' % review_id,
+                u'user': user(u'user%s' % rng.randint(1, 50)),
+                u'body': u'',
+                u'state': rng.choice([u'APPROVED', u'COMMENTED', u'CHANGES_REQUESTED']),
+                u'submitted_at': to_iso(self.created[number - 1] + 3600 * (ridx + 1)),
+                u'commit_id': self.head_sha(number),
+            })
+        return reviews
+
+    def run_number(self, number):
+        return number
+
+    def run_failed(self, number):
+        return self._rng(number, u'ci').random() < 0.2
+
+    def statuses(self, base, number):
+        failed = self.run_failed(number)
+        ts = to_iso(self.created[number - 1] + 1800)
+        return [{
+            u'context': u'Shippable',
+            u'state': u'failure' if failed else u'success',
+            u'target_url': u'https://app.shippable.com/github/%s/runs/%s/summary' % (
+                self.full_name, self.run_number(number)),
+            u'description': u'Run %s status is %s.' % (
+                self.run_number(number), u'FAILED' if failed else u'SUCCESS'),
+            u'created_at': ts,
+            u'updated_at': ts,
+            u'creator': user(u'shippable'),
+            u'id': number,
+        }]
+
+    def pull_for_sha(self, commit_sha):
+        '''The pullrequest with this head, a scan of the open ones'''
+        for idx, is_pr in enumerate(self.is_pullrequest):
+            if is_pr and self.head_sha(idx + 1) == commit_sha:
+                return idx + 1
+        return None
+
+
+class Simulator(object):
+    '''State shared by the request handlers'''
+
+    def __init__(self, repos, fixtures=None, latency=0.0, jitter=0.5,
+                 ratelimit=5000, conditional=True, base_url=None):
+        self.repos = dict((x.full_name, x) for x in repos)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.ratelimit = ratelimit
+        self.conditional = conditional
+        self.base_url = base_url
+
+        # token -> resource -> [remaining, reset]
+        self.budgets = {}
+        self.writes = []
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def delay(self):
+        if self.latency:
+            with self._lock:
+                factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0, self.latency * factor))
+
+    def take(self, token, resource, cost=1):
+        '''Charge the token, the rate limit headers and whether it was allowed'''
+        now = int(time.time())
+        with self._lock:
+            budget = self.budgets.setdefault(token, {})
+            entry = budget.get(resource)
+            if entry is None or entry[1] <= now:
+                entry = budget[resource] = [self.ratelimit, now + 3600]
+            allowed = entry[0] >= cost
+            if allowed:
+                entry[0] -= cost
+            headers = {
+                u'X-RateLimit-Limit': u'%s' % self.ratelimit,
+                u'X-RateLimit-Remaining': u'%s' % entry[0],
+                u'X-RateLimit-Reset': u'%s' % entry[1],
+                u'X-RateLimit-Resource': resource,
+            }
+        return allowed, headers
+
+    def peek(self, token, resource):
+        now = int(time.time())
+        with self._lock:
+            entry = self.budgets.get(token, {}).get(resource)
+            if entry is None or entry[1] <= now:
+                return self.ratelimit, now + 3600
+            return entry[0], entry[1]
+
+    def fixture(self, path):
+        if not self.fixtures:
+            return None
+        fn = os.path.join(self.fixtures, path.strip(u'/') + u'.json')
+        if not os.path.isfile(fn):
+            return None
+        with io.open(fn, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def paginate(items, query, base, path):
+    '''Slice a listing like github and build its Link header'''
+    per_page = min(int(query.get(u'per_page', 30)), 100)
+    page = max(int(query.get(u'page', 1)), 1)
+    last = max(1, (len(items) + per_page - 1) // per_page)
+
+    def link(number, rel):
+        params = dict(query)
+        params[u'page'] = number
+        return u'<%s%s?%s>; rel="%s"' % (base, path, urlencode(sorted(params.items())), rel)
+
+    links = []
+    if page < last:
+        links.append(link(page + 1, u'next'))
+        links.append(link(last, u'last'))
+    if page > 1:
+        links.append(link(1, u'first'))
+        links.append(link(page - 1, u'prev'))
+
+    headers = {}
+    if links:
+        headers[u'Link'] = u', '.join(links)
+    return items[(page - 1) * per_page:page * per_page], headers
+
+
+class GraphQL(object):
+    '''Answers the few query shapes the GithubGraphQLClient sends'''
+
+    DETAILS = re.compile(r'n(\d+): issueOrPullRequest\(number: (\d+)\)')
+    PAGE = re.compile(r'timelineItems\(first: (\d+)')
+    REPOSITORY = re.compile(r'repository\(owner:\s*"([^"]+)", name:\s*"([^"]+)"\)')
+    CONNECTION = re.compile(r'\{\s*(issues|pullRequests)\(([^)]*)\)\s*\{\s*pageInfo')
+    SINGLE = re.compile(r'\{\s*(issue|pullRequest)\(number: (\d+)\)')
+
+    TYPENAMES = {
+        u'commented': u'IssueComment',
+        u'labeled': u'LabeledEvent',
+        u'unlabeled': u'UnlabeledEvent',
+        u'assigned': u'AssignedEvent',
+        u'unassigned': u'UnassignedEvent',
+        u'cross-referenced': u'CrossReferencedEvent',
+        u'closed': u'ClosedEvent',
+        u'reopened': u'ReopenedEvent',
+        u'mentioned': u'MentionedEvent',
+        u'subscribed': u'SubscribedEvent',
+        u'merged': u'MergedEvent',
+        u'reviewed': u'PullRequestReview',
+    }
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def query(self, query):
+        '''The response data and the cost of a query'''
+        match = self.REPOSITORY.search(query)
+        if not match:
+            return {u'errors': [{u'message': u'unsupported query'}]}, 1
+        repo = self.sim.repos.get(u'%s/%s' % match.groups())
+        if repo is None:
+            return {u'data': {u'repository': None},
+                    u'errors': [{u'message': u'Could not resolve to a Repository'}]}, 1
+
+        if self.DETAILS.search(query):
+            return self.details(repo, query)
+        match = self.CONNECTION.search(query)
+        if match:
+            return self.connection(repo, match.group(1), match.group(2)), 1
+        match = self.SINGLE.search(query)
+        if match:
+            otype, number = match.group(1), int(match.group(2))
+            node = None
+            if number in repo and repo.is_pullrequest[number - 1] == (otype == u'pullRequest'):
+                node = self.summary(repo, number)
+            return {u'data': {u'repository': {otype: node}}}, 1
+        if u'blame(' in query:
+            return {u'data': {u'repository': {u'ref': {u'target': {u'blame': {u'ranges': []}}}}}}, 1
+        return {u'errors': [{u'message': u'unsupported query'}]}, 1
+
+    def summary(self, repo, number):
+        idx = number - 1
+        return {
+            u'id': u'MDU6SXNzdWU%s' % number,
+            u'url': repo.html_url(number),
+            u'number': number,
+            u'state': repo.get_state(number).upper(),
+            u'createdAt': to_iso(repo.created[idx]),
+            u'updatedAt': to_iso(repo.updated[idx]),
+            u'repository': {u'nameWithOwner': repo.full_name},
+        }
+
+    def connection(self, repo, otype, params):
+        states = re.search(r'states:\s*(\w+)', params)
+        first = re.search(r'first:\s*(\d+)', params)
+        last = re.search(r'last:\s*(\d+)', params)
+        after = re.search(r'after:\s*"([^"]*)"', params)
+
+        is_pr = otype == u'pullRequests'
+        numbers = [x + 1 for x in range(len(repo)) if repo.is_pullrequest[x] == is_pr]
+        if states:
+            numbers = [x for x in numbers if repo.get_state(x).upper() == states.group(1)]
+        if u'UPDATED_AT' in params:
+            reverse = u'DESC' in params
+            numbers = sorted(numbers, key=lambda x: repo.updated[x - 1], reverse=reverse)
+
+        start = 0
+        if after:
+            start = int(base64.b64decode(after.group(1)).decode('ascii')) + 1
+        if last:
+            count = int(last.group(1))
+            window = numbers[max(0, len(numbers) - count):]
+            start = len(numbers) - len(window)
+        else:
+            count = int(first.group(1)) if first else 100
+            window = numbers[start:start + count]
+
+        def cursor(pos):
+            return base64.b64encode((u'%s' % pos).encode('ascii')).decode('ascii')
+
+        return {u'data': {u'repository': {otype: {
+            u'pageInfo': {
+                u'startCursor': cursor(start) if window else None,
+                u'endCursor': cursor(start + len(window) - 1) if window else None,
+                u'hasNextPage': start + len(window) < len(numbers),
+                u'hasPreviousPage': start > 0,
+            },
+            u'edges': [{u'node': self.summary(repo, x)} for x in window],
+        }}}}
+
+    def details(self, repo, query):
+        page = int((self.PAGE.search(query) or [None, 100])[1])
+        base = self.sim.base_url
+        data = {}
+        errors = []
+        for alias, number in self.DETAILS.findall(query):
+            number = int(number)
+            if number not in repo:
+                data[u'n%s' % alias] = None
+                errors.append({u'message': u'Could not resolve to an issue or pull request '
+                                           u'with the number of %s.' % number,
+                               u'path': [u'repository', u'n%s' % alias]})
+                continue
+            data[u'n%s' % alias] = self.detail(repo, base, number, page)
+        response = {u'data': {u'repository': data}}
+        if errors:
+            response[u'errors'] = errors
+        # github charges about one point per hundred requested nodes
+        return response, max(1, len(data) * page // 100)
+
+    def detail(self, repo, base, number, page):
+        issue = repo.issue(base, number)
+        node = {
+            u'number': number,
+            u'updatedAt': issue[u'updated_at'],
+            u'labels': {u'nodes': [{u'name': x[u'name']} for x in issue[u'labels']]},
+            u'assignees': {u'nodes': [{u'login': x[u'login']} for x in issue[u'assignees']]},
+        }
+        items = [self.timeline_item(x) for x in repo.timeline(base, number)]
+        items = [x for x in items if x is not None]
+        timeline = self.page(items, page)
+        if not repo.is_pullrequest[number - 1]:
+            node[u'issueTimeline'] = timeline
+            return node
+
+        node[u'pullTimeline'] = timeline
+        node[u'mergeable'] = u'MERGEABLE' if repo.get_state(number) == u'open' else u'UNKNOWN'
+        node[u'reviews'] = self.page([self.review(x) for x in repo.reviews(base, number)], page)
+        node[u'pullCommits'] = self.page(
+            [{u'commit': self.commit(x)} for x in repo.pull_commits(base, number)], page)
+        node[u'files'] = self.page([{
+            u'path': x[u'filename'],
+            u'additions': x[u'additions'],
+            u'deletions': x[u'deletions'],
+            u'changeType': u'MODIFIED',
+        } for x in repo.pull_files(base, number)], page)
+        node[u'headCommit'] = {u'nodes': [{u'commit': {
+            u'oid': repo.head_sha(number),
+            u'status': {u'contexts': [{
+                u'context': x[u'context'],
+                u'state': x[u'state'].upper(),
+                u'targetUrl': x[u'target_url'],
+                u'description': x[u'description'],
+                u'createdAt': x[u'created_at'],
+                u'creator': x[u'creator'],
+            } for x in repo.statuses(base, number)]},
+        }}]}
+        return node
+
+    def page(self, nodes, size):
+        return {u'pageInfo': {u'hasNextPage': len(nodes) > size}, u'nodes': nodes[:size]}
+
+    def timeline_item(self, event):
+        typename = self.TYPENAMES.get(event[u'event'])
+        if typename is None:
+            return None
+        if typename == u'PullRequestReview':
+            item = self.review(event)
+            item[u'__typename'] = typename
+            return item
+
+        item = {
+            u'__typename': typename,
+            u'id': event[u'node_id'],
+            u'actor': {u'login': event[u'actor'][u'login']},
+            u'createdAt': event[u'created_at'],
+        }
+        if typename == u'IssueComment':
+            item[u'databaseId'] = event[u'id']
+            item[u'author'] = item.pop(u'actor')
+            item[u'body'] = event[u'body']
+            item[u'updatedAt'] = event[u'updated_at']
+            item[u'url'] = event[u'html_url']
+        elif typename in (u'LabeledEvent', u'UnlabeledEvent'):
+            item[u'label'] = {u'name': event[u'label'][u'name']}
+        elif typename in (u'AssignedEvent', u'UnassignedEvent'):
+            item[u'assignee'] = {u'login': event[u'assignee'][u'login']}
+        elif typename == u'CrossReferencedEvent':
+            source = event[u'source'][u'issue']
+            item[u'source'] = {
+                u'number': source[u'number'],
+                u'title': source[u'title'],
+                u'url': source[u'html_url'],
+                u'state': source[u'state'].upper(),
+                u'repository': {u'nameWithOwner': source[u'repository'][u'full_name']},
+            }
+        return item
+
+    def review(self, review):
+        return {
+            u'id': review[u'node_id'],
+            u'databaseId': review[u'id'],
+            u'author': {u'login': review[u'user'][u'login']},
+            u'state': review[u'state'].upper(),
+            u'body': review[u'body'],
+            u'submittedAt': review[u'submitted_at'],
+            u'commit': {u'oid': review[u'commit_id']},
+        }
+
+    def commit(self, commit):
+        def actor(data, login):
+            return {u'name': data[u'name'], u'email': data[u'email'], u'date': data[u'date'],
+                    u'user': {u'login': login}}
+        return {
+            u'oid': commit[u'sha'],
+            u'message': commit[u'commit'][u'message'],
+            u'author': actor(commit[u'commit'][u'author'], commit[u'author'][u'login']),
+            u'committer': actor(commit[u'commit'][u'committer'], commit[u'committer'][u'login']),
+            u'parents': {u'totalCount': len(commit[u'parents']),
+                         u'nodes': [{u'oid': x[u'sha']} for x in commit[u'parents']]},
+        }
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''Routes the requests to the github, graphql and shippable emulation'''
+
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = [
+        (u'GET', r'/$', u'root'),
+        (u'GET', r'/rate_limit$', u'rate_limit'),
+        (u'GET', r'/user$', u'authenticated_user'),
+        (u'GET', r'/users/(?P<login>[^/]+)$', u'get_user'),
+        (u'GET', r'/orgs/(?P<org>[^/]+)$', u'org'),
+        (u'GET', r'/orgs/(?P<org>[^/]+)/(members|public_members)$', u'members'),
+        (u'GET', r'/orgs/(?P<org>[^/]+)/teams$', u'teams'),
+        (u'GET', r'/teams/(?P<team>\d+)/members$', u'members'),
+        (u'POST', r'/graphql$', u'graphql'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)$', u'repository'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/labels$', u'labels'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/assignees$', u'assignees'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/assignees/(?P<login>[^/]+)$', u'is_assignee'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/issues$', u'list_issues'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/pulls$', u'list_pulls'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)$', u'get_issue'),
+        (u'PATCH', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)$', u'edit_issue'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/comments$', u'list_comments'),
+        (u'POST', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/comments$', u'add_comment'),
+        (u'DELETE', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/comments/(?P<comment>\d+)$', u'delete_comment'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/timeline$', u'timeline'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/events$', u'events'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/reactions$', u'reactions'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/labels$', u'issue_labels'),
+        (u'POST', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/labels$', u'add_labels'),
+        (u'PUT', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/labels$', u'set_labels'),
+        (u'DELETE', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/labels/(?P<label>[^/]+)$',
+         u'remove_label'),
+        (u'POST', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/assignees$', u'add_assignees'),
+        (u'DELETE', r'/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)/assignees$',
+         u'remove_assignees'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)$', u'get_pull'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)/files$', u'pull_files'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)/commits$', u'pull_commits'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)/reviews$', u'reviews'),
+        (u'PUT', r'/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)/merge$', u'merge'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/commits/(?P<sha>\w+)$', u'commit'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/commits/(?P<sha>\w+)/status$', u'combined_status'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/(commits|statuses)/(?P<sha>\w+)/statuses$', u'statuses'),
+        (u'GET', r'/repos/(?P<repo>[^/]+/[^/]+)/statuses/(?P<sha>\w+)$', u'statuses'),
+        (u'GET', r'/runs$', u'runs'),
+        (u'GET', r'/runs/(?P<run>\w+)$', u'run'),
+        (u'POST', r'/runs/(?P<run>\w+)/cancel$', u'cancel_run'),
+        (u'POST', r'/projects/(?P<project>\w+)/newBuild$', u'new_build'),
+        (u'GET', r'/jobs$', u'jobs'),
+        (u'GET', r'/jobs/(?P<job>\w+)/jobTestReports$', u'job_test_reports'),
+    ]
+    ROUTES = [(m, re.compile(r), h) for m, r, h in ROUTES]
+
+    @property
+    def sim(self):
+        return self.server.sim
+
+    def log_message(self, format, *args):
+        logging.debug(u'%s - %s' % (self.address_string(), format % args))
+
+    def do_GET(self):
+        self.dispatch(u'GET')
+
+    def do_POST(self):
+        self.dispatch(u'POST')
+
+    def do_PATCH(self):
+        self.dispatch(u'PATCH')
+
+    def do_PUT(self):
+        self.dispatch(u'PUT')
+
+    def do_DELETE(self):
+        self.dispatch(u'DELETE')
+
+    def token(self):
+        auth = self.headers.get('Authorization') or u''
+        parts = auth.split(None, 1)
+        if len(parts) == 2 and parts[0].lower() in (u'token', u'bearer'):
+            return parts[1]
+        if len(parts) == 2 and parts[0].lower() == u'apitoken':
+            return None
+        return u'anonymous'
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        raw = self.rfile.read(length)
+        try:
+            return json.loads(raw.decode('utf-8'))
+        except ValueError:
+            return None
+
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        path = url.path.rstrip(u'/') or u'/'
+        query = dict((k, v[-1]) for k, v in parse_qs(url.query).items())
+        self.body = self.read_body()
+        self.query = query
+        self.route = path
+        self.base = self.sim.base_url
+        self.paginated = False
+
+        self.sim.delay()
+        self.sim.counts[method] += 1
+
+        # shippable authenticates with an apiToken and has no rate limit headers
+        token = self.token()
+        resource = u'graphql' if path == u'/graphql' else u'core'
+        headers = {}
+
+        handler = None
+        kwargs = {}
+        for rmethod, regex, name in self.ROUTES:
+            match = regex.match(path)
+            if match and rmethod == method:
+                handler = getattr(self, u'handle_' + name)
+                kwargs = dict((k, unquote(v)) for k, v in match.groupdict().items())
+                break
+
+        status, data = 404, {u'message': u'Not Found', u'documentation_url': DOCUMENTATION_URL}
+        if method == u'GET':
+            fixture = self.sim.fixture(path)
+            if fixture is not None:
+                handler = lambda: (200, fixture)
+                kwargs = {}
+
+        cost = 1
+        if handler is not None:
+            try:
+                result = handler(**kwargs)
+            except (KeyError, ValueError):
+                result = (404, data)
+            status, data = result[0], result[1]
+            if len(result) > 2:
+                headers.update(result[2])
+            if len(result) > 3:
+                cost = result[3]
+
+        # list responses are paginated
+        if status == 200 and method == u'GET' and isinstance(data, list) and \
+                not self.paginated and not path.startswith((u'/runs', u'/jobs')):
+            data, links = paginate(data, query, self.base, path)
+            headers.update(links)
+
+        body = b''
+        if status != 204:
+            body = json.dumps(data, sort_keys=True).encode('utf-8')
+        etag = u'"%s"' % hashlib.sha1(body).hexdigest()
+
+        # a 304 does not count against the rate limit
+        not_modified = method == u'GET' and self.sim.conditional and status == 200 and \
+            self.headers.get('If-None-Match') == etag
+        if token is not None and path != u'/rate_limit':
+            if not_modified:
+                remaining, reset = self.sim.peek(token, resource)
+                allowed, limits = True, {
+                    u'X-RateLimit-Limit': u'%s' % self.sim.ratelimit,
+                    u'X-RateLimit-Remaining': u'%s' % remaining,
+                    u'X-RateLimit-Reset': u'%s' % reset,
+                    u'X-RateLimit-Resource': resource,
+                }
+            else:
+                allowed, limits = self.sim.take(token, resource, cost)
+            headers.update(limits)
+            if not allowed:
+                status, not_modified = 403, False
+                body = json.dumps({
+                    u'message': u'API rate limit exceeded',
+                    u'documentation_url': DOCUMENTATION_URL + u'/#rate-limiting',
+                }).encode('utf-8')
+
+        if not_modified:
+            self.sim.counts[u'not_modified'] += 1
+            self.send_response(304)
+            body = b''
+        else:
+            self.send_response(status)
+        if status == 200 and method == u'GET':
+            headers[u'ETag'] = etag
+        headers[u'Content-Type'] = u'application/json; charset=utf-8'
+        headers[u'Content-Length'] = u'%s' % len(body)
+        for k, v in sorted(headers.items()):
+            self.send_header(k, v)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    # helpers
+
+    def get_repo(self, name):
+        return self.sim.repos[name]
+
+    def get_number(self, repo, number):
+        number = int(number)
+        if number not in repo:
+            raise KeyError(number)
+        return number
+
+    def write(self, repo, number, action, **kwargs):
+        self.sim.writes.append((repo.full_name, number, action, kwargs))
+        self.sim.counts[u'writes'] += 1
+
+    def new_event(self, repo, number, kind, **kwargs):
+        event_id = repo.new_id()
+        event = {
+            u'id': event_id,
+            u'node_id': u'EV_%s' % event_id,
+            u'event': kind,
+            u'actor': user(u'ansibot'),
+            u'created_at': to_iso(time.time()),
+        }
+        event.update(kwargs)
+        repo.touch(number)[u'events'].append(event)
+        return event
+
+    # github
+
+    def handle_root(self):
+        return 200, {u'current_user_url': self.base + u'/user'}
+
+    def handle_rate_limit(self):
+        resources = {}
+        for resource in (u'core', u'graphql', u'search'):
+            remaining, reset = self.sim.peek(self.token(), resource)
+            resources[resource] = {u'limit': self.sim.ratelimit, u'remaining': remaining,
+                                   u'reset': reset}
+        return 200, {u'resources': resources, u'rate': resources[u'core']}
+
+    def handle_authenticated_user(self):
+        return 200, user(u'ansibot')
+
+    def handle_get_user(self, login):
+        return 200, user(login)
+
+    def handle_org(self, org):
+        return 200, {u'login': org, u'url': u'%s/orgs/%s' % (self.base, org)}
+
+    def handle_members(self, org=None, team=None):
+        return 200, [user(u'user%s' % x) for x in range(1, 21)]
+
+    def handle_teams(self, org):
+        return 200, [{u'id': 1, u'name': u'ansible-core', u'slug': u'ansible-core',
+                      u'url': u'%s/teams/1' % self.base}]
+
+    def handle_graphql(self):
+        query = (self.body or {}).get(u'query') or u''
+        data, cost = GraphQL(self.sim).query(query)
+        return 200, data, {}, cost
+
+    def handle_repository(self, repo):
+        return 200, self.get_repo(repo).repository(self.base)
+
+    def handle_labels(self, repo):
+        return 200, [self.get_repo(repo).label(self.base, x) for x in LABELS]
+
+    def handle_assignees(self, repo):
+        return 200, [user(u'user%s' % x) for x in range(1, 51)]
+
+    def handle_is_assignee(self, repo, login):
+        if login in [u'user%s' % x for x in range(1, 51)]:
+            return 204, u''
+        return 404, {u'message': u'Not Found'}
+
+    def list_numbers(self, repo, pullrequests):
+        state = self.query.get(u'state', u'open')
+        since = self.query.get(u'since')
+        numbers = []
+        for idx in range(len(repo)):
+            if pullrequests and not repo.is_pullrequest[idx]:
+                continue
+            number = idx + 1
+            issue_state = u'open' if repo.get_state(number) == u'open' else u'closed'
+            if state != u'all' and issue_state != state:
+                continue
+            if since and to_iso(repo.updated[idx]) < since:
+                continue
+            numbers.append(number)
+
+        if self.query.get(u'sort') == u'updated':
+            numbers.sort(key=lambda x: repo.updated[x - 1])
+        if self.query.get(u'direction', u'desc') == u'desc':
+            numbers.reverse()
+        return numbers
+
+    def listing(self, repo, pullrequests, render):
+        '''Only render the page that is sent'''
+        numbers = self.list_numbers(repo, pullrequests)
+        page, links = paginate(numbers, self.query, self.base, self.route)
+        self.paginated = True
+        return 200, [render(self.base, x) for x in page], links
+
+    def handle_list_issues(self, repo):
+        repo = self.get_repo(repo)
+        return self.listing(repo, False, repo.issue)
+
+    def handle_list_pulls(self, repo):
+        repo = self.get_repo(repo)
+        return self.listing(repo, True, repo.pull)
+
+    def handle_get_issue(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.issue(self.base, self.get_number(repo, number))
+
+    def handle_edit_issue(self, repo, number):
+        repo = self.get_repo(repo)
+        number = self.get_number(repo, number)
+        body = self.body or {}
+        self.write(repo, number, u'edit', **body)
+
+        state = body.get(u'state')
+        if state and state != (u'open' if repo.get_state(number) == u'open' else u'closed'):
+            self.new_event(repo, number, u'closed' if state == u'closed' else u'reopened')
+            repo.touch(number, state=state)
+        if u'title' in body:
+            repo.touch(number, title=body[u'title'])
+        if u'body' in body:
+            repo.touch(number, body=body[u'body'])
+        if u'labels' in body:
+            self.set_labels(repo, number, body[u'labels'])
+        if u'assignees' in body:
+            repo.touch(number, assignees=list(body[u'assignees']))
+        return 200, repo.issue(self.base, number)
+
+    def handle_list_comments(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.comments(self.base, self.get_number(repo, number))
+
+    def handle_add_comment(self, repo, number):
+        repo = self.get_repo(repo)
+        number = self.get_number(repo, number)
+        body = (self.body or {}).get(u'body') or u''
+        self.write(repo, number, u'comment', body=body)
+        event = self.new_event(repo, number, u'commented', body=body, user=user(u'ansibot'))
+        event[u'node_id'] = u'IC_%s' % event[u'id']
+        event[u'updated_at'] = event[u'created_at']
+        event[u'html_url'] = u'%s#issuecomment-%s' % (repo.html_url(number), event[u'id'])
+        event[u'url'] = repo.api_url(self.base, u'issues', u'comments', event[u'id'])
+        comment = dict((k, v) for k, v in event.items() if k not in (u'event', u'actor'))
+        return 201, comment
+
+    def handle_delete_comment(self, repo, comment):
+        repo = self.get_repo(repo)
+        comment = int(comment)
+        number = comment // 100000 if comment < 10 ** 9 else None
+        if number is None:
+            for key, change in repo.changes.items():
+                if comment in [x[u'id'] for x in change[u'events']]:
+                    number = key
+        if number is None or number not in repo:
+            return 404, {u'message': u'Not Found'}
+        self.write(repo, number, u'delete_comment', id=comment)
+        change = repo.touch(number)
+        change.setdefault(u'deleted_comments', set()).add(comment)
+        return 204, u''
+
+    def handle_timeline(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.timeline(self.base, self.get_number(repo, number))
+
+    def handle_events(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.events_list(self.base, self.get_number(repo, number))
+
+    def handle_reactions(self, repo, number):
+        self.get_number(self.get_repo(repo), number)
+        return 200, []
+
+    def handle_issue_labels(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.issue(self.base, self.get_number(repo, number))[u'labels']
+
+    def set_labels(self, repo, number, names):
+        current = repo._labels(number)
+        for name in sorted(set(names) - set(current)):
+            self.new_event(repo, number, u'labeled', label={u'name': name, u'color': sha(name)[:6]})
+        for name in sorted(set(current) - set(names)):
+            self.new_event(repo, number, u'unlabeled', label={u'name': name, u'color': sha(name)[:6]})
+        repo.touch(number, labels=sorted(set(names)))
+
+    def _label_names(self):
+        body = self.body
+        if isinstance(body, dict):
+            body = body.get(u'labels') or []
+        return [x[u'name'] if isinstance(x, dict) else x for x in (body or [])]
+
+    def handle_add_labels(self, repo, number):
+        repo = self.get_repo(repo)
+        number = self.get_number(repo, number)
+        names = self._label_names()
+        self.write(repo, number, u'add_labels', labels=names)
+        self.set_labels(repo, number, repo._labels(number) + names)
+        return 200, repo.issue(self.base, number)[u'labels']
+
+    def handle_set_labels(self, repo, number):
+        repo = self.get_repo(repo)
+        number = self.get_number(repo, number)
+        names = self._label_names()
+        self.write(repo, number, u'set_labels', labels=names)
+        self.set_labels(repo, number, names)
+        return 200, repo.issue(self.base, number)[u'labels']
+
+    def handle_remove_label(self, repo, number, label):
+        repo = self.get_repo(repo)
+        number = self.get_number(repo, number)
+        if label not in repo._labels(number):
+            return 404, {u'message': u'Label does not exist'}
+        self.write(repo, number, u'remove_label', label=label)
+        self.set_labels(repo, number, [x for x in repo._labels(number) if x != label])
+        return 200, repo.issue(self.base, number)[u'labels']
+
+    def handle_add_assignees(self, repo, number):
+        repo = self.get_repo(repo)
+        number = self.get_number(repo, number)
+        logins = (self.body or {}).get(u'assignees') or []
+        self.write(repo, number, u'add_assignees', assignees=logins)
+        current = repo._assignees(number)
+        for login in logins:
+            if login not in current:
+                self.new_event(repo, number, u'assigned', assignee=user(login))
+        repo.touch(number, assignees=current + [x for x in logins if x not in current])
+        return 201, repo.issue(self.base, number)
+
+    def handle_remove_assignees(self, repo, number):
+        repo = self.get_repo(repo)
+        number = self.get_number(repo, number)
+        logins = (self.body or {}).get(u'assignees') or []
+        self.write(repo, number, u'remove_assignees', assignees=logins)
+        current = repo._assignees(number)
+        for login in logins:
+            if login in current:
+                self.new_event(repo, number, u'unassigned', assignee=user(login))
+        repo.touch(number, assignees=[x for x in current if x not in logins])
+        return 200, repo.issue(self.base, number)
+
+    def get_pullrequest(self, repo, number):
+        number = self.get_number(repo, number)
+        if not repo.is_pullrequest[number - 1]:
+            raise KeyError(number)
+        return number
+
+    def handle_get_pull(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.pull(self.base, self.get_pullrequest(repo, number))
+
+    def handle_pull_files(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.pull_files(self.base, self.get_pullrequest(repo, number))
+
+    def handle_pull_commits(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.pull_commits(self.base, self.get_pullrequest(repo, number))
+
+    def handle_reviews(self, repo, number):
+        repo = self.get_repo(repo)
+        return 200, repo.reviews(self.base, self.get_pullrequest(repo, number))
+
+    def handle_merge(self, repo, number):
+        repo = self.get_repo(repo)
+        number = self.get_pullrequest(repo, number)
+        if repo.get_state(number) != u'open':
+            return 405, {u'message': u'Pull Request is not mergeable'}
+        self.write(repo, number, u'merge', **(self.body or {}))
+        self.new_event(repo, number, u'merged', commit_id=repo.head_sha(number))
+        repo.touch(number, state=u'merged')
+        return 200, {u'sha': repo.head_sha(number), u'merged': True,
+                     u'message': u'Pull Request successfully merged'}
+
+    def _number_for_sha(self, repo, commit_sha):
+        number = repo.pull_for_sha(commit_sha)
+        if number is None:
+            raise KeyError(commit_sha)
+        return number
+
+    def handle_commit(self, repo, sha):
+        repo = self.get_repo(repo)
+        number = self._number_for_sha(repo, sha)
+        commit = [x for x in repo.pull_commits(self.base, number) if x[u'sha'] == sha][0]
+        commit = dict(commit)
+        commit[u'files'] = repo.pull_files(self.base, number)
+        return 200, commit
+
+    def handle_combined_status(self, repo, sha):
+        repo = self.get_repo(repo)
+        statuses = repo.statuses(self.base, self._number_for_sha(repo, sha))
+        return 200, {
+            u'state': statuses[0][u'state'] if statuses else u'pending',
+            u'sha': sha,
+            u'total_count': len(statuses),
+            u'statuses': statuses,
+        }
+
+    def handle_statuses(self, repo, sha):
+        repo = self.get_repo(repo)
+        return 200, repo.statuses(self.base, self._number_for_sha(repo, sha))
+
+    # shippable, the runs of the first repo
+
+    def shippable_repo(self):
+        return sorted(self.sim.repos.values(), key=lambda x: x.full_name)[0]
+
+    def shippable_run(self, repo, number):
+        failed = repo.run_failed(number)
+        created = repo.created[number - 1] + 60
+        return {
+            u'id': u'%024x' % number,
+            u'runNumber': repo.run_number(number),
+            u'projectId': u'573f79d02a8192902e20e34b',
+            u'isPullRequest': True,
+            u'pullRequestNumber': number,
+            u'commitUrl': u'https://github.com/%s/pull/%s' % (repo.full_name, number),
+            u'commitSha': repo.head_sha(number),
+            u'branchName': u'devel',
+            u'statusCode': SHIPPABLE_FAILED if failed else SHIPPABLE_SUCCESS,
+            u'createdAt': to_iso(created),
+            u'updatedAt': to_iso(created + 1740),
+            u'endedAt': to_iso(created + 1740),
+        }
+
+    def handle_runs(self):
+        repo = self.shippable_repo()
+        numbers = []
+        if self.query.get(u'runNumbers'):
+            numbers = [int(x) for x in self.query[u'runNumbers'].split(u',')]
+        else:
+            # the most recent pullrequests, like the default listing
+            numbers = [x + 1 for x in range(len(repo)) if repo.is_pullrequest[x]][-50:]
+        return 200, [self.shippable_run(repo, x) for x in numbers
+                     if x in repo and repo.is_pullrequest[x - 1]]
+
+    def handle_run(self, run):
+        repo = self.shippable_repo()
+        return 200, self.shippable_run(repo, int(run, 16))
+
+    def handle_cancel_run(self, run):
+        self.sim.writes.append((None, int(run, 16), u'cancel_run', {}))
+        return 200, {}
+
+    def handle_new_build(self, project):
+        self.sim.writes.append((None, None, u'new_build', self.body or {}))
+        return 200, {u'runId': u'%024x' % 0}
+
+    def handle_jobs(self):
+        repo = self.shippable_repo()
+        jobs = []
+        for run_id in (self.query.get(u'runIds') or u'').split(u','):
+            if not run_id:
+                continue
+            run = self.shippable_run(repo, int(run_id, 16))
+            for job in (1, 2):
+                jobs.append({
+                    u'id': u'%024x' % (int(run_id, 16) * 16 + job),
+                    u'runId': run_id,
+                    u'runNumber': run[u'runNumber'],
+                    u'jobNumber': job,
+                    u'statusCode': run[u'statusCode'] if job == 1 else SHIPPABLE_SUCCESS,
+                })
+        return 200, jobs
+
+    def handle_job_test_reports(self, job):
+        return 200, []
+
+
+class SimulatorServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, sim):
+        BaseHTTPServer.HTTPServer.__init__(self, address, Handler)
+        self.sim = sim
+        host, port = self.server_address[:2]
+        host = u'%s' % host
+        if host in (u'0.0.0.0', u''):
+            host = u'localhost'
+        if sim.base_url is None:
+            sim.base_url = u'http://%s:%s' % (host, port)
+
+
+def start(sim, host=u'localhost', port=0):
+    '''Serve the simulator from a background thread'''
+    server = SimulatorServer((host, port), sim)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server